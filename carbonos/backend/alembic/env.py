@@ -16,8 +16,8 @@ from app.core.database import Base
 # 导入所有模型以确保 Alembic 能检测到
 from app.models.tenant import Tenant
 from app.models.user import User
-from app.models.organization import Organization
-from app.models.carbon import CarbonEmission, CarbonInventory, EmissionFactor
+from app.models.organization import Organization, OrganizationClosure
+from app.models.carbon import CarbonEmission, CarbonInventory, EmissionFactor, EmissionRollupDaily, EmissionRollupMonthly
 from app.models.energy import EnergyData
 from app.models.audit import AuditLog  # P2: 审计日志
 from app.models.tenant_config import TenantConfig  # P2: 租户配置
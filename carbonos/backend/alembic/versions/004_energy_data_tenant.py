@@ -0,0 +1,52 @@
+"""能源数据租户隔离与仪表盘聚合索引
+
+Revision ID: 004_energy_data_tenant
+Revises: 003_add_surveys
+Create Date: 2026-10-18
+
+- energy_data 补充 tenant_id（按所属组织回填）
+- 仪表盘按 (tenant, org, date) 范围聚合的复合索引
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '004_energy_data_tenant'
+down_revision: Union[str, Sequence[str], None] = '003_add_surveys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """添加 energy_data.tenant_id 及复合索引"""
+    op.add_column('energy_data', sa.Column('tenant_id', sa.UUID(), nullable=True))
+    op.execute("""
+        UPDATE energy_data e
+        SET tenant_id = o.tenant_id
+        FROM organizations o
+        WHERE e.organization_id = o.id
+    """)
+    op.alter_column('energy_data', 'tenant_id', nullable=False)
+    op.create_foreign_key(
+        'fk_energy_data_tenant_id', 'energy_data', 'tenants', ['tenant_id'], ['id']
+    )
+    op.create_index(op.f('ix_energy_data_tenant_id'), 'energy_data', ['tenant_id'], unique=False)
+    op.create_index(
+        'ix_energy_data_tenant_org_date', 'energy_data',
+        ['tenant_id', 'organization_id', 'data_date'], unique=False
+    )
+    op.create_index(
+        'ix_carbon_emissions_tenant_org_date', 'carbon_emissions',
+        ['tenant_id', 'organization_id', 'calculation_date'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """移除 energy_data.tenant_id 及复合索引"""
+    op.drop_index('ix_carbon_emissions_tenant_org_date', table_name='carbon_emissions')
+    op.drop_index('ix_energy_data_tenant_org_date', table_name='energy_data')
+    op.drop_index(op.f('ix_energy_data_tenant_id'), table_name='energy_data')
+    op.drop_constraint('fk_energy_data_tenant_id', 'energy_data', type_='foreignkey')
+    op.drop_column('energy_data', 'tenant_id')
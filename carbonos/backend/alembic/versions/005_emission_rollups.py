@@ -0,0 +1,72 @@
+"""排放日/月预聚合表
+
+Revision ID: 005_emission_rollups
+Revises: 004_energy_data_tenant
+Create Date: 2026-10-18
+
+- emission_rollups: (tenant, org, scope, day) 日汇总
+- emission_rollups_monthly: (tenant, org, scope, month) 月汇总
+- 从 carbon_emissions 回填历史数据
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '005_emission_rollups'
+down_revision: Union[str, Sequence[str], None] = '004_energy_data_tenant'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_rollup_table(name: str, period: str) -> None:
+    emission_scope_enum = postgresql.ENUM('scope_1', 'scope_2', 'scope_3', name='emissionscope', create_type=False)
+    op.create_table(
+        name,
+        sa.Column('id', sa.UUID(), nullable=False),
+        sa.Column('tenant_id', sa.UUID(), nullable=False),
+        sa.Column('organization_id', sa.UUID(), nullable=False),
+        sa.Column('scope', emission_scope_enum, nullable=False),
+        sa.Column(period, sa.Date(), nullable=False),
+        sa.Column('emission_amount', sa.Float(), nullable=False),
+        sa.Column('record_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('tenant_id', 'organization_id', 'scope', period, name=f'uq_{name}_key'),
+    )
+    op.create_index(f'ix_{name}_tenant_{period}', name, ['tenant_id', period], unique=False)
+
+
+def upgrade() -> None:
+    """创建预聚合表并回填"""
+    _create_rollup_table('emission_rollups', 'day')
+    _create_rollup_table('emission_rollups_monthly', 'month')
+
+    op.execute("""
+        INSERT INTO emission_rollups
+            (id, tenant_id, organization_id, scope, day, emission_amount, record_count, updated_at)
+        SELECT gen_random_uuid(), tenant_id, organization_id, scope,
+               calculation_date::date, SUM(emission_amount), COUNT(*), now()
+        FROM carbon_emissions
+        GROUP BY tenant_id, organization_id, scope, calculation_date::date
+    """)
+    op.execute("""
+        INSERT INTO emission_rollups_monthly
+            (id, tenant_id, organization_id, scope, month, emission_amount, record_count, updated_at)
+        SELECT gen_random_uuid(), tenant_id, organization_id, scope,
+               date_trunc('month', calculation_date)::date, SUM(emission_amount), COUNT(*), now()
+        FROM carbon_emissions
+        GROUP BY tenant_id, organization_id, scope, date_trunc('month', calculation_date)::date
+    """)
+
+
+def downgrade() -> None:
+    """删除预聚合表"""
+    op.drop_index('ix_emission_rollups_monthly_tenant_month', table_name='emission_rollups_monthly')
+    op.drop_table('emission_rollups_monthly')
+    op.drop_index('ix_emission_rollups_tenant_day', table_name='emission_rollups')
+    op.drop_table('emission_rollups')
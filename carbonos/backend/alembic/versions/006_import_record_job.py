@@ -0,0 +1,28 @@
+"""导入记录关联后台任务
+
+Revision ID: 006_import_record_job
+Revises: 005_emission_rollups
+Create Date: 2026-10-18
+
+- import_records 增加 job_id（状态由后台任务驱动）
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '006_import_record_job'
+down_revision: Union[str, Sequence[str], None] = '005_emission_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """添加 import_records.job_id"""
+    op.add_column('import_records', sa.Column('job_id', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """移除 import_records.job_id"""
+    op.drop_column('import_records', 'job_id')
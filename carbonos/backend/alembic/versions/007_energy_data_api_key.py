@@ -0,0 +1,34 @@
+"""API 批量能源数据幂等键
+
+Revision ID: 007_energy_data_api_key
+Revises: 006_import_record_job
+Create Date: 2026-10-18
+
+- energy_data 部分唯一索引 (tenant, org, energy_type, data_date) WHERE source = 'api'
+  作为批量接口 ON CONFLICT 的仲裁索引；手动录入与文件导入的数据不受约束
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '007_energy_data_api_key'
+down_revision: Union[str, Sequence[str], None] = '006_import_record_job'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建部分唯一索引"""
+    op.create_index(
+        'uq_energy_data_api_key', 'energy_data',
+        ['tenant_id', 'organization_id', 'energy_type', 'data_date'],
+        unique=True,
+        postgresql_where=sa.text("source = 'api'"),
+    )
+
+
+def downgrade() -> None:
+    """删除部分唯一索引"""
+    op.drop_index('uq_energy_data_api_key', table_name='energy_data')
@@ -0,0 +1,37 @@
+"""游标分页索引
+
+Revision ID: 008_keyset_indexes
+Revises: 007_energy_data_api_key
+Create Date: 2026-10-18
+
+- 列表接口改为按 (排序列, id) 的 keyset 分页，补充对应复合索引
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '008_keyset_indexes'
+down_revision: Union[str, Sequence[str], None] = '007_energy_data_api_key'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = (
+    ('ix_energy_data_tenant_date_id', 'energy_data', ['tenant_id', 'data_date', 'id']),
+    ('ix_import_records_org_created', 'import_records', ['organization_id', 'created_at', 'id']),
+    ('ix_audit_logs_tenant_ts', 'audit_logs', ['tenant_id', 'timestamp', 'id']),
+    ('ix_audit_logs_user_ts', 'audit_logs', ['user_id', 'timestamp', 'id']),
+    ('ix_audit_logs_resource_ts', 'audit_logs', ['resource_type', 'resource_id', 'timestamp']),
+)
+
+
+def upgrade() -> None:
+    """创建 keyset 分页索引"""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    """删除 keyset 分页索引"""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,56 @@
+"""组织闭包表
+
+Revision ID: 009_organization_closure
+Revises: 008_keyset_indexes
+Create Date: 2026-10-18
+
+- organization_closure: (祖先, 后代, 深度) 每个组合一行，含自身（depth=0）
+- 通过递归 CTE 回填已有组织
+- 子树查询由闭包表承担，取代物化路径方案（不再添加 organizations.path）
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '009_organization_closure'
+down_revision: Union[str, Sequence[str], None] = '008_keyset_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """创建闭包表并回填"""
+    op.create_table(
+        'organization_closure',
+        sa.Column('ancestor_id', sa.UUID(), nullable=False),
+        sa.Column('descendant_id', sa.UUID(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.Column('tenant_id', sa.UUID(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['organizations.id'], ),
+        sa.ForeignKeyConstraint(['descendant_id'], ['organizations.id'], ),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id'], ),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id'),
+    )
+    op.create_index(
+        'ix_organization_closure_descendant', 'organization_closure', ['descendant_id', 'depth'], unique=False
+    )
+    op.execute("""
+        INSERT INTO organization_closure (ancestor_id, descendant_id, depth, tenant_id)
+        WITH RECURSIVE closure AS (
+            SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth, tenant_id
+            FROM organizations
+            UNION ALL
+            SELECT closure.ancestor_id, o.id, closure.depth + 1, o.tenant_id
+            FROM organizations o
+            JOIN closure ON o.parent_id = closure.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth, tenant_id FROM closure
+    """)
+
+
+def downgrade() -> None:
+    """删除闭包表"""
+    op.drop_index('ix_organization_closure_descendant', table_name='organization_closure')
+    op.drop_table('organization_closure')
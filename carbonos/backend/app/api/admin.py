@@ -8,15 +8,17 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select, func
 
-from app.core.database import get_db
+from app.core.cache import CacheManager, get_redis, session_loader
+from app.core.database import get_db, get_read_db, get_read_session_maker
 from app.core.permissions import get_superuser  # P0-003: 统一权限依赖
 from app.core.security import get_password_hash
 from app.models.user import User, UserRole
 from app.models.tenant import Tenant, TenantStatus, TenantPlan
-from app.models.carbon import CarbonEmission
+from app.services.platform_stats import compute_global_stats
+from app.services.principal_cache import principal_cache
 
 
 router = APIRouter(prefix="/admin", tags=["超级管理员"])
@@ -68,6 +70,7 @@ async def update_tenant_status(
         await db.commit()
     except ValueError:
         raise HTTPException(status_code=400, detail="无效的状态值")
+    await principal_cache.invalidate_tenant(db, tenant.id)
         
     # Return updated stats logic (simplified reuse)
     # 实际项目中可能只需返回 tenant 对象即可，这里为了兼容 stats 格式
@@ -146,34 +149,22 @@ async def reset_tenant_password(
          
     user.password_hash = get_password_hash(reset_data.password)
     await db.commit()
+    await principal_cache.invalidate([user.id])
     
     return {"message": f"管理员 {user.email} 密码已重置"}
 
 @router.get("/stats", response_model=GlobalStats)
 async def get_global_stats(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
+    session_maker: async_sessionmaker = Depends(get_read_session_maker),
     current_user: User = Depends(get_superuser)  # P0-003: 统一权限
 ):
-    """获取全平台运营数据"""
-        
-    # 1. Total Tenants
-    tenant_count = await db.scalar(select(func.count(Tenant.id)))
-    
-    # 2. Active Tenants
-    active_count = await db.scalar(select(func.count(Tenant.id)).where(Tenant.status == TenantStatus.ACTIVE))
-    
-    # 3. Total Users
-    user_count = await db.scalar(select(func.count(User.id)))
-    
-    # 4. Total Emissions (跨租户聚合)
-    emission_total = await db.scalar(select(func.sum(CarbonEmission.emission_amount))) or 0.0
-    
-    return GlobalStats(
-        total_tenants=tenant_count or 0,
-        active_tenants=active_count or 0,
-        total_users=user_count or 0,
-        total_emissions=emission_total
-    )
+    """获取全平台运营数据（缓存 1 分钟，启动时预热）"""
+    try:
+        cache = CacheManager(await get_redis())
+    except Exception:
+        return GlobalStats(**await compute_global_stats(db))
+    return GlobalStats(**await cache.global_stats(session_loader(session_maker, compute_global_stats)))
 
 @router.get("/tenants/{tenant_id}", response_model=TenantStats)
 async def get_tenant_detail(
@@ -260,7 +251,7 @@ class DashboardCharts(BaseModel):
 
 @router.get("/stats/trend", response_model=DashboardCharts)
 async def get_dashboard_charts(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_superuser)  # P0-003: 统一权限
 ):
     """获取仪表盘图表数据 (趋势与分布)"""
@@ -531,6 +522,7 @@ async def update_staff(
     
     await db.commit()
     await db.refresh(user)
+    await principal_cache.invalidate([user.id])
     
     # 获取显示用的角色
     reverse_role_map = {
@@ -563,5 +555,6 @@ async def delete_staff(
     
     await db.delete(user)
     await db.commit()
+    await principal_cache.invalidate([staff_id])
     return None
 
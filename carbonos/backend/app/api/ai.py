@@ -2,15 +2,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from app.core.database import get_db
+from app.core.database import get_read_db
 from app.api.deps import get_current_active_user
 from app.models.user import User
-from app.models.carbon import CarbonEmission, EmissionScope
+from app.models.carbon import EmissionScope
 from app.models.tenant import Tenant
+from app.services.rollup import EmissionRollupService
 
 router = APIRouter(prefix="/diagnostic", tags=["AI 智能诊断"])
 
@@ -114,7 +114,7 @@ def generate_rule_based_suggestions(scope_analysis: ScopeAnalysis, top_sources:
 @router.post("/analyze", response_model=DiagnosticReport)
 async def analyze_emissions(
     input_data: DiagnosticInput,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
@@ -127,17 +127,14 @@ async def analyze_emissions(
         # 这里简单处理，暂定只能租户自己分析
         raise HTTPException(status_code=400, detail="请进入租户视角进行诊断")
 
-    # 1. 聚合数据 (Scope 1/2/3)
-    # 实际应根据 date range 过滤
-    stmt = select(
-        CarbonEmission.scope, 
-        func.sum(CarbonEmission.emission_amount)
-    ).where(
-        CarbonEmission.tenant_id == current_user.tenant_id
-    ).group_by(CarbonEmission.scope)
-    
-    result = await db.execute(stmt)
-    rows = result.all()
+    # 1. 聚合数据 (Scope 1/2/3)，读取预聚合表，按 date range 过滤（结束日期含当天）
+    try:
+        start = datetime.strptime(input_data.start_date, "%Y-%m-%d").date() if input_data.start_date else None
+        end = datetime.strptime(input_data.end_date, "%Y-%m-%d").date() + timedelta(days=1) if input_data.end_date else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="日期格式应为 YYYY-MM-DD")
+
+    totals = await EmissionRollupService(db).scope_totals(current_user.tenant_id, start=start, end=end)
     
     scope_map = {
         EmissionScope.SCOPE_1: 0.0,
@@ -146,8 +143,8 @@ async def analyze_emissions(
     }
     
     total_emission = 0.0
-    for scope, amount in rows:
-        scope_map[scope] = amount or 0.0
+    for scope, amount in totals.items():
+        scope_map[EmissionScope(scope)] = amount or 0.0
         total_emission += (amount or 0.0)
         
     scope_analysis = ScopeAnalysis(
@@ -191,11 +191,12 @@ async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
         )
 
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_db_user
+from app.services.principal_cache import principal_cache
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_db_user)
 ):
     """获取当前用户信息"""
     return current_user
@@ -204,7 +205,7 @@ async def get_current_user(
 @router.post("/reset-password", status_code=status.HTTP_200_OK)
 async def reset_password(
     data: UserPasswordUpdate,
-    current_user: User = Depends(get_current_active_user),
+    current_user: User = Depends(get_current_db_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -220,5 +221,6 @@ async def reset_password(
     current_user.password_hash = get_password_hash(data.new_password)
     db.add(current_user)
     await db.commit()
+    await principal_cache.invalidate([current_user.id])
     
     return {"message": "密码修改成功"}
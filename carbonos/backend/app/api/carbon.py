@@ -6,23 +6,33 @@ P0-002: 添加多租户数据隔离
 import uuid
 from typing import Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy import select
 
-from app.core.database import get_db
+from app.core.cache import CacheManager, get_redis, session_loader
+from app.core.database import get_db, get_session_maker
+from app.core.pagination import export_response, keyset_query, page_response, paginate, stream_scalars
 from app.core.permissions import get_tenant_user, tenant_filter, get_tenant_id  # P0-002: 租户隔离
 from app.models.carbon import EmissionFactor, CarbonEmission, CarbonInventory, EmissionScope
-from app.models.user import User
+from app.models.user import User, UserRole
 from app.schemas.carbon import (
     EmissionFactorCreate,
     EmissionFactorResponse,
     CarbonCalculateRequest,
+    CarbonCalculateBatchRequest,
+    CarbonCalculateBatchResponse,
     CarbonEmissionResponse,
     CarbonInventoryResponse,
     CarbonSummary
 )
 from app.services.carbon_engine import CarbonCalculationEngine
+from app.services.cache_warmer import cache_warmer
+from app.services.factor_cache import factor_cache, load_factor_list
+from app.services.rollup import EmissionRollupService
+from app.services import tasks
+from app.core.jobs import JobStatus, enqueue
+from app.schemas.job import JobAccepted
 
 router = APIRouter(prefix="/carbon", tags=["碳核算"])
 
@@ -53,6 +63,10 @@ async def create_emission_factor(
     db.add(factor)
     await db.commit()
     await db.refresh(factor)
+    
+    # 递增因子版本号，通知所有 worker 重新加载因子表，并重新预热因子列表缓存
+    await factor_cache.invalidate()
+    cache_warmer.schedule_factor_list()
     return factor
 
 
@@ -60,17 +74,21 @@ async def create_emission_factor(
 async def list_emission_factors(
     category: Optional[str] = Query(None),
     energy_type: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    session_maker: async_sessionmaker = Depends(get_session_maker),
 ):
-    """获取排放因子列表 (Public - 排放因子是公共资源)"""
-    query = select(EmissionFactor)
-    if category:
-        query = query.where(EmissionFactor.category == category)
-    if energy_type:
-        query = query.where(EmissionFactor.energy_type == energy_type)
-    
-    result = await db.execute(query.order_by(EmissionFactor.category))
-    return result.scalars().all()
+    """获取排放因子列表 (Public - 排放因子是公共资源；全表缓存后按条件过滤)"""
+    try:
+        cache = CacheManager(await get_redis())
+    except Exception:
+        factors = await load_factor_list(db)
+    else:
+        factors = await cache.emission_factors(session_loader(session_maker, load_factor_list))
+    return [
+        factor for factor in factors
+        if (not category or factor["category"] == category)
+        and (not energy_type or factor["energy_type"] == energy_type)
+    ]
 
 
 # ============ 碳核算计算 ============
@@ -106,27 +124,68 @@ async def calculate_emission(
         )
 
 
-@router.get("/emissions", response_model=list[CarbonEmissionResponse])
-async def list_emissions(
-    organization_id: uuid.UUID,
-    scope: Optional[str] = Query(None),
-    limit: int = Query(100, le=1000),
+@router.post("/calculate/batch", response_model=CarbonCalculateBatchResponse)
+async def calculate_emissions_batch(
+    request: CarbonCalculateBatchRequest,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_tenant_user)  # P0-002: 需要租户用户
 ):
-    """获取碳排放记录"""
+    """批量计算碳排放（月末重算等场景）"""
+    tenant_id = get_tenant_id(current_user)
+    
+    engine = CarbonCalculationEngine(db)
+    
+    try:
+        return await engine.calculate_emissions_bulk(request.items, tenant_id=tenant_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+def _emissions_query(tenant_id: uuid.UUID, organization_id: uuid.UUID, scope: Optional[str]):
     # P0-002: 添加租户隔离过滤
     query = select(CarbonEmission).where(
         CarbonEmission.organization_id == organization_id,
-        CarbonEmission.tenant_id == current_user.tenant_id  # 关键：租户隔离
+        CarbonEmission.tenant_id == tenant_id  # 关键：租户隔离
     )
     
     if scope:
         query = query.where(CarbonEmission.scope == EmissionScope(scope))
-    
-    query = query.order_by(CarbonEmission.calculation_date.desc()).limit(limit)
-    result = await db.execute(query)
-    return result.scalars().all()
+    return query
+
+
+@router.get("/emissions", response_model=list[CarbonEmissionResponse])
+async def list_emissions(
+    response: Response,
+    organization_id: uuid.UUID,
+    scope: Optional[str] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)  # P0-002: 需要租户用户
+):
+    """获取碳排放记录（游标分页）"""
+    query = _emissions_query(current_user.tenant_id, organization_id, scope)
+    page = await paginate(db, query, CarbonEmission.calculation_date, CarbonEmission.id, cursor, limit)
+    return page_response(response, page)
+
+
+@router.get("/emissions/export")
+async def export_emissions(
+    organization_id: uuid.UUID,
+    scope: Optional[str] = Query(None),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    session_maker: async_sessionmaker = Depends(get_session_maker),
+    current_user: User = Depends(get_tenant_user)  # P0-002: 需要租户用户
+):
+    """流式导出碳排放记录 (NDJSON / CSV)"""
+    query = keyset_query(
+        _emissions_query(current_user.tenant_id, organization_id, scope),
+        CarbonEmission.calculation_date, CarbonEmission.id,
+    )
+    return export_response(stream_scalars(session_maker, query), CarbonEmissionResponse, format, "emissions")
 
 
 @router.get("/summary", response_model=CarbonSummary)
@@ -134,6 +193,7 @@ async def get_carbon_summary(
     organization_id: uuid.UUID,
     year: int = Query(...),
     month: Optional[int] = Query(None),
+    include_descendants: bool = Query(False, description="汇总全部下级组织，并按直接下级分项"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_tenant_user)  # P0-002: 需要租户用户
 ):
@@ -151,19 +211,20 @@ async def get_carbon_summary(
         end = datetime(year + 1, 1, 1)
         period = f"{year}年"
     
-    # P0-002: 添加租户隔离过滤
-    query = select(
-        CarbonEmission.scope,
-        func.sum(CarbonEmission.emission_amount).label("total")
-    ).where(
-        CarbonEmission.organization_id == organization_id,
-        CarbonEmission.tenant_id == current_user.tenant_id,  # 关键：租户隔离
-        CarbonEmission.calculation_date >= start,
-        CarbonEmission.calculation_date < end
-    ).group_by(CarbonEmission.scope)
-    
-    result = await db.execute(query)
-    scope_totals = {row.scope.value: row.total or 0 for row in result.all()}
+    # P0-002: 租户隔离；读取月汇总表，成本与记录数无关
+    rollups = EmissionRollupService(db)
+    scope_totals = await rollups.scope_totals(
+        current_user.tenant_id,
+        organization_id=organization_id,
+        start=start.date(),
+        end=end.date(),
+        include_descendants=include_descendants,
+    )
+    children = None
+    if include_descendants:
+        children = await rollups.child_totals(
+            current_user.tenant_id, organization_id, start=start.date(), end=end.date()
+        )
     
     scope_1 = scope_totals.get("scope_1", 0)
     scope_2 = scope_totals.get("scope_2", 0)
@@ -176,10 +237,26 @@ async def get_carbon_summary(
         scope_2=scope_2,
         scope_3=scope_3,
         total=scope_1 + scope_2 + scope_3,
-        breakdown=scope_totals
+        breakdown=scope_totals,
+        include_descendants=include_descendants,
+        children=children
     )
 
 
+@router.post("/rollups/rebuild", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def rebuild_rollups(
+    current_user: User = Depends(get_tenant_user)  # P0-002: 仅重算本租户
+):
+    """提交排放汇总重算任务（从原始排放记录重建日/月汇总）"""
+    if current_user.role not in (UserRole.ADMIN, UserRole.MANAGER):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="需要管理员或经理权限")
+    try:
+        job_id = await enqueue(tasks.ROLLUP_REBUILD, {}, tenant_id=current_user.tenant_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用，请稍后重试")
+    return JobAccepted(job_id=job_id, status=JobStatus.QUEUED)
+
+
 # ============ 碳盘查 ============
 
 @router.get("/inventory", response_model=list[CarbonInventoryResponse])
@@ -2,24 +2,37 @@
 数据接入 API 路由
 """
 
+import asyncio
+import os
+import shutil
 import uuid
 from datetime import date
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 from sqlalchemy import select, func
 
-from app.core.database import get_db
+from app.core.database import get_db, get_session_maker
 from app.models.energy import EnergyData, EnergyType, DataSource, ImportRecord
+from app.models.organization import Organization
 from app.schemas.energy import (
     EnergyDataCreate, 
     EnergyDataResponse, 
     EnergyDataBatch,
+    EnergyDataBatchResponse,
     ImportRecordResponse,
     EnergyStats
 )
+from app.core.jobs import enqueue
+from app.core.logging import get_logger
+from app.core.pagination import export_response, keyset_query, page_response, paginate, stream_scalars
+from app.services import tasks
+from app.services.energy_data import bulk_create_energy_data
+from app.services.org_hierarchy import OrganizationHierarchy, organization_filter
+from app.services.tasks import job_storage_path
 
 router = APIRouter(prefix="/data", tags=["数据接入"])
+logger = get_logger(__name__)
 
 
 from app.api.deps import get_current_active_user
@@ -50,57 +63,51 @@ async def create_energy_data(
     db.add(energy)
     await db.commit()
     await db.refresh(energy)
+    await OrganizationHierarchy.invalidate_emissions(db, current_user.tenant_id, [energy.organization_id])
     
     return energy
 
 
-@router.post("/energy/batch", response_model=dict)
+@router.post("/energy/batch", response_model=EnergyDataBatchResponse)
 async def batch_create_energy_data(
     batch: EnergyDataBatch, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
 ):
-    """批量录入能源数据"""
-    success_count = 0
-    failed_count = 0
-    
-    for item in batch.data:
-        try:
-            energy = EnergyData(
-                organization_id=item.organization_id,
-                energy_type=EnergyType(item.energy_type),
-                data_date=item.data_date,
-                consumption=item.consumption,
-                unit=item.unit,
-                cost=item.cost,
-                remarks=item.remarks,
-                source=DataSource.MANUAL,
-            )
-            db.add(energy)
-            success_count += 1
-        except Exception:
-            failed_count += 1
-    
+    """批量录入能源数据（整批写入，逐行返回错误；upsert=true 时重复提交幂等）"""
+    if not current_user.tenant_id:
+        raise HTTPException(status_code=400, detail="非租户用户无法提交数据")
+
+    result = await bulk_create_energy_data(
+        db,
+        batch.data,
+        tenant_id=current_user.tenant_id,
+        created_by=current_user.id,
+        upsert=batch.upsert,
+    )
     await db.commit()
+    await OrganizationHierarchy.invalidate_emissions(db, current_user.tenant_id, result["organization_ids"])
     
-    return {
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "total": len(batch.data)
-    }
+    logger.info(
+        "energy_batch_created",
+        total=result["total"],
+        inserted=result["inserted"],
+        updated=result["updated"],
+        failed=result["failed_count"],
+        elapsed_ms=result["elapsed_ms"],
+    )
+    return result
 
 
-@router.get("/energy", response_model=list[EnergyDataResponse])
-async def list_energy_data(
-    organization_id: Optional[uuid.UUID] = Query(None),
-    energy_type: Optional[str] = Query(None),
-    start_date: Optional[date] = Query(None),
-    end_date: Optional[date] = Query(None),
-    limit: int = Query(100, le=1000),
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+def _energy_data_query(
+    tenant_id: Optional[uuid.UUID],
+    organization_id: Optional[uuid.UUID],
+    energy_type: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
 ):
-    """获取能源数据列表 (租户隔离)"""
-    query = select(EnergyData).where(EnergyData.tenant_id == current_user.tenant_id) # 隔离
+    """能源数据列表/导出的公共过滤条件"""
+    query = select(EnergyData).where(EnergyData.tenant_id == tenant_id) # 隔离
     
     if organization_id:
         query = query.where(EnergyData.organization_id == organization_id)
@@ -110,11 +117,43 @@ async def list_energy_data(
         query = query.where(EnergyData.data_date >= start_date)
     if end_date:
         query = query.where(EnergyData.data_date <= end_date)
-    
-    query = query.order_by(EnergyData.data_date.desc()).limit(limit)
-    result = await db.execute(query)
-    
-    return result.scalars().all()
+    return query
+
+
+@router.get("/energy", response_model=list[EnergyDataResponse])
+async def list_energy_data(
+    response: Response,
+    organization_id: Optional[uuid.UUID] = Query(None),
+    energy_type: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """获取能源数据列表 (租户隔离，游标分页)"""
+    query = _energy_data_query(current_user.tenant_id, organization_id, energy_type, start_date, end_date)
+    page = await paginate(db, query, EnergyData.data_date, EnergyData.id, cursor, limit)
+    return page_response(response, page)
+
+
+@router.get("/energy/export")
+async def export_energy_data(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    organization_id: Optional[uuid.UUID] = Query(None),
+    energy_type: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None),
+    end_date: Optional[date] = Query(None),
+    session_maker: async_sessionmaker = Depends(get_session_maker),
+    current_user: User = Depends(get_current_active_user)
+):
+    """流式导出能源数据 (NDJSON / CSV，租户隔离)"""
+    query = keyset_query(
+        _energy_data_query(current_user.tenant_id, organization_id, energy_type, start_date, end_date),
+        EnergyData.data_date, EnergyData.id,
+    )
+    return export_response(stream_scalars(session_maker, query), EnergyDataResponse, format, "energy_data")
 
 
 @router.get("/energy/stats", response_model=list[EnergyStats])
@@ -122,16 +161,22 @@ async def get_energy_stats(
     organization_id: uuid.UUID,
     start_date: Optional[date] = Query(None),
     end_date: Optional[date] = Query(None),
-    db: AsyncSession = Depends(get_db)
+    include_descendants: bool = Query(False, description="汇总全部下级组织"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
 ):
-    """获取能源统计"""
+    """获取能源统计 (租户隔离)"""
+    tenant_id = current_user.tenant_id
     query = select(
         EnergyData.energy_type,
         func.sum(EnergyData.consumption).label("total_consumption"),
         EnergyData.unit,
         func.sum(EnergyData.cost).label("total_cost"),
         func.count(EnergyData.id).label("record_count")
-    ).where(EnergyData.organization_id == organization_id)
+    ).where(
+        organization_filter(EnergyData.organization_id, tenant_id, organization_id, include_descendants),
+        EnergyData.tenant_id == tenant_id  # P0-002: 租户隔离
+    )
     
     if start_date:
         query = query.where(EnergyData.data_date >= start_date)
@@ -154,59 +199,94 @@ async def get_energy_stats(
     return stats
 
 
+async def _abort_import(db: AsyncSession, record: ImportRecord, path: str, message: str) -> None:
+    """导入未能提交到任务队列：删除（可能不完整的）上传文件并将记录标记为失败"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    record.status = "failed"
+    record.error_message = message
+    await db.commit()
+
+
 @router.post("/import/excel", response_model=ImportRecordResponse)
 async def import_excel(
     organization_id: uuid.UUID,
     file: UploadFile = File(...),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
 ):
-    """Excel 数据导入"""
-    if not file.filename.endswith(('.xlsx', '.xls', '.csv')):
+    """Excel/CSV 数据导入（后台任务流式解析，进度见 /jobs/{job_id}）"""
+    if not current_user.tenant_id:
+        raise HTTPException(status_code=400, detail="非租户用户无法提交数据")
+    if not file.filename.lower().endswith(('.xlsx', '.csv')):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="仅支持 Excel (.xlsx, .xls) 或 CSV 文件"
+            detail="仅支持 Excel (.xlsx) 或 CSV 文件"
         )
     
+    # P0-002: 组织必须属于当前租户
+    org_id = await db.scalar(select(Organization.id).where(
+        Organization.id == organization_id,
+        Organization.tenant_id == current_user.tenant_id
+    ))
+    if not org_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="组织不存在")
+    
     # 创建导入记录
     import_record = ImportRecord(
         filename=file.filename,
         organization_id=organization_id,
-        status="processing"
+        status="pending",
+        created_by=current_user.id
     )
     db.add(import_record)
     await db.commit()
     await db.refresh(import_record)
     
-    # TODO: 实际解析 Excel 文件并导入数据
-    # 这里仅返回导入记录，实际实现需要:
-    # 1. 读取 Excel 文件
-    # 2. 解析数据行
-    # 3. 验证数据格式
-    # 4. 批量插入数据库
-    # 5. 更新导入记录状态
+    # 保存上传文件（流式复制），由后台 worker 解析导入
+    extension = os.path.splitext(file.filename)[1].lower()
+    path = job_storage_path("imports", f"{import_record.id}{extension}")
+    try:
+        with open(path, "wb") as out:
+            await asyncio.to_thread(shutil.copyfileobj, file.file, out, 1024 * 1024)
+    except Exception as e:
+        logger.error("import_upload_save_failed", record_id=str(import_record.id), error=str(e))
+        await _abort_import(db, import_record, path, f"上传文件保存失败: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="上传文件保存失败，请重新导入")
+
+    try:
+        import_record.job_id = await enqueue(
+            tasks.ENERGY_IMPORT,
+            {"record_id": str(import_record.id), "path": path},
+            tenant_id=current_user.tenant_id,
+        )
+    except Exception as e:
+        await _abort_import(db, import_record, path, f"任务队列不可用: {e}")
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用，请稍后重试")
     
-    import_record.status = "completed"
-    import_record.total_rows = 0
-    import_record.success_rows = 0
     await db.commit()
     await db.refresh(import_record)
-    
     return import_record
 
 
 @router.get("/import/records", response_model=list[ImportRecordResponse])
 async def list_import_records(
+    response: Response,
     organization_id: Optional[uuid.UUID] = Query(None),
-    limit: int = Query(20, le=100),
-    db: AsyncSession = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
 ):
-    """获取导入记录列表"""
-    query = select(ImportRecord)
+    """获取导入记录列表 (租户隔离，游标分页)"""
+    # P0-002: 导入记录无 tenant_id，经组织归属隔离
+    tenant_orgs = select(Organization.id).where(Organization.tenant_id == current_user.tenant_id)
+    query = select(ImportRecord).where(ImportRecord.organization_id.in_(tenant_orgs))
     
     if organization_id:
         query = query.where(ImportRecord.organization_id == organization_id)
     
-    query = query.order_by(ImportRecord.created_at.desc()).limit(limit)
-    result = await db.execute(query)
-    
-    return result.scalars().all()
+    page = await paginate(db, query, ImportRecord.created_at, ImportRecord.id, cursor, limit)
+    return page_response(response, page)
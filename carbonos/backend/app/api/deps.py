@@ -2,52 +2,76 @@
 API 依赖注入
 """
 
-from fastapi import Depends, HTTPException, status
+import uuid
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from app.core import security
 from app.core.config import get_settings
 from app.core.database import get_db
+from app.core.middleware.auth import AUTH_CLAIMS_KEY
 from app.models.user import User
 from app.schemas.user import TokenData
+from app.services.principal_cache import Principal, principal_cache
 
 settings = get_settings()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.api_v1_str}/auth/login")
 
 async def get_current_user(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
-) -> User:
+) -> Principal:
+    """
+    解析当前用户
+    返回缓存的认证主体（id / tenant_id / role / status / is_superuser），不查询 users 表；
+    需要完整用户记录的路由使用 get_current_db_user
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭证",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = security.decode_token(token)
+        # AuthClaimsMiddleware 已验证同一 Authorization 头，直接复用 claims
+        payload = getattr(request.state, AUTH_CLAIMS_KEY, None) or security.decode_token_cached(token)
         if payload is None:
             raise credentials_exception
         user_id: str = payload.get("sub")
         if user_id is None:
             raise credentials_exception
         token_data = TokenData(user_id=user_id)
-    except JWTError:
+        user_uuid = uuid.UUID(token_data.user_id)
+    except (JWTError, ValueError):
         raise credentials_exception
         
-    result = await db.execute(select(User).where(User.id == token_data.user_id))
-    user = result.scalar_one_or_none()
+    principal = await principal_cache.get(db, user_uuid)
     
-    if user is None:
+    if principal is None:
         raise credentials_exception
         
-    return user
+    return principal
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     # 可以在此检查 user.is_active 或 tenant.status
     return current_user
+
+async def get_current_db_user(
+    current_user: Principal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """当前用户的完整记录（个人信息、修改密码等需要读写 users 表的路由）"""
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="无效的认证凭证",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
@@ -0,0 +1,91 @@
+"""
+后台任务 API 路由
+查询任务状态/进度并下载任务结果文件
+"""
+
+import os
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse
+
+from app.core import jobs
+from app.core.permissions import get_tenant_user  # P0-002: 租户隔离
+from app.models.user import User
+from app.schemas.job import JobResponse
+
+router = APIRouter(prefix="/jobs", tags=["后台任务"])
+
+
+def _to_response(job: dict[str, Any]) -> JobResponse:
+    result = job.get("result")
+    if isinstance(result, dict):
+        # 不暴露服务器文件路径
+        result = {k: v for k, v in result.items() if k != "path"}
+    return JobResponse(
+        id=job["id"],
+        kind=job["kind"],
+        status=job["status"],
+        progress=job.get("progress") or 0,
+        message=job.get("message"),
+        attempts=job.get("attempts", 0),
+        max_attempts=job.get("max_attempts", 0),
+        error=job.get("error"),
+        result=result,
+        created_at=datetime.utcfromtimestamp(job["created_at"]) if job.get("created_at") else None,
+        started_at=datetime.utcfromtimestamp(job["started_at"]) if job.get("started_at") else None,
+        finished_at=datetime.utcfromtimestamp(job["finished_at"]) if job.get("finished_at") else None,
+    )
+
+
+async def _get_tenant_job(job_id: str, current_user: User) -> dict[str, Any]:
+    try:
+        job = await jobs.get_job(job_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用")
+    # P0-002: 只能查看本租户的任务
+    if not job or job.get("tenant_id") != str(current_user.tenant_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="任务不存在")
+    return job
+
+
+@router.get("", response_model=list[JobResponse])
+async def list_jobs(
+    limit: int = Query(20, le=100),
+    current_user: User = Depends(get_tenant_user)
+):
+    """获取本租户最近的任务"""
+    try:
+        items = await jobs.list_tenant_jobs(current_user.tenant_id, limit=limit)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用")
+    return [_to_response(job) for job in items]
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_tenant_user)
+):
+    """获取任务状态与进度"""
+    return _to_response(await _get_tenant_job(job_id, current_user))
+
+
+@router.get("/{job_id}/result")
+async def download_job_result(
+    job_id: str,
+    current_user: User = Depends(get_tenant_user)
+):
+    """下载任务结果文件（如报告 PDF）"""
+    job = await _get_tenant_job(job_id, current_user)
+    result = job.get("result") or {}
+    if job["status"] != jobs.JobStatus.SUCCEEDED or not result.get("path"):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="任务尚未完成或没有结果文件")
+    if not os.path.exists(result["path"]):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="结果文件已过期")
+    return FileResponse(
+        result["path"],
+        media_type=result.get("media_type", "application/octet-stream"),
+        filename=result.get("filename"),
+    )
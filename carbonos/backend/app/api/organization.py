@@ -1,5 +1,6 @@
 """
 组织管理 API 路由
+P0-002: 租户数据隔离
 """
 
 import uuid
@@ -7,24 +8,43 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
+from app.core.permissions import get_tenant_user  # P0-002: 租户隔离
 from app.models.organization import Organization, OrganizationType
+from app.models.user import User
 from app.schemas.organization import (
     OrganizationCreate, 
     OrganizationUpdate, 
     OrganizationResponse,
     OrganizationTree
 )
+from app.services.org_hierarchy import OrganizationHierarchy
 
 router = APIRouter(prefix="/organizations", tags=["组织管理"])
 
 
+async def _get_tenant_organization(db: AsyncSession, org_id: uuid.UUID, tenant_id: uuid.UUID) -> Organization:
+    """获取当前租户的组织，不存在时返回 404"""
+    result = await db.execute(select(Organization).where(
+        Organization.id == org_id,
+        Organization.tenant_id == tenant_id  # P0-002: 租户隔离
+    ))
+    org = result.scalar_one_or_none()
+    
+    if not org:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="组织不存在"
+        )
+    return org
+
+
 @router.post("/", response_model=OrganizationResponse, status_code=status.HTTP_201_CREATED)
 async def create_organization(
     org_data: OrganizationCreate, 
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)
 ):
     """创建组织（园区/企业/车间）"""
     # 检查代码是否重复
@@ -35,10 +55,13 @@ async def create_organization(
             detail="组织代码已存在"
         )
     
-    # 如果有父组织，验证父组织存在
+    # 如果有父组织，验证父组织存在（且属于当前租户）
     if org_data.parent_id:
         parent = await db.execute(
-            select(Organization).where(Organization.id == org_data.parent_id)
+            select(Organization).where(
+                Organization.id == org_data.parent_id,
+                Organization.tenant_id == current_user.tenant_id
+            )
         )
         if not parent.scalar_one_or_none():
             raise HTTPException(
@@ -57,10 +80,12 @@ async def create_organization(
         description=org_data.description,
         industry_code=org_data.industry_code,
         area_sqm=org_data.area_sqm,
+        tenant_id=current_user.tenant_id,  # P0-002: 强制注入
     )
     db.add(org)
     await db.commit()
     await db.refresh(org)
+    await OrganizationHierarchy.invalidate(current_user.tenant_id)
     
     return org
 
@@ -69,10 +94,11 @@ async def create_organization(
 async def list_organizations(
     type: Optional[str] = Query(None, description="组织类型: park/enterprise/workshop"),
     parent_id: Optional[uuid.UUID] = Query(None, description="父组织ID"),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)
 ):
     """获取组织列表"""
-    query = select(Organization)
+    query = select(Organization).where(Organization.tenant_id == current_user.tenant_id)
     
     if type:
         query = query.where(Organization.type == OrganizationType(type))
@@ -84,74 +110,33 @@ async def list_organizations(
 
 
 @router.get("/tree", response_model=list[OrganizationTree])
-async def get_organization_tree(db: AsyncSession = Depends(get_db)):
-    """获取组织树结构（从园区开始）"""
-    # 获取所有顶级组织（园区）
-    result = await db.execute(
-        select(Organization)
-        .where(Organization.parent_id == None)
-        .options(selectinload(Organization.children))
-    )
-    parks = result.scalars().all()
-    
-    # 递归构建树结构
-    async def build_tree(org: Organization) -> OrganizationTree:
-        # 加载子组织
-        children_result = await db.execute(
-            select(Organization).where(Organization.parent_id == org.id)
-        )
-        children = children_result.scalars().all()
-        
-        return OrganizationTree(
-            id=org.id,
-            name=org.name,
-            code=org.code,
-            type=org.type.value,
-            parent_id=org.parent_id,
-            address=org.address,
-            contact_name=org.contact_name,
-            contact_phone=org.contact_phone,
-            description=org.description,
-            industry_code=org.industry_code,
-            area_sqm=org.area_sqm,
-            created_at=org.created_at,
-            updated_at=org.updated_at,
-            children=[await build_tree(child) for child in children]
-        )
-    
-    return [await build_tree(park) for park in parks]
+async def get_organization_tree(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)
+):
+    """获取组织树结构（从园区开始，单次递归查询 + 缓存）"""
+    return await OrganizationHierarchy(db).get_tree(current_user.tenant_id)
 
 
 @router.get("/{org_id}", response_model=OrganizationResponse)
-async def get_organization(org_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+async def get_organization(
+    org_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)
+):
     """获取组织详情"""
-    result = await db.execute(select(Organization).where(Organization.id == org_id))
-    org = result.scalar_one_or_none()
-    
-    if not org:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="组织不存在"
-        )
-    
-    return org
+    return await _get_tenant_organization(db, org_id, current_user.tenant_id)
 
 
 @router.put("/{org_id}", response_model=OrganizationResponse)
 async def update_organization(
     org_id: uuid.UUID,
     org_data: OrganizationUpdate,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)
 ):
     """更新组织信息"""
-    result = await db.execute(select(Organization).where(Organization.id == org_id))
-    org = result.scalar_one_or_none()
-    
-    if not org:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="组织不存在"
-        )
+    org = await _get_tenant_organization(db, org_id, current_user.tenant_id)
     
     # 更新字段
     update_data = org_data.model_dump(exclude_unset=True)
@@ -160,21 +145,19 @@ async def update_organization(
     
     await db.commit()
     await db.refresh(org)
+    await OrganizationHierarchy.invalidate(current_user.tenant_id)
     
     return org
 
 
 @router.delete("/{org_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_organization(org_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+async def delete_organization(
+    org_id: uuid.UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)
+):
     """删除组织"""
-    result = await db.execute(select(Organization).where(Organization.id == org_id))
-    org = result.scalar_one_or_none()
-    
-    if not org:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="组织不存在"
-        )
+    org = await _get_tenant_organization(db, org_id, current_user.tenant_id)
     
     # 检查是否有子组织
     children = await db.execute(
@@ -188,3 +171,4 @@ async def delete_organization(org_id: uuid.UUID, db: AsyncSession = Depends(get_
     
     await db.delete(org)
     await db.commit()
+    await OrganizationHierarchy.invalidate(current_user.tenant_id)
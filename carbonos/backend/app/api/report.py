@@ -3,13 +3,15 @@
 """
 
 import uuid
-from typing import Optional
-from fastapi import APIRouter, Depends, Query, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
 
 from app.core.database import get_db
-from app.models.carbon import CarbonEmission, Organization
+from app.core.jobs import JobStatus, enqueue
+from app.core.permissions import get_tenant_user  # P0-002: 租户隔离
+from app.models.user import User
+from app.schemas.job import JobAccepted
+from app.services import tasks
 from app.services.report_generator import ReportGenerator
 
 router = APIRouter(prefix="/reports", tags=["报告"])
@@ -19,39 +21,15 @@ router = APIRouter(prefix="/reports", tags=["报告"])
 async def download_inventory_report(
     organization_id: uuid.UUID,
     year: int = Query(...),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_tenant_user)  # P0-002: 需要租户用户
 ):
-    """下载碳盘查报告 (PDF)"""
-    # 获取组织信息
-    org_result = await db.execute(select(Organization).where(Organization.id == organization_id))
-    org = org_result.scalar_one_or_none()
-    org_name = org.name if org else "Unknown Organization"
-    
-    # 获取数据汇总
-    start = datetime(year, 1, 1)
-    end = datetime(year + 1, 1, 1)
-    
-    query = select(
-        CarbonEmission.scope,
-        func.sum(CarbonEmission.emission_amount).label("total")
-    ).where(
-        CarbonEmission.organization_id == organization_id,
-        CarbonEmission.calculation_date >= start,
-        CarbonEmission.calculation_date < end
-    ).group_by(CarbonEmission.scope)
-    
-    result = await db.execute(query)
-    scope_totals = {row.scope.value: row.total or 0 for row in result.all()}
-    
-    summary = {
-        "scope_1": scope_totals.get("scope_1", 0),
-        "scope_2": scope_totals.get("scope_2", 0),
-        "scope_3": scope_totals.get("scope_3", 0),
-        "total": sum(scope_totals.values())
-    }
-    
-    # 生成 PDF
-    pdf_content = ReportGenerator.generate_carbon_inventory_report(org_name, year, summary)
+    """下载碳盘查报告 (PDF，进程池渲染并按内容缓存；大批量请使用 /reports/inventory/jobs)"""
+    pdf_content = await ReportGenerator.render_inventory_report(
+        db, current_user.tenant_id, organization_id, year
+    )
+    if pdf_content is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="组织不存在")
     
     return Response(
         content=pdf_content,
@@ -60,3 +38,38 @@ async def download_inventory_report(
             "Content-Disposition": f"attachment; filename=Carbon_Inventory_{year}.pdf"
         }
     )
+
+
+@router.post("/inventory/jobs", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def create_inventory_report_job(
+    organization_id: uuid.UUID,
+    year: int = Query(...),
+    current_user: User = Depends(get_tenant_user)  # P0-002: 需要租户用户
+):
+    """提交碳盘查报告生成任务，完成后通过 /jobs/{job_id}/result 下载"""
+    try:
+        job_id = await enqueue(
+            tasks.INVENTORY_REPORT,
+            {"organization_id": str(organization_id), "year": year},
+            tenant_id=current_user.tenant_id,
+        )
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用，请稍后重试")
+    return JobAccepted(job_id=job_id, status=JobStatus.QUEUED)
+
+
+@router.post("/inventory/bulk-jobs", response_model=JobAccepted, status_code=status.HTTP_202_ACCEPTED)
+async def create_bulk_inventory_report_job(
+    year: int = Query(...),
+    current_user: User = Depends(get_tenant_user)  # P0-002: 需要租户用户
+):
+    """提交租户全部组织的碳盘查报告任务（ZIP），完成后通过 /jobs/{job_id}/result 下载"""
+    try:
+        job_id = await enqueue(
+            tasks.INVENTORY_REPORT_BULK,
+            {"year": year},
+            tenant_id=current_user.tenant_id,
+        )
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="任务队列不可用，请稍后重试")
+    return JobAccepted(job_id=job_id, status=JobStatus.QUEUED)
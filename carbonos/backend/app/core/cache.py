@@ -1,22 +1,55 @@
 """
 Redis 缓存模块
 P1-002: 启用 Redis 缓存提升高频查询性能
+- L1 进程内 LRU（按字节数限制内存）+ L2 Redis；L1 按调用显式开启（local_ttl）
+- 写入/删除开启 L1 的键时经 Pub/Sub 通知其他 worker 清除本地条目
+- 缓存值经 CacheSerializer 编码（默认 orjson，大载荷压缩），使用不解码响应的独立连接读写
 """
 
-import json
+import asyncio
 import hashlib
-from typing import Any, Optional, Callable
+import math
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Iterable, Optional, Callable
 from functools import wraps
 from datetime import timedelta
 
 import redis.asyncio as redis
 from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.cache_codec import CacheSerializer
 from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.core.metrics import record_cache_hit, record_cache_miss
+
+logger = get_logger("core.cache")
 
 
 # 全局 Redis 客户端
 _redis_client: Optional[Redis] = None
+# 缓存值（二进制载荷）使用的 Redis 客户端
+_binary_redis_client: Optional[Redis] = None
+
+# 失效通知订阅: channel -> 回调列表
+_invalidation_handlers: dict[str, list[Callable[[str], None]]] = {}
+_invalidation_task: Optional[asyncio.Task] = None
+
+# 本进程内正在计算的缓存键 -> 计算任务（single-flight）
+_inflight: dict[str, asyncio.Task] = {}
+# 租约被其他 worker 持有（刷新路径返回该标记，由调用方使用旧值）
+_LEASE_HELD = object()
+
+# 仅持有者可释放租约（比较令牌后删除）
+_RELEASE_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
 
 
 async def get_redis() -> Redis:
@@ -32,18 +65,179 @@ async def get_redis() -> Redis:
     return _redis_client
 
 
+async def get_binary_redis() -> Redis:
+    """获取不解码响应的 Redis 连接（缓存值为二进制载荷）"""
+    global _binary_redis_client
+    if _binary_redis_client is None:
+        _binary_redis_client = redis.from_url(get_settings().redis_url)
+    return _binary_redis_client
+
+
 async def close_redis():
     """关闭 Redis 连接"""
-    global _redis_client
+    global _redis_client, _binary_redis_client
     if _redis_client:
         await _redis_client.close()
         _redis_client = None
+    if _binary_redis_client:
+        await _binary_redis_client.close()
+        _binary_redis_client = None
+
+
+class LocalCache:
+    """
+    进程内 L1 缓存：LRU + 条目 TTL，总大小按未压缩的序列化字节数限制
+    保存反序列化后的对象，调用方不得修改返回值
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at < time.monotonic():
+            self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float) -> None:
+        self.delete(key)
+        size += len(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self.size -= evicted
+
+    def delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+
+# 进程级 L1 缓存与缓存值编解码
+local_cache = LocalCache(get_settings().cache_local_max_bytes)
+serializer = CacheSerializer(
+    get_settings().cache_codec,
+    get_settings().cache_compression,
+    get_settings().cache_compress_min_bytes,
+)
+
+
+# ============ 跨 worker 失效通知（Pub/Sub） ============
+
+def on_invalidation(channel: str, handler: Callable[[str], None]) -> None:
+    """
+    注册失效通知回调
+    回调在监听任务中同步执行，应只做标记/清理等轻量操作
+    """
+    _invalidation_handlers.setdefault(channel, []).append(handler)
+
+
+async def publish_invalidation(channel: str, message: str = "") -> None:
+    """广播失效通知（本进程回调直接执行，其他 worker 经 Redis Pub/Sub 接收）"""
+    for handler in _invalidation_handlers.get(channel, []):
+        handler(message)
+    try:
+        redis = await get_redis()
+        await redis.publish(channel, message)
+    except Exception as e:
+        logger.warning("invalidation_publish_failed", channel=channel, error=str(e))
+
+
+async def _listen_invalidations() -> None:
+    """订阅所有已注册频道，断线后退避重连"""
+    backoff = 1
+    while True:
+        try:
+            redis = await get_redis()
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(*_invalidation_handlers.keys())
+            backoff = 1
+            try:
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    for handler in _invalidation_handlers.get(message["channel"], []):
+                        handler(message.get("data") or "")
+            finally:
+                await pubsub.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("invalidation_listener_error", error=str(e), retry_in=backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+
+def start_invalidation_listener() -> None:
+    """启动失效通知监听任务（应用启动时调用）"""
+    global _invalidation_task
+    if _invalidation_task is None and _invalidation_handlers:
+        _invalidation_task = asyncio.create_task(_listen_invalidations())
+
+
+async def stop_invalidation_listener() -> None:
+    """停止失效通知监听任务"""
+    global _invalidation_task
+    if _invalidation_task is not None:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except asyncio.CancelledError:
+            pass
+        _invalidation_task = None
+
+
+# L1 失效通知：消息为 "实例 ID|键"，键为空时清空；忽略本进程发出的消息（本地已处理）
+LOCAL_CACHE_CHANNEL = "carbonos:cache:invalidate"
+_INSTANCE_ID = uuid.uuid4().hex
+
+
+def _drop_local(message: str) -> None:
+    sender, _, key = message.partition("|")
+    if sender == _INSTANCE_ID:
+        return
+    if key:
+        local_cache.delete(key)
+    else:
+        local_cache.clear()
+
+
+on_invalidation(LOCAL_CACHE_CHANNEL, _drop_local)
 
 
 class CacheManager:
     """
     缓存管理器
     支持多种缓存策略和自动过期
+
+    租户级缓存键内嵌代数（generation）计数器：
+    - 租户代数 gen:{tenant_id}：递增后该租户全部缓存键失效
+    - 组织代数 gen:{tenant_id}:{org_id}：递增后该组织的仪表盘缓存失效
+    失效只需一次 INCR（O(1)），旧键不再被读取，由 TTL 自然过期；无需 SCAN 遍历键空间
+    代数键不设 TTL：过期归零后可能重新命中尚未过期的旧键
+
+    fetch() 读取或计算缓存值，防止缓存击穿：
+    - 进程内 single-flight：同一键的并发未命中只计算一次
+    - 跨 worker 租约（SET NX PX）：只有持有者计算，其他 worker 等待结果写入
+    - XFetch 概率提前刷新：临近过期时按计算耗时随机提前由单个请求刷新
+    - stale-while-revalidate：逻辑过期后的 stale_ttl 内，刷新进行中的其他请求返回旧值
     """
     
     # 缓存键前缀
@@ -52,109 +246,318 @@ class CacheManager:
     # 默认过期时间（秒）
     DEFAULT_TTL = 300  # 5 分钟
     
+    # 计算租约时长（秒），应大于最慢的计算耗时
+    LEASE_TTL = 30
+    # 未取得租约时等待结果的最长时间与轮询间隔（秒），超时后自行计算
+    LEASE_WAIT = 5
+    LEASE_POLL_INTERVAL = 0.05
+    # XFetch 提前刷新系数，越大越早刷新
+    XFETCH_BETA = 1.0
+    
     # 缓存键模板
     KEYS = {
-        "dashboard_summary": "dashboard:{tenant_id}:{org_id}:summary",
-        "dashboard_trends": "dashboard:{tenant_id}:{org_id}:trends:{period}",
+        "tenant_generation": "gen:{tenant_id}",
+        "org_generation": "gen:{tenant_id}:{org_id}",
+        "dashboard_summary": "dashboard:{tenant_id}:{org_id}:{scope}:g{generation}:summary",
+        "dashboard_trends": "dashboard:{tenant_id}:{org_id}:{scope}:g{generation}:trends:{period}",
         "emission_factors": "factors:all",
+        "org_tree": "org:{tenant_id}:g{generation}:tree",
         "tenant_stats": "admin:tenant_stats",
         "global_stats": "admin:global_stats",
     }
     
-    def __init__(self, redis: Redis):
+    def __init__(self, redis: Redis, binary: Optional[Redis] = None):
         self.redis = redis
+        self.binary = binary  # 缓存值读写；未指定时使用 get_binary_redis()
+    
+    async def _values(self) -> Redis:
+        if self.binary is None:
+            self.binary = await get_binary_redis()
+        return self.binary
     
     def _make_key(self, template: str, **kwargs) -> str:
         """生成缓存键"""
         key = template.format(**kwargs)
         return f"{self.PREFIX}{key}"
     
-    async def get(self, key: str) -> Optional[Any]:
-        """获取缓存"""
-        data = await self.redis.get(key)
-        if data:
-            return json.loads(data)
-        return None
+    async def get(self, key: str, local_ttl: Optional[int] = None) -> Optional[Any]:
+        """获取缓存（指定 local_ttl 时先查 L1，Redis 命中后回填 L1）"""
+        if local_ttl:
+            value = local_cache.get(key)
+            if value is not None:
+                record_cache_hit("l1")
+                return value
+            record_cache_miss("l1")
+        payload = await (await self._values()).get(key)
+        if not payload:
+            record_cache_miss("l2")
+            return None
+        record_cache_hit("l2")
+        value, size = serializer.decode(payload)
+        if local_ttl:
+            local_cache.set(key, value, size, local_ttl)
+        return value
     
     async def set(
         self, 
         key: str, 
         value: Any, 
-        ttl: int = DEFAULT_TTL
+        ttl: int = DEFAULT_TTL,
+        local_ttl: Optional[int] = None
     ) -> None:
-        """设置缓存"""
-        await self.redis.setex(key, ttl, json.dumps(value, default=str))
+        """设置缓存（指定 local_ttl 时同时写入 L1，并通知其他 worker 清除旧的本地条目）"""
+        payload = serializer.encode(value)
+        await (await self._values()).setex(key, ttl, payload)
+        if local_ttl:
+            await publish_invalidation(LOCAL_CACHE_CHANNEL, f"{_INSTANCE_ID}|{key}")
+            # 与 L2 命中时一致：保存解码后的对象
+            local_cache.set(key, *serializer.decode(payload), min(local_ttl, ttl))
     
     async def delete(self, key: str) -> None:
-        """删除缓存"""
+        """删除缓存（含所有 worker 的 L1 条目）"""
         await self.redis.delete(key)
+        local_cache.delete(key)
+        await publish_invalidation(LOCAL_CACHE_CHANNEL, f"{_INSTANCE_ID}|{key}")
+    
+    # ============ 代数计数器 ============
+    
+    async def generation(self, tenant_id: str, org_id: Optional[str] = None) -> str:
+        """
+        当前代数（一次 MGET）：租户级缓存为租户代数，组织级缓存为 "租户代数.组织代数"
+        """
+        keys = [self._make_key(self.KEYS["tenant_generation"], tenant_id=tenant_id)]
+        if org_id is not None:
+            keys.append(self._make_key(self.KEYS["org_generation"], tenant_id=tenant_id, org_id=org_id))
+        return ".".join(value or "0" for value in await self.redis.mget(keys))
+    
+    async def invalidate_organizations(self, tenant_id: str, org_ids: Iterable[str]) -> None:
+        """递增组织代数，使这些组织的仪表盘缓存失效（单次管道往返）"""
+        pipe = self.redis.pipeline(transaction=False)
+        for org_id in set(org_ids):
+            pipe.incr(self._make_key(self.KEYS["org_generation"], tenant_id=tenant_id, org_id=org_id))
+        await pipe.execute()
+    
+    async def invalidate_tenant_cache(self, tenant_id: str) -> int:
+        """清除租户相关所有缓存（递增租户代数，返回新代数）"""
+        return await self.redis.incr(self._make_key(self.KEYS["tenant_generation"], tenant_id=tenant_id))
     
-    async def delete_pattern(self, pattern: str) -> int:
-        """批量删除匹配的键"""
-        full_pattern = f"{self.PREFIX}{pattern}"
-        keys = []
-        async for key in self.redis.scan_iter(full_pattern):
-            keys.append(key)
-        if keys:
-            return await self.redis.delete(*keys)
-        return 0
+    # ============ 防击穿读取 ============
+    
+    async def fetch(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int = DEFAULT_TTL,
+        stale_ttl: Optional[int] = None,
+        beta: float = XFETCH_BETA,
+        local_ttl: Optional[int] = None,
+    ) -> Any:
+        """
+        读取缓存，未命中或需要刷新时调用 loader 计算并写入（local_ttl 见 get）
+        缓存值以 {"v": 值, "e": 逻辑过期时间戳, "d": 计算耗时} 存储，Redis TTL 为 ttl + stale_ttl
+        Redis 不可用时直接计算；loader 的异常原样抛出，且每次调用最多执行一次 loader
+        """
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        try:
+            entry = await self.get(key, local_ttl)
+        except Exception as e:
+            logger.warning("cache_get_failed", key=key, error=str(e))
+            return await self._single_flight(key, loader)
+
+        if entry is None:
+            value = await self._single_flight(
+                key, lambda: self._load_with_lease(key, loader, ttl, stale_ttl, local_ttl, wait=True)
+            )
+            if value is _LEASE_HELD:
+                # 加入的是刷新任务而其租约被占用（期间键已过期），按未命中处理
+                value = await self._load_with_lease(key, loader, ttl, stale_ttl, local_ttl, wait=True)
+            return value
+
+        # XFetch：now - delta * beta * ln(rand) >= expiry 时提前刷新（ln(rand) < 0）
+        now = time.time()
+        if now - entry["d"] * beta * math.log(random.random() or 1e-12) < entry["e"]:
+            return entry["v"]
+
+        # 已过期或提前刷新：本进程已有刷新在进行时直接返回旧值
+        if key in _inflight:
+            return entry["v"]
+        refreshed = await self._single_flight(
+            key, lambda: self._load_with_lease(key, loader, ttl, stale_ttl, local_ttl, wait=False)
+        )
+        return entry["v"] if refreshed is _LEASE_HELD else refreshed
+    
+    async def _single_flight(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        同一键的并发调用共享一个计算任务（shield：单个调用方取消不影响其他等待者）
+        任务执行的是首个调用方的 loader，因此 loader 不得绑定请求级数据库会话（见 session_loader）
+        """
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        return await asyncio.shield(task)
+    
+    async def _load_with_lease(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        local_ttl: Optional[int],
+        wait: bool,
+    ) -> Any:
+        """
+        取得跨 worker 租约后计算并写入
+        未取得租约时：wait=True 轮询等待结果（超时后自行计算），否则返回 _LEASE_HELD 由调用方使用旧值
+        """
+        lease_key = f"{key}:lease"
+        token = uuid.uuid4().hex
+        try:
+            leased = bool(await self.redis.set(lease_key, token, nx=True, px=self.LEASE_TTL * 1000))
+        except Exception as e:
+            logger.warning("cache_lease_failed", key=key, error=str(e))
+            leased = None
+
+        if leased is False:
+            if not wait:
+                return _LEASE_HELD
+            deadline = time.monotonic() + self.LEASE_WAIT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.LEASE_POLL_INTERVAL)
+                try:
+                    entry = await self.get(key)
+                except Exception:
+                    break
+                if entry is not None:
+                    return entry["v"]
+            logger.warning("cache_lease_wait_timeout", key=key)
+
+        try:
+            started = time.monotonic()
+            value = await loader()
+            delta = time.monotonic() - started
+            try:
+                await self.set(
+                    key, {"v": value, "e": time.time() + ttl, "d": delta}, ttl + stale_ttl, local_ttl
+                )
+            except Exception as e:
+                logger.warning("cache_set_failed", key=key, error=str(e))
+            return value
+        finally:
+            if leased:
+                try:
+                    await self.redis.eval(_RELEASE_LEASE_LUA, 1, lease_key, token)
+                except Exception:
+                    pass  # 租约到期自动释放
     
     # ============ 业务缓存方法 ============
     
-    async def get_dashboard_summary(
-        self, 
-        tenant_id: str, 
-        org_id: str
-    ) -> Optional[dict]:
-        """获取仪表盘摘要缓存"""
-        key = self._make_key(
-            self.KEYS["dashboard_summary"],
+    async def _dashboard_key(self, name: str, tenant_id: str, org_id: str, subtree: bool, **kwargs) -> str:
+        return self._make_key(
+            self.KEYS[name],
             tenant_id=tenant_id,
-            org_id=org_id
+            org_id=org_id,
+            scope="subtree" if subtree else "self",  # 子树汇总与单组织分开缓存
+            generation=await self.generation(tenant_id, org_id),
+            **kwargs
         )
-        return await self.get(key)
     
-    async def set_dashboard_summary(
-        self, 
-        tenant_id: str, 
-        org_id: str, 
-        data: dict,
+    async def _cached_dashboard(
+        self,
+        name: str,
+        tenant_id: str,
+        org_id: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: int,
+        subtree: bool,
+        **kwargs
+    ) -> Any:
+        try:
+            key = await self._dashboard_key(name, tenant_id, org_id, subtree, **kwargs)
+        except Exception as e:
+            logger.warning("dashboard_cache_unavailable", error=str(e))
+            return await loader()
+        return await self.fetch(key, loader, ttl, local_ttl=get_settings().cache_local_ttl)
+    
+    async def dashboard_summary(
+        self,
+        tenant_id: str,
+        org_id: str,
+        loader: Callable[[], Awaitable[dict]],
+        subtree: bool = False,
         ttl: int = 60  # 仪表盘缓存 1 分钟
-    ) -> None:
-        """设置仪表盘摘要缓存"""
-        key = self._make_key(
-            self.KEYS["dashboard_summary"],
-            tenant_id=tenant_id,
-            org_id=org_id
+    ) -> dict:
+        """获取仪表盘摘要（未命中时由 loader 计算并缓存）"""
+        return await self._cached_dashboard("dashboard_summary", tenant_id, org_id, loader, ttl, subtree)
+    
+    async def dashboard_trends(
+        self,
+        tenant_id: str,
+        org_id: str,
+        period: str,
+        loader: Callable[[], Awaitable[list]],
+        subtree: bool = False,
+        ttl: int = 300  # 趋势缓存 5 分钟
+    ) -> list:
+        """获取仪表盘趋势（未命中时由 loader 计算并缓存）"""
+        return await self._cached_dashboard(
+            "dashboard_trends", tenant_id, org_id, loader, ttl, subtree, period=period
         )
-        await self.set(key, data, ttl)
     
-    async def invalidate_tenant_cache(self, tenant_id: str) -> int:
-        """清除租户相关所有缓存"""
-        return await self.delete_pattern(f"*:{tenant_id}:*")
+    async def _org_tree_key(self, tenant_id: str) -> str:
+        return self._make_key(
+            self.KEYS["org_tree"], tenant_id=tenant_id, generation=await self.generation(tenant_id)
+        )
     
-    async def get_emission_factors(self) -> Optional[list]:
-        """获取排放因子缓存"""
-        key = self._make_key(self.KEYS["emission_factors"])
-        return await self.get(key)
+    async def get_org_tree(self, tenant_id: str) -> Optional[list]:
+        """获取组织树缓存"""
+        return await self.get(await self._org_tree_key(tenant_id), get_settings().cache_local_ttl)
     
-    async def set_emission_factors(
-        self, 
-        factors: list,
-        ttl: int = 3600  # 因子缓存 1 小时
+    async def set_org_tree(
+        self,
+        tenant_id: str,
+        tree: list,
+        ttl: int = 3600  # 组织变更时主动失效，TTL 仅兜底
     ) -> None:
-        """设置排放因子缓存"""
+        """设置组织树缓存"""
+        await self.set(await self._org_tree_key(tenant_id), tree, ttl, get_settings().cache_local_ttl)
+    
+    async def delete_org_tree(self, tenant_id: str) -> None:
+        """删除组织树缓存"""
+        await self.delete(await self._org_tree_key(tenant_id))
+    
+    async def emission_factors(
+        self,
+        loader: Callable[[], Awaitable[list]],
+        ttl: int = 3600  # 因子缓存 1 小时，因子变更时主动失效
+    ) -> list:
+        """获取排放因子列表（近乎静态，优先读取 L1）"""
         key = self._make_key(self.KEYS["emission_factors"])
-        await self.set(key, factors, ttl)
+        return await self.fetch(key, loader, ttl, local_ttl=get_settings().cache_local_ttl)
+    
+    async def global_stats(
+        self,
+        loader: Callable[[], Awaitable[dict]],
+        ttl: int = 60  # 平台统计缓存 1 分钟
+    ) -> dict:
+        """获取平台运营统计（未命中时由 loader 计算并缓存）"""
+        return await self.fetch(self._make_key(self.KEYS["global_stats"]), loader, ttl)
+    
+    async def delete_emission_factors(self) -> None:
+        """删除排放因子列表缓存"""
+        await self.delete(self._make_key(self.KEYS["emission_factors"]))
 
 
 def cached(
     key_template: str,
     ttl: int = 300,
-    key_builder: Optional[Callable] = None
+    key_builder: Optional[Callable] = None,
+    stale_ttl: Optional[int] = None,
+    beta: float = CacheManager.XFETCH_BETA,
 ):
     """
-    缓存装饰器
+    缓存装饰器（防击穿，见 CacheManager.fetch）
     
     使用示例:
     @cached("user:{user_id}", ttl=60)
@@ -165,32 +568,37 @@ def cached(
         @wraps(func)
         async def wrapper(*args, **kwargs):
             try:
-                redis = await get_redis()
-                cache = CacheManager(redis)
-                
                 # 构建缓存键
                 if key_builder:
                     cache_key = key_builder(*args, **kwargs)
                 else:
                     cache_key = key_template.format(**kwargs)
-                
-                full_key = f"{CacheManager.PREFIX}{cache_key}"
-                
-                # 尝试从缓存获取
-                cached_data = await cache.get(full_key)
-                if cached_data is not None:
-                    return cached_data
-                
-                # 执行原函数
-                result = await func(*args, **kwargs)
-                
-                # 存入缓存
-                await cache.set(full_key, result, ttl)
-                
-                return result
-            except Exception:
-                # 缓存失败时直接执行原函数
+                cache = CacheManager(await get_redis())
+            except Exception as e:
+                logger.warning("cache_unavailable", error=str(e))
                 return await func(*args, **kwargs)
+            
+            return await cache.fetch(
+                f"{CacheManager.PREFIX}{cache_key}",
+                lambda: func(*args, **kwargs),
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                beta=beta,
+            )
         
         return wrapper
     return decorator
+
+
+def session_loader(
+    session_maker: async_sessionmaker,
+    compute: Callable[[AsyncSession], Awaitable[Any]],
+) -> Callable[[], Awaitable[Any]]:
+    """
+    构造使用独立会话的缓存 loader
+    单飞任务在多个请求间共享，若捕获首个请求的会话，该请求取消后会话关闭，所有等待者都会失败
+    """
+    async def load() -> Any:
+        async with session_maker() as db:
+            return await compute(db)
+    return load
@@ -0,0 +1,167 @@
+"""
+缓存序列化
+- 编解码器：orjson（默认）/ msgpack（扩展类型保留 UUID、datetime、date、Decimal）/ json（标准库兜底）
+- 压缩：载荷超过阈值时使用 zstd / lz4 / zlib 压缩
+- 载荷格式：2 字节头（编解码器、压缩算法）+ 数据
+  读取按头部解码、与当前配置无关，切换配置不影响已写入的缓存；无头部的旧载荷按 JSON 解码
+
+orjson / msgpack / zstandard / lz4 均为可选依赖，未安装时回退到标准库实现
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+import zlib
+from typing import Any, Callable
+
+from app.core.logging import get_logger
+
+logger = get_logger("core.cache_codec")
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+
+# ============ 编解码器 ============
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, default=str).encode()
+
+
+def _orjson_dumps(value: Any) -> bytes:
+    return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS)
+
+
+# msgpack 扩展类型编号
+_EXT_UUID = 1
+_EXT_DATETIME = 2
+_EXT_DATE = 3
+_EXT_DECIMAL = 4
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, uuid.UUID):
+        return msgpack.ExtType(_EXT_UUID, obj.bytes)
+    if isinstance(obj, datetime.datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, datetime.date):
+        return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, decimal.Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode())
+    return str(obj)  # 与 JSON 编解码器的 default=str 一致
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_UUID:
+        return uuid.UUID(bytes=data)
+    if code == _EXT_DATETIME:
+        return datetime.datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return datetime.date.fromisoformat(data.decode())
+    if code == _EXT_DECIMAL:
+        return decimal.Decimal(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _msgpack_dumps(value: Any) -> bytes:
+    return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+
+
+def _msgpack_loads(data: bytes) -> Any:
+    return msgpack.unpackb(data, ext_hook=_msgpack_ext_hook, raw=False, strict_map_key=False)
+
+
+# 名称 -> (头部标记, 编码, 解码, 是否可用)
+CODECS: dict[str, tuple[int, Callable[[Any], bytes], Callable[[bytes], Any], bool]] = {
+    "json": (1, _json_dumps, json.loads, True),
+    "orjson": (2, _orjson_dumps, orjson.loads if ORJSON_AVAILABLE else None, ORJSON_AVAILABLE),
+    "msgpack": (3, _msgpack_dumps, _msgpack_loads, MSGPACK_AVAILABLE),
+}
+
+
+# ============ 压缩 ============
+
+def _zstd_compress(data: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=3).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# 名称 -> (头部标记, 压缩, 解压, 是否可用)；标记 0 为不压缩
+COMPRESSORS: dict[str, tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes], bool]] = {
+    "zlib": (1, lambda data: zlib.compress(data, 1), zlib.decompress, True),
+    "zstd": (2, _zstd_compress, _zstd_decompress, ZSTD_AVAILABLE),
+    "lz4": (3, lambda data: lz4.frame.compress(data), lambda data: lz4.frame.decompress(data), LZ4_AVAILABLE),
+}
+
+_CODEC_TAGS = {tag for tag, _, _, _ in CODECS.values()}
+_DECODERS = {tag: loads for tag, _, loads, available in CODECS.values() if available}
+_DECOMPRESSORS = {tag: decompress for tag, _, decompress, available in COMPRESSORS.values() if available}
+
+
+class CacheSerializer:
+    """
+    缓存值编解码（含压缩）
+    配置的编解码器/压缩算法不可用时记录警告并回退（json / 不压缩）
+    """
+
+    def __init__(self, codec: str = "orjson", compression: str = "", compress_min_bytes: int = 4096):
+        if codec not in CODECS or not CODECS[codec][3]:
+            logger.warning("cache_codec_unavailable", codec=codec, fallback="json")
+            codec = "json"
+        if compression and (compression not in COMPRESSORS or not COMPRESSORS[compression][3]):
+            logger.warning("cache_compression_unavailable", compression=compression)
+            compression = ""
+        self.codec = codec
+        self.compression = compression
+        self.compress_min_bytes = compress_min_bytes
+        self._codec_tag, self._dumps, _, _ = CODECS[codec]
+        self._compress_tag, self._compress = (
+            (COMPRESSORS[compression][0], COMPRESSORS[compression][1]) if compression else (0, None)
+        )
+
+    def encode(self, value: Any) -> bytes:
+        data = self._dumps(value)
+        if self._compress is not None and len(data) >= self.compress_min_bytes:
+            return bytes((self._codec_tag, self._compress_tag)) + self._compress(data)
+        return bytes((self._codec_tag, 0)) + data
+
+    def decode(self, payload: bytes) -> tuple[Any, int]:
+        """解码载荷，返回 (值, 未压缩的数据字节数)"""
+        loads = _DECODERS.get(payload[0])
+        if loads is None:
+            if payload[0] in _CODEC_TAGS:
+                raise ValueError(f"缓存编解码器未安装: {payload[0]}")
+            # 无头部：升级前写入的 JSON 载荷
+            return json.loads(payload), len(payload)
+        data = payload[2:]
+        if payload[1]:
+            decompress = _DECOMPRESSORS.get(payload[1])
+            if decompress is None:
+                raise ValueError(f"不支持的缓存压缩格式: {payload[1]}")
+            data = decompress(data)
+        return loads(data), len(data)
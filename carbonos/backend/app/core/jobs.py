@@ -0,0 +1,492 @@
+"""
+后台任务队列（Redis）
+将导入、报告生成、重算等重任务移出请求处理进程，由独立 worker 执行（python -m app.worker）
+
+数据结构:
+- carbonos:jobs:{id}          任务详情（Hash）
+- carbonos:jobs:queue         就绪队列（List，LPUSH/BLMOVE）
+- carbonos:jobs:processing:{wid} worker 已领取的任务（List，BLMOVE 从就绪队列原子移入，执行结束后移除）
+- carbonos:jobs:workers       worker 心跳（ZSet，score 为最近心跳时间戳）
+- carbonos:jobs:delayed       延迟队列（ZSet，score 为可执行时间戳；用于重试退避与租户限流）
+- carbonos:jobs:running:{tid} 租户运行中任务数（并发上限）
+- carbonos:jobs:tenant:{tid}  租户最近任务 ID（List）
+
+任务状态: queued -> running -> succeeded / failed；失败可重试时进入 retrying 并按指数退避重新排队
+worker 心跳超过 job_visibility_timeout 未更新时，由其他 worker 回收其已领取的任务：
+重新排队（崩溃的执行计入尝试次数），已达最大尝试次数的标记为 failed
+"""
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core.cache import get_redis
+from app.core.config import get_settings
+from app.core.logging import get_logger
+
+logger = get_logger("core.jobs")
+
+
+JOB_KEY_PREFIX = "carbonos:jobs:"
+QUEUE_KEY = "carbonos:jobs:queue"
+PROCESSING_KEY_PREFIX = "carbonos:jobs:processing:"
+WORKERS_KEY = "carbonos:jobs:workers"
+DELAYED_KEY = "carbonos:jobs:delayed"
+RUNNING_KEY_PREFIX = "carbonos:jobs:running:"
+TENANT_JOBS_PREFIX = "carbonos:jobs:tenant:"
+
+# 终态任务保留时间
+JOB_TTL_SECONDS = 7 * 24 * 3600
+# 运行计数键的过期时间（worker 崩溃时自动释放名额）
+RUNNING_TTL_SECONDS = 3600
+# 租户达到并发上限时的重新排队间隔
+TENANT_DEFER_SECONDS = 2
+# 每个租户保留的最近任务数
+TENANT_HISTORY_SIZE = 100
+
+
+class JobStatus:
+    """任务状态"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    RETRYING = "retrying"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class PermanentJobError(Exception):
+    """不可重试的任务错误（如文件格式错误）"""
+
+
+# 并发名额占用：未超过上限时 +1 并刷新过期时间
+_ACQUIRE_SLOT_LUA = """
+local n = redis.call('INCR', KEYS[1])
+if n > tonumber(ARGV[1]) then
+    redis.call('DECR', KEYS[1])
+    return 0
+end
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+_RELEASE_SLOT_LUA = """
+local n = redis.call('DECR', KEYS[1])
+if n <= 0 then
+    redis.call('DEL', KEYS[1])
+end
+return n
+"""
+
+# 将到期的延迟任务移入就绪队列
+_PROMOTE_DUE_LUA = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, 100)
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('LPUSH', KEYS[2], id)
+end
+return #ids
+"""
+
+# 接管失联 worker 的领取列表：移入回收方的领取列表（回收中途崩溃时仍可再次回收）
+_CLAIM_ORPHANS_LUA = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score and tonumber(score) >= tonumber(ARGV[2]) then
+    return {}
+end
+local ids = redis.call('LRANGE', KEYS[2], 0, -1)
+for _, id in ipairs(ids) do
+    redis.call('LPUSH', KEYS[3], id)
+end
+redis.call('DEL', KEYS[2])
+redis.call('ZREM', KEYS[1], ARGV[1])
+return ids
+"""
+
+
+@dataclass
+class JobContext:
+    """任务执行上下文（传递给处理函数）"""
+    id: str
+    kind: str
+    tenant_id: Optional[str]
+    payload: dict[str, Any]
+    attempt: int
+    max_attempts: int
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    async def progress(self, percent: float, message: Optional[str] = None) -> None:
+        """上报进度（0-100）"""
+        fields = {"progress": round(min(max(percent, 0), 100), 1)}
+        if message is not None:
+            fields["message"] = message
+        try:
+            redis = await get_redis()
+            await redis.hset(_job_key(self.id), mapping=fields)
+        except Exception as e:
+            logger.warning("job_progress_failed", job_id=self.id, error=str(e))
+
+
+JobHandler = Callable[[JobContext], Awaitable[Optional[dict[str, Any]]]]
+# 状态回调: (ctx, status, error) -> None，用于同步业务表状态（如 ImportRecord.status）
+StateHook = Callable[[JobContext, str, Optional[str]], Awaitable[None]]
+
+
+@dataclass
+class _Registration:
+    handler: JobHandler
+    on_state: Optional[StateHook] = None
+
+
+_registry: dict[str, _Registration] = {}
+
+
+def job_handler(kind: str, on_state: Optional[StateHook] = None):
+    """
+    注册任务处理函数
+
+    用法:
+        @job_handler("energy_import", on_state=sync_import_record)
+        async def run_energy_import(ctx: JobContext) -> dict: ...
+    """
+    def decorator(func: JobHandler) -> JobHandler:
+        _registry[kind] = _Registration(handler=func, on_state=on_state)
+        return func
+    return decorator
+
+
+def _job_key(job_id: str) -> str:
+    return f"{JOB_KEY_PREFIX}{job_id}"
+
+
+def retry_delay(attempt: int) -> float:
+    """指数退避：base * 2^(attempt-1)，上限 job_retry_max_delay"""
+    settings = get_settings()
+    return min(settings.job_retry_base_delay * (2 ** (attempt - 1)), settings.job_retry_max_delay)
+
+
+def _decode_job(data: dict[str, str]) -> dict[str, Any]:
+    job = dict(data)
+    for name in ("payload", "result"):
+        if job.get(name):
+            job[name] = json.loads(job[name])
+    for name in ("attempts", "max_attempts"):
+        if name in job:
+            job[name] = int(job[name])
+    for name in ("progress", "created_at", "started_at", "finished_at"):
+        if job.get(name):
+            job[name] = float(job[name])
+    return job
+
+
+async def enqueue(
+    kind: str,
+    payload: dict[str, Any],
+    tenant_id: Optional[uuid.UUID | str] = None,
+    max_attempts: Optional[int] = None,
+) -> str:
+    """提交任务，返回任务 ID（Redis 不可用时抛出异常，由调用方处理）"""
+    settings = get_settings()
+    job_id = uuid.uuid4().hex
+    tenant = str(tenant_id) if tenant_id else ""
+    redis = await get_redis()
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.hset(_job_key(job_id), mapping={
+            "id": job_id,
+            "kind": kind,
+            "tenant_id": tenant,
+            "payload": json.dumps(payload, default=str),
+            "status": JobStatus.QUEUED,
+            "progress": 0,
+            "attempts": 0,
+            "max_attempts": max_attempts or settings.job_max_attempts,
+            "created_at": time.time(),
+        })
+        if tenant:
+            pipe.lpush(f"{TENANT_JOBS_PREFIX}{tenant}", job_id)
+            pipe.ltrim(f"{TENANT_JOBS_PREFIX}{tenant}", 0, TENANT_HISTORY_SIZE - 1)
+        pipe.lpush(QUEUE_KEY, job_id)
+        await pipe.execute()
+    logger.info("job_enqueued", job_id=job_id, kind=kind, tenant_id=tenant or None)
+    return job_id
+
+
+async def get_job(job_id: str) -> Optional[dict[str, Any]]:
+    """获取任务详情"""
+    redis = await get_redis()
+    data = await redis.hgetall(_job_key(job_id))
+    return _decode_job(data) if data else None
+
+
+async def list_tenant_jobs(tenant_id: uuid.UUID | str, limit: int = 20) -> list[dict[str, Any]]:
+    """获取租户最近的任务"""
+    redis = await get_redis()
+    job_ids = await redis.lrange(f"{TENANT_JOBS_PREFIX}{tenant_id}", 0, limit - 1)
+    if not job_ids:
+        return []
+    async with redis.pipeline(transaction=False) as pipe:
+        for job_id in job_ids:
+            pipe.hgetall(_job_key(job_id))
+        rows = await pipe.execute()
+    return [_decode_job(row) for row in rows if row]
+
+
+class JobWorker:
+    """
+    任务执行器
+    单进程内以 asyncio 并发执行最多 concurrency 个任务，同一租户同时运行的任务数不超过 tenant_concurrency
+    """
+
+    def __init__(
+        self,
+        concurrency: Optional[int] = None,
+        tenant_concurrency: Optional[int] = None,
+        worker_id: Optional[str] = None,
+    ):
+        settings = get_settings()
+        self.concurrency = concurrency or settings.job_worker_concurrency
+        self.tenant_concurrency = tenant_concurrency or settings.job_tenant_concurrency
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.processing_key = f"{PROCESSING_KEY_PREFIX}{self.worker_id}"
+        self.heartbeat_interval = settings.job_heartbeat_interval
+        self.visibility_timeout = settings.job_visibility_timeout
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    async def _set_status(self, ctx: JobContext, status: str, error: Optional[str] = None, **fields) -> None:
+        redis = await get_redis()
+        mapping = {"status": status, **fields}
+        if error is not None:
+            mapping["error"] = error
+        await redis.hset(_job_key(ctx.id), mapping=mapping)
+        if status in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+            await redis.expire(_job_key(ctx.id), JOB_TTL_SECONDS)
+
+        hook = _registry[ctx.kind].on_state if ctx.kind in _registry else None
+        if hook:
+            try:
+                await hook(ctx, status, error)
+            except Exception as e:
+                logger.error("job_state_hook_failed", job_id=ctx.id, status=status, error=str(e))
+
+    async def _promote_due(self) -> None:
+        redis = await get_redis()
+        await redis.eval(_PROMOTE_DUE_LUA, 2, DELAYED_KEY, QUEUE_KEY, time.time())
+
+    async def _acquire_slot(self, tenant_id: str) -> bool:
+        if not tenant_id:
+            return True
+        redis = await get_redis()
+        return bool(await redis.eval(
+            _ACQUIRE_SLOT_LUA, 1, f"{RUNNING_KEY_PREFIX}{tenant_id}",
+            self.tenant_concurrency, RUNNING_TTL_SECONDS,
+        ))
+
+    async def _release_slot(self, tenant_id: str) -> None:
+        if not tenant_id:
+            return
+        redis = await get_redis()
+        await redis.eval(_RELEASE_SLOT_LUA, 1, f"{RUNNING_KEY_PREFIX}{tenant_id}")
+
+    async def process(self, job_id: str) -> None:
+        """执行单个任务（含租户限流、重试与状态同步）"""
+        redis = await get_redis()
+        data = await redis.hgetall(_job_key(job_id))
+        if not data:
+            logger.warning("job_missing", job_id=job_id)
+            return
+        job = _decode_job(data)
+        tenant_id = job.get("tenant_id") or ""
+
+        if not await self._acquire_slot(tenant_id):
+            # 租户并发已满：延后重新排队，不计入重试次数
+            await redis.zadd(DELAYED_KEY, {job_id: time.time() + TENANT_DEFER_SECONDS})
+            return
+
+        attempt = job["attempts"] + 1
+        ctx = JobContext(
+            id=job_id,
+            kind=job["kind"],
+            tenant_id=tenant_id or None,
+            payload=job.get("payload") or {},
+            attempt=attempt,
+            max_attempts=job["max_attempts"],
+        )
+        try:
+            registration = _registry.get(ctx.kind)
+            if registration is None:
+                await self._set_status(ctx, JobStatus.FAILED, f"未知任务类型: {ctx.kind}", finished_at=time.time())
+                return
+
+            await self._set_status(ctx, JobStatus.RUNNING, attempts=attempt, started_at=time.time())
+            started = time.perf_counter()
+            try:
+                result = await registration.handler(ctx)
+            except Exception as e:
+                retryable = not isinstance(e, PermanentJobError) and attempt < ctx.max_attempts
+                logger.warning(
+                    "job_failed", job_id=job_id, kind=ctx.kind, attempt=attempt,
+                    retryable=retryable, error=str(e),
+                )
+                if retryable:
+                    delay = retry_delay(attempt)
+                    await self._set_status(ctx, JobStatus.RETRYING, str(e), retry_at=time.time() + delay)
+                    await redis.zadd(DELAYED_KEY, {job_id: time.time() + delay})
+                else:
+                    await self._set_status(ctx, JobStatus.FAILED, str(e), finished_at=time.time())
+                return
+
+            fields = {"progress": 100, "finished_at": time.time()}
+            if result is not None:
+                fields["result"] = json.dumps(result, default=str)
+            await self._set_status(ctx, JobStatus.SUCCEEDED, **fields)
+            logger.info(
+                "job_succeeded", job_id=job_id, kind=ctx.kind, attempt=attempt,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+            )
+        finally:
+            await self._release_slot(tenant_id)
+
+    async def _run_one(self, job_id: str) -> None:
+        try:
+            await self.process(job_id)
+        except Exception as e:
+            logger.error("job_process_error", job_id=job_id, error=str(e))
+        finally:
+            self._semaphore.release()
+            try:
+                redis = await get_redis()
+                await redis.lrem(self.processing_key, 1, job_id)
+            except Exception as e:
+                # 留在领取列表中的任务会在本 worker 退出后被回收
+                logger.warning("job_unclaim_failed", job_id=job_id, error=str(e))
+
+    async def heartbeat(self) -> None:
+        redis = await get_redis()
+        await redis.zadd(WORKERS_KEY, {self.worker_id: time.time()})
+
+    async def reap(self) -> int:
+        """回收心跳超时的 worker 已领取的任务，返回回收的任务数"""
+        redis = await get_redis()
+        cutoff = time.time() - self.visibility_timeout
+        reaped = 0
+        for worker_id in await redis.zrangebyscore(WORKERS_KEY, "-inf", cutoff):
+            if worker_id == self.worker_id:
+                continue
+            job_ids = await redis.eval(
+                _CLAIM_ORPHANS_LUA, 3, WORKERS_KEY, f"{PROCESSING_KEY_PREFIX}{worker_id}", self.processing_key,
+                worker_id, cutoff,
+            )
+            for job_id in job_ids:
+                await self._recover(job_id, worker_id)
+                reaped += 1
+        return reaped
+
+    async def _recover(self, job_id: str, worker_id: str) -> None:
+        """失联 worker 的任务：未达最大尝试次数时重新排队，否则标记失败（同步业务表状态）"""
+        redis = await get_redis()
+        data = await redis.hgetall(_job_key(job_id))
+        job = _decode_job(data) if data else None
+        if job is None or job["status"] in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+            # 执行结束后、移出领取列表前失联
+            await redis.lrem(self.processing_key, 1, job_id)
+            return
+
+        ctx = JobContext(
+            id=job_id,
+            kind=job["kind"],
+            tenant_id=job.get("tenant_id") or None,
+            payload=job.get("payload") or {},
+            attempt=job["attempts"],
+            max_attempts=job["max_attempts"],
+        )
+        error = f"worker 失联: {worker_id}"
+        # 未开始执行或已进入延迟队列（限流/退避）的任务不重复排队
+        requeue = await redis.zscore(DELAYED_KEY, job_id) is None
+        if job["status"] == JobStatus.RUNNING:
+            await self._release_slot(job.get("tenant_id") or "")
+            requeue = job["attempts"] < job["max_attempts"]
+            if requeue:
+                await self._set_status(ctx, JobStatus.RETRYING, error)
+            else:
+                await self._set_status(ctx, JobStatus.FAILED, error, finished_at=time.time())
+
+        async with redis.pipeline(transaction=True) as pipe:
+            if requeue:
+                pipe.lpush(QUEUE_KEY, job_id)
+            pipe.lrem(self.processing_key, 1, job_id)
+            await pipe.execute()
+        logger.warning(
+            "job_reaped", job_id=job_id, kind=ctx.kind, worker_id=worker_id,
+            attempts=job["attempts"], requeued=requeue,
+        )
+
+    async def _maintain(self) -> None:
+        """定期上报心跳并回收失联 worker 的任务（持续到运行中的任务结束）"""
+        while True:
+            try:
+                await self.heartbeat()
+                await self.reap()
+            except Exception as e:
+                logger.warning("job_heartbeat_failed", worker_id=self.worker_id, error=str(e))
+            await asyncio.sleep(self.heartbeat_interval)
+
+    async def run(self, poll_timeout: int = 1) -> None:
+        """主循环：拉取任务并并发执行，直到 stop() 被调用"""
+        logger.info(
+            "job_worker_started", worker_id=self.worker_id,
+            concurrency=self.concurrency, tenant_concurrency=self.tenant_concurrency,
+        )
+        try:
+            await self.heartbeat()  # 领取任务前登记，崩溃时已领取的任务可被回收
+        except Exception as e:
+            logger.warning("job_heartbeat_failed", worker_id=self.worker_id, error=str(e))
+        maintainer = asyncio.create_task(self._maintain())
+        try:
+            await self._poll(poll_timeout)
+            # 等待运行中的任务结束（期间继续上报心跳）
+            if self._tasks:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+        finally:
+            maintainer.cancel()
+            await asyncio.gather(maintainer, return_exceptions=True)
+
+        try:
+            redis = await get_redis()
+            if not await redis.llen(self.processing_key):
+                await redis.zrem(WORKERS_KEY, self.worker_id)
+        except Exception as e:
+            logger.warning("job_worker_unregister_failed", worker_id=self.worker_id, error=str(e))
+        logger.info("job_worker_stopped", worker_id=self.worker_id)
+
+    async def _poll(self, poll_timeout: int) -> None:
+        backoff = 1
+        while not self._stopping.is_set():
+            await self._semaphore.acquire()
+            try:
+                await self._promote_due()
+                redis = await get_redis()
+                # 原子移入本 worker 的领取列表，进程崩溃时任务不会丢失
+                item = await redis.blmove(QUEUE_KEY, self.processing_key, poll_timeout, "RIGHT", "LEFT")
+                backoff = 1
+            except Exception as e:
+                self._semaphore.release()
+                logger.warning("job_worker_redis_error", error=str(e), retry_in=backoff)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+
+            if item is None:
+                self._semaphore.release()
+                continue
+            task = asyncio.create_task(self._run_one(item))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
@@ -1,18 +1,37 @@
 """
 Prometheus 监控模块
 P2: 应用指标收集和暴露
+
+- 请求指标按匹配到的路由模板打标签（/api/v1/data/energy/{id}），未匹配的请求归为 <unmatched>
+- 租户标签只保留请求量前 N 的租户，其余归为 other，避免基数随租户数增长
+- 多进程模式：设置 PROMETHEUS_MULTIPROC_DIR 后各 uvicorn worker 写入共享目录，/metrics 汇总所有 worker
+- 数据库查询：通过引擎事件按语句指纹记录耗时与返回行数，统计每个请求的查询次数，记录慢查询
 """
 
+import contextvars
+import hashlib
+import os
+import re
 import time
-from typing import Callable
-from functools import wraps
+from collections import Counter as TallyCounter
+from functools import lru_cache
+from typing import Any, Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
 
 from fastapi import Response
 from starlette.types import ASGIApp, Scope, Receive, Send, Message
 
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.core.middleware.auth import get_auth_claims
+
+logger = get_logger("core.metrics")
+
 try:
     from prometheus_client import (
-        Counter, Histogram, Gauge, Info,
+        Counter, Histogram, Gauge,
         generate_latest, CONTENT_TYPE_LATEST,
         CollectorRegistry, multiprocess, REGISTRY
     )
@@ -39,11 +58,12 @@ if PROMETHEUS_AVAILABLE:
         buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
     )
     
-    # 活跃请求数
+    # 活跃请求数（路由匹配前无法确定模板，仅按方法统计；多进程模式下汇总存活 worker）
     REQUESTS_IN_PROGRESS = Gauge(
         "carbonos_http_requests_in_progress",
         "正在处理的 HTTP 请求数",
-        ["method", "endpoint"]
+        ["method"],
+        multiprocess_mode="livesum"
     )
     
     # 数据库查询计数
@@ -53,14 +73,65 @@ if PROMETHEUS_AVAILABLE:
         ["operation", "table"]
     )
     
-    # 数据库查询延迟
+    # 数据库查询延迟（按语句指纹，指纹对应的 SQL 见慢查询日志）
     DB_QUERY_LATENCY = Histogram(
         "carbonos_db_query_duration_seconds",
         "数据库查询延迟（秒）",
-        ["operation", "table"],
+        ["operation", "table", "fingerprint"],
         buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
     )
     
+    # 查询返回/影响的行数
+    DB_QUERY_ROWS = Histogram(
+        "carbonos_db_query_rows",
+        "单条语句返回或影响的行数",
+        ["operation", "table", "fingerprint"],
+        buckets=[0, 1, 10, 100, 1000, 10000, 100000]
+    )
+    
+    # 每个 HTTP 请求执行的查询数（N+1 会表现为高分位数）
+    DB_QUERIES_PER_REQUEST = Histogram(
+        "carbonos_db_queries_per_request",
+        "单个 HTTP 请求执行的数据库查询数",
+        ["endpoint"],
+        buckets=[0, 1, 2, 5, 10, 20, 50, 100, 200]
+    )
+    
+    # 连接池（pool: primary / replica；多进程模式下汇总存活 worker，与 Postgres max_connections 对比）
+    DB_POOL_CAPACITY = Gauge(
+        "carbonos_db_pool_capacity",
+        "连接池容量（pool_size + max_overflow）",
+        ["pool"],
+        multiprocess_mode="livesum"
+    )
+    
+    DB_POOL_IN_USE = Gauge(
+        "carbonos_db_pool_connections_in_use",
+        "已取出使用中的连接数",
+        ["pool"],
+        multiprocess_mode="livesum"
+    )
+    
+    DB_POOL_OVERFLOW = Gauge(
+        "carbonos_db_pool_overflow_connections",
+        "超出 pool_size 的溢出连接数",
+        ["pool"],
+        multiprocess_mode="livesum"
+    )
+    
+    DB_POOL_WAIT = Histogram(
+        "carbonos_db_pool_checkout_wait_seconds",
+        "从连接池取连接的等待时间（秒，含新建连接）",
+        ["pool"],
+        buckets=[0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0]
+    )
+    
+    DB_REPLICA_LAG = Gauge(
+        "carbonos_db_replica_lag_seconds",
+        "只读副本复制延迟（秒，最近一次检查）",
+        multiprocess_mode="max"
+    )
+    
     # 缓存命中率
     CACHE_HITS = Counter(
         "carbonos_cache_hits_total",
@@ -81,10 +152,12 @@ if PROMETHEUS_AVAILABLE:
         ["tenant_id"]
     )
     
-    # 应用信息
-    APP_INFO = Info(
-        "carbonos_app",
-        "CarbonOS 应用信息"
+    # 应用信息（Info 不支持多进程模式，以取值为 1 的 Gauge 输出同名指标）
+    APP_INFO = Gauge(
+        "carbonos_app_info",
+        "CarbonOS 应用信息",
+        ["version", "name"],
+        multiprocess_mode="max"
     )
 
 
@@ -93,10 +166,90 @@ def init_metrics():
     if not PROMETHEUS_AVAILABLE:
         return
     
-    APP_INFO.info({
-        "version": "0.1.0",
-        "name": "CarbonOS API",
-    })
+    APP_INFO.labels(version="0.1.0", name="CarbonOS API").set(1)
+
+
+def is_multiprocess() -> bool:
+    """是否启用多进程模式（uvicorn --workers N）"""
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def shutdown_metrics():
+    """进程退出时调用：清理本进程的 livesum 数据"""
+    if PROMETHEUS_AVAILABLE and is_multiprocess():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+UNMATCHED_ROUTE = "<unmatched>"
+NO_TENANT = "unknown"
+OTHER_TENANTS = "other"
+
+
+class RouteLabels:
+    """
+    路由模板标签
+    每个路由对象只解析一次；模板中缺少的前缀（如 include_router 的 /api/v1）由本次请求路径推出
+    """
+
+    def __init__(self):
+        self._labels: dict[int, str] = {}
+
+    def resolve(self, scope: Scope) -> str:
+        route = scope.get("route")
+        if route is None:
+            return UNMATCHED_ROUTE
+        label = self._labels.get(id(route))
+        if label is None:
+            label = self._template(route, scope)
+            self._labels[id(route)] = label
+        return label
+
+    @staticmethod
+    def _template(route, scope: Scope) -> str:
+        template = getattr(route, "path_format", None) or getattr(route, "path", None)
+        if not template:
+            return UNMATCHED_ROUTE
+        rendered = template
+        for name, value in scope.get("path_params", {}).items():
+            rendered = rendered.replace(f"{{{name}}}", str(value))
+        path = scope.get("path", "")
+        if rendered != path and path.endswith(rendered):
+            return path[:-len(rendered)] + template
+        return template
+
+
+class TenantLabels:
+    """
+    租户标签（有界基数）
+    周期性按请求量选出前 N 个租户单独打标签，其余租户归为 other；
+    计数每个周期减半，反映近期流量
+    """
+
+    def __init__(self, top_n: int, refresh_interval: float = 60):
+        self.top_n = top_n
+        self.refresh_interval = refresh_interval
+        self._counts: dict[str, int] = {}
+        self._labeled: set[str] = set()
+        self._refreshed_at = time.monotonic()
+
+    def label(self, tenant_id: Optional[str]) -> str:
+        if not tenant_id:
+            return NO_TENANT
+        self._counts[tenant_id] = self._counts.get(tenant_id, 0) + 1
+
+        if time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            self._refresh()
+        elif tenant_id not in self._labeled and len(self._labeled) < self.top_n:
+            # 名额未满时直接纳入（租户较少的部署无需等待刷新）
+            self._labeled.add(tenant_id)
+
+        return tenant_id if tenant_id in self._labeled else OTHER_TENANTS
+
+    def _refresh(self) -> None:
+        ranked = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        self._labeled = {tenant_id for tenant_id, _ in ranked[:self.top_n]}
+        self._counts = {tenant_id: count // 2 for tenant_id, count in ranked if count > 1}
+        self._refreshed_at = time.monotonic()
 
 
 class PrometheusMiddleware:
@@ -106,37 +259,22 @@ class PrometheusMiddleware:
     """
 
     # 跳过指标收集的路径
-    SKIP_PATHS = [
+    SKIP_PATHS = (
         "/metrics",
         "/health",
         "/docs",
         "/openapi.json",
         "/redoc",
-    ]
+    )
 
-    def __init__(self, app: ASGIApp, enabled: bool = True):
+    def __init__(self, app: ASGIApp, enabled: bool = True, top_tenants: Optional[int] = None):
         self.app = app
         self.enabled = enabled and PROMETHEUS_AVAILABLE
+        self.routes = RouteLabels()
+        self.tenants = TenantLabels(top_tenants or get_settings().metrics_top_tenants)
 
     def _should_skip(self, path: str) -> bool:
-        return any(path.startswith(skip) for skip in self.SKIP_PATHS)
-
-    def _normalize_path(self, path: str) -> str:
-        """
-        归一化路径，避免基数爆炸
-        /api/v1/users/123 -> /api/v1/users/{id}
-        """
-        import re
-        # UUID 替换
-        path = re.sub(
-            r'[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}',
-            '{id}',
-            path,
-            flags=re.IGNORECASE
-        )
-        # 数字 ID 替换
-        path = re.sub(r'/\d+', '/{id}', path)
-        return path
+        return path.startswith(self.SKIP_PATHS)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http" or not self.enabled:
@@ -149,12 +287,15 @@ class PrometheusMiddleware:
             return
 
         method = scope.get("method", "UNKNOWN")
-        normalized_path = self._normalize_path(path)
-        tenant_id = "unknown" # In raw ASGI, tenant_id would need to be extracted from headers or query params if available
+        claims = get_auth_claims(scope)
+        tenant_label = self.tenants.label((claims or {}).get("tenant_id"))
         status_code = 500
 
         # 增加活跃请求计数
-        REQUESTS_IN_PROGRESS.labels(method=method, endpoint=normalized_path).inc()
+        in_progress = REQUESTS_IN_PROGRESS.labels(method=method)
+        in_progress.inc()
+        queries = RequestQueries()
+        queries_token = _request_queries.set(queries)
         start_time = time.perf_counter()
 
         async def send_wrapper(message: Message) -> None:
@@ -170,19 +311,25 @@ class PrometheusMiddleware:
             raise
         finally:
             duration = time.perf_counter() - start_time
-            REQUEST_LATENCY.labels(method=method, endpoint=normalized_path).observe(duration)
+            # 路由在应用内部匹配，请求结束后从 scope 读取
+            endpoint = self.routes.resolve(scope)
+            REQUEST_LATENCY.labels(method=method, endpoint=endpoint).observe(duration)
 
             REQUEST_COUNT.labels(
                 method=method,
-                endpoint=normalized_path,
+                endpoint=endpoint,
                 status_code=str(status_code),
-                tenant_id=str(tenant_id)
+                tenant_id=tenant_label
             ).inc()
 
-            if tenant_id != "unknown":
-                TENANT_REQUESTS.labels(tenant_id=str(tenant_id)).inc()
+            if tenant_label != NO_TENANT:
+                TENANT_REQUESTS.labels(tenant_id=tenant_label).inc()
+
+            _request_queries.reset(queries_token)
+            DB_QUERIES_PER_REQUEST.labels(endpoint=endpoint).observe(queries.total)
+            queries.warn_if_excessive(method, endpoint)
 
-            REQUESTS_IN_PROGRESS.labels(method=method, endpoint=normalized_path).dec()
+            in_progress.dec()
 
 
 async def metrics_endpoint() -> Response:
@@ -196,41 +343,170 @@ async def metrics_endpoint() -> Response:
             status_code=503
         )
     
+    registry = REGISTRY
+    if is_multiprocess():
+        # 每次抓取时汇总所有 worker 写入的数据
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    
     return Response(
-        content=generate_latest(REGISTRY),
+        content=generate_latest(registry),
         media_type=CONTENT_TYPE_LATEST
     )
 
 
-# ============ 装饰器：用于手动记录指标 ============
+# ============ 数据库查询指标 ============
+
+# 语句指纹上限，超出后归入 other（防止动态拼接 SQL 导致标签基数失控）
+MAX_QUERY_FINGERPRINTS = 1000
+
+_WHITESPACE = re.compile(r"\s+")
+_PLACEHOLDER = re.compile(r"\$\d+|%\(\w+\)s|(?<!:):\w+|\?")
+_NUMBER = re.compile(r"\b\d+\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r"\bIN \((?:\?(?:::\w+(?:\[\])?)?, )*\?(?:::\w+(?:\[\])?)?\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"(\bVALUES \([^()]*\))(?:, \([^()]*\))+", re.IGNORECASE)
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN)\s+\"?([\w.]+)", re.IGNORECASE)
+
+_fingerprints: set[str] = set()
 
-def track_db_query(operation: str, table: str):
+
+@lru_cache(maxsize=4096)
+def fingerprint_statement(statement: str) -> tuple[str, str, str, str]:
     """
-    装饰器：记录数据库查询指标
-    
-    使用示例:
-    @track_db_query("select", "users")
-    async def get_user(user_id: str):
-        ...
+    语句归一化：去掉参数占位符/字面量，折叠 IN 列表与多行 VALUES
+    返回 (操作, 主表, 指纹, 归一化 SQL)
     """
-    def decorator(func: Callable):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            if not PROMETHEUS_AVAILABLE:
-                return await func(*args, **kwargs)
-            
-            start_time = time.perf_counter()
-            try:
-                result = await func(*args, **kwargs)
-                return result
-            finally:
-                duration = time.perf_counter() - start_time
-                DB_QUERY_COUNT.labels(operation=operation, table=table).inc()
-                DB_QUERY_LATENCY.labels(operation=operation, table=table).observe(duration)
-        
-        return wrapper
-    return decorator
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _VALUES_LIST.sub(r"\1, ...", normalized)
+
+    operation = normalized.split(" ", 1)[0].lower() or "unknown"
+    table_match = _TABLE.search(normalized)
+    table = table_match.group(1).lower() if table_match else "none"
+
+    fingerprint = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+    if fingerprint not in _fingerprints:
+        if len(_fingerprints) >= MAX_QUERY_FINGERPRINTS:
+            fingerprint = "other"
+        else:
+            _fingerprints.add(fingerprint)
+    return operation, table, fingerprint, normalized
+
+
+class RequestQueries:
+    """单个 HTTP 请求内的查询统计"""
+
+    def __init__(self):
+        self.total = 0
+        self.by_fingerprint: TallyCounter[str] = TallyCounter()
+
+    def add(self, fingerprint: str) -> None:
+        self.total += 1
+        self.by_fingerprint[fingerprint] += 1
+
+    def warn_if_excessive(self, method: str, endpoint: str) -> None:
+        threshold = get_settings().db_request_query_warn
+        if threshold and self.total >= threshold:
+            fingerprint, repeats = self.by_fingerprint.most_common(1)[0]
+            logger.warning(
+                "db_queries_per_request_high",
+                method=method,
+                endpoint=endpoint,
+                queries=self.total,
+                top_fingerprint=fingerprint,  # 同一指纹大量重复通常意味着 N+1
+                top_fingerprint_count=repeats,
+            )
+
+
+_request_queries: contextvars.ContextVar[Optional[RequestQueries]] = contextvars.ContextVar(
+    "request_queries", default=None
+)
+
+
+def _statement_rows(cursor: Any) -> Optional[int]:
+    """语句返回/影响的行数；SELECT 的 rowcount 为 -1，取异步适配器预取的结果行"""
+    if cursor.rowcount is not None and cursor.rowcount >= 0:
+        return cursor.rowcount
+    rows = getattr(cursor, "_rows", None)
+    return len(rows) if rows is not None else None  # 服务端游标（流式）无法预知行数
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    duration = time.perf_counter() - started
+    operation, table, fingerprint, normalized = fingerprint_statement(statement)
+    rows = _statement_rows(cursor)
+
+    if PROMETHEUS_AVAILABLE:
+        DB_QUERY_COUNT.labels(operation=operation, table=table).inc()
+        DB_QUERY_LATENCY.labels(operation=operation, table=table, fingerprint=fingerprint).observe(duration)
+        if rows is not None:
+            DB_QUERY_ROWS.labels(operation=operation, table=table, fingerprint=fingerprint).observe(rows)
+
+    queries = _request_queries.get()
+    if queries is not None:
+        queries.add(fingerprint)
+
+    duration_ms = duration * 1000
+    if duration_ms >= get_settings().db_slow_query_ms:
+        # 只记录归一化 SQL，不记录参数（可能包含敏感数据）
+        logger.warning(
+            "db_slow_query",
+            duration_ms=round(duration_ms, 2),
+            operation=operation,
+            table=table,
+            fingerprint=fingerprint,
+            rows=rows,
+            executemany=executemany,
+            statement=normalized[:2000],
+        )
+
+
+def _handle_error(exception_context):
+    # 出错时 after_cursor_execute 不会触发，丢弃对应的开始时间
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """为异步引擎注册查询指标事件（重复调用无副作用）"""
+    sync_engine = engine.sync_engine
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def record_pool_usage(
+    pool: str, capacity: int, in_use: int, overflow: int, wait: Optional[float] = None
+) -> None:
+    """更新连接池指标（由连接池在取出/归还连接后调用）"""
+    if not PROMETHEUS_AVAILABLE:
+        return
+    DB_POOL_CAPACITY.labels(pool=pool).set(capacity)
+    DB_POOL_IN_USE.labels(pool=pool).set(in_use)
+    DB_POOL_OVERFLOW.labels(pool=pool).set(overflow)
+    if wait is not None:
+        DB_POOL_WAIT.labels(pool=pool).observe(wait)
+
+
+def record_replica_lag(lag: float) -> None:
+    """记录只读副本复制延迟"""
+    if PROMETHEUS_AVAILABLE:
+        DB_REPLICA_LAG.set(lag)
+
 
+# ============ 缓存指标 ============
 
 def record_cache_hit(cache_type: str = "default"):
     """记录缓存命中"""
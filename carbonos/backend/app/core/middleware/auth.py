@@ -0,0 +1,43 @@
+"""
+认证声明中间件（纯 ASGI）
+每个请求只解析一次 Bearer Token，验证后的 claims 写入 scope["state"]，
+供多租户上下文、限流、Prometheus 标签与 get_current_user 共用。
+"""
+
+from typing import Any
+
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from app.core.middleware.headers import get_header
+from app.core.security import decode_token_cached
+
+# scope["state"] 中的键（路由内可通过 request.state.auth_claims 读取）
+AUTH_CLAIMS_KEY = "auth_claims"
+
+
+def get_auth_claims(scope: Scope) -> dict[str, Any] | None:
+    """获取已验证的 JWT claims；未携带或无效 Token 时返回 None"""
+    return scope.get("state", {}).get(AUTH_CLAIMS_KEY)
+
+
+class AuthClaimsMiddleware:
+    """
+    认证声明中间件（纯 ASGI）
+    需位于其他读取 claims 的中间件之外（最后添加）
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        claims = None
+        auth_header = get_header(scope, "authorization")
+        if auth_header.startswith("Bearer "):
+            claims = decode_token_cached(auth_header[7:])
+
+        scope.setdefault("state", {})[AUTH_CLAIMS_KEY] = claims
+        await self.app(scope, receive, send)
@@ -0,0 +1,47 @@
+"""
+请求头索引
+每个请求只解码一次 scope["headers"]，结果缓存在 scope 上，供各层中间件共用
+"""
+
+from starlette.types import Scope
+
+# scope 扩展键（ASGI 允许服务器/中间件附加自定义键）
+_HEADERS_KEY = "carbonos.headers"
+_CLIENT_IP_KEY = "carbonos.client_ip"
+
+
+def get_headers(scope: Scope) -> dict[str, str]:
+    """
+    请求头索引：名称小写（ASGI 规范保证），重复的请求头按 HTTP 语义以逗号合并
+    """
+    headers = scope.get(_HEADERS_KEY)
+    if headers is None:
+        raw = scope.get("headers", [])
+        headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in raw}
+        if len(headers) != len(raw):
+            headers = {}
+            for key, value in raw:
+                name = key.decode("latin-1")
+                decoded = value.decode("latin-1")
+                headers[name] = f"{headers[name]}, {decoded}" if name in headers else decoded
+        scope[_HEADERS_KEY] = headers
+    return headers
+
+
+def get_header(scope: Scope, name: str) -> str:
+    """获取单个请求头（name 小写），不存在时返回空字符串"""
+    return get_headers(scope).get(name, "")
+
+
+def get_client_ip(scope: Scope) -> str:
+    """客户端 IP：优先 X-Forwarded-For 的第一个地址"""
+    client_ip = scope.get(_CLIENT_IP_KEY)
+    if client_ip is None:
+        forwarded = get_headers(scope).get("x-forwarded-for")
+        if forwarded:
+            client_ip = forwarded.split(",")[0].strip()
+        else:
+            client = scope.get("client")
+            client_ip = client[0] if client else "unknown"
+        scope[_CLIENT_IP_KEY] = client_ip
+    return client_ip
@@ -9,57 +9,85 @@ P2: 防止 API 滥用和 DDoS 攻击
 
 import time
 import json
+import uuid
+from typing import Optional
 from starlette.types import ASGIApp, Scope, Receive, Send, Message
 from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
 
-from app.core.cache import get_redis
+from app.core.database import async_session_maker
 from app.core.logging import get_logger
+from app.core.rate_limiter import RateLimiter, RateLimitResult
+from app.models.tenant_config import TenantConfigRepository
+from app.core.middleware.auth import get_auth_claims
+from app.core.middleware.headers import get_client_ip
 
 logger = get_logger("middleware.ratelimit")
 
 
-# ============ 工具函数 ============
+# ============ 纯 ASGI 中间件 ============
 
-def _get_client_ip(scope: Scope) -> str:
-    """从 ASGI scope 获取客户端 IP"""
-    headers = dict((k.decode(), v.decode()) for k, v in scope.get("headers", []))
-    forwarded = headers.get("x-forwarded-for")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    client = scope.get("client")
-    return client[0] if client else "unknown"
+class TenantRateLimits:
+    """
+    租户限流配置（TenantConfig.rate_limit_enabled / rate_limit_per_minute）
+    进程内缓存，配置变更最迟 TTL 秒后生效
+    """
 
+    TTL = 60
 
-def _get_header(scope: Scope, name: str) -> str:
-    """从 ASGI scope 获取请求头 (header name 小写)"""
-    for key, value in scope.get("headers", []):
-        if key.decode().lower() == name.lower():
-            return value.decode()
-    return ""
+    def __init__(self, default_limit: int):
+        self.default_limit = default_limit
+        self._cache: dict[str, tuple[float, tuple[bool, int]]] = {}
 
+    async def get(self, tenant_id: str) -> tuple[bool, int]:
+        """返回 (是否启用限流, 每分钟请求数)"""
+        entry = self._cache.get(tenant_id)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+
+        try:
+            tenant_uuid = uuid.UUID(tenant_id)
+        except ValueError:
+            return True, self.default_limit
+        try:
+            async with async_session_maker() as db:
+                config = await TenantConfigRepository(db).get_rate_limit(tenant_uuid)
+        except Exception as e:
+            logger.warning("tenant_rate_limit_load_failed", tenant_id=tenant_id, error=str(e))
+            config = entry[1] if entry is not None else (True, self.default_limit)
+        self._cache[tenant_id] = (time.monotonic() + self.TTL, config)
+        return config
+
+
+def _rate_limit_headers(result: RateLimitResult) -> list[tuple[bytes, bytes]]:
+    return [
+        (b"x-ratelimit-limit", str(result.limit).encode()),
+        (b"x-ratelimit-remaining", str(result.remaining).encode()),
+        (b"x-ratelimit-reset", str(result.reset).encode()),
+    ]
 
-# ============ 纯 ASGI 中间件 ============
 
 class RateLimitMiddleware:
     """
     基于 Redis 的 API 限流中间件（纯 ASGI）
 
-    策略：
+    策略（GCRA，每分钟配额）：
     - 未认证用户：100 请求/分钟 (按 IP)
-    - 认证用户：1000 请求/分钟 (按用户 ID)
-    - 超管用户：无限制
+    - 认证用户：按用户 ID，配额取所属租户的 TenantConfig.rate_limit_per_minute（默认 1000）
+    - 租户关闭限流或超管用户：无限制
     """
 
     ANONYMOUS_LIMIT = 100
     AUTHENTICATED_LIMIT = 1000
     WINDOW_SIZE = 60
 
-    SKIP_PATHS = ["/docs", "/openapi.json", "/redoc", "/health", "/favicon.ico"]
+    SKIP_PATHS = ("/docs", "/openapi.json", "/redoc", "/health", "/favicon.ico")
 
-    def __init__(self, app: ASGIApp, enabled: bool = True):
+    def __init__(self, app: ASGIApp, enabled: bool = True, limiter: Optional[RateLimiter] = None):
         self.app = app
         self.enabled = enabled
+        self.limiter = limiter or RateLimiter()
+        self.tenant_limits = TenantRateLimits(self.AUTHENTICATED_LIMIT)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http" or not self.enabled:
@@ -67,46 +95,36 @@ class RateLimitMiddleware:
             return
 
         path = scope.get("path", "")
-        if any(path.startswith(skip) for skip in self.SKIP_PATHS):
+        if path.startswith(self.SKIP_PATHS):
             await self.app(scope, receive, send)
             return
 
-        # 确定限流键和限制值
-        auth_header = _get_header(scope, "authorization")
-        client_ip = _get_client_ip(scope)
+        # 确定限流键和限制值（claims 由 AuthClaimsMiddleware 验证）
+        client_ip = get_client_ip(scope)
 
         key = f"ratelimit:ip:{client_ip}"
         limit = self.ANONYMOUS_LIMIT
 
-        if auth_header.startswith("Bearer "):
-            from jose import jwt, JWTError
-            from app.core.config import get_settings
-
-            settings = get_settings()
-            try:
-                token = auth_header[7:]
-                payload = jwt.decode(
-                    token,
-                    settings.secret_key,
-                    algorithms=[settings.algorithm]
-                )
-                user_id = payload.get("sub", "unknown")
-                tenant_id = payload.get("tenant_id")
-
-                # 超管不限流
-                if tenant_id is None:
-                    await self.app(scope, receive, send)
-                    return
-
-                key = f"ratelimit:user:{user_id}"
-                limit = self.AUTHENTICATED_LIMIT
-            except JWTError:
-                pass
-
-        # 检查限流
-        allowed, remaining, reset = await self._check_rate_limit(key, limit, self.WINDOW_SIZE)
-
-        if not allowed:
+        claims = get_auth_claims(scope)
+        if claims:
+            user_id = claims.get("sub", "unknown")
+            tenant_id = claims.get("tenant_id")
+
+            # 超管不限流
+            if tenant_id is None:
+                await self.app(scope, receive, send)
+                return
+
+            enabled, limit = await self.tenant_limits.get(tenant_id)
+            if not enabled:
+                await self.app(scope, receive, send)
+                return
+            key = f"ratelimit:user:{user_id}"
+
+        # 检查限流（单次原子判定）
+        result = await self.limiter.hit(key, limit, self.WINDOW_SIZE)
+
+        if not result.allowed:
             logger.warning("rate_limit_exceeded", key=key, limit=limit, client_ip=client_ip)
             response = JSONResponse(
                 status_code=429,
@@ -114,48 +132,25 @@ class RateLimitMiddleware:
                 headers={
                     "X-RateLimit-Limit": str(limit),
                     "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(reset),
-                    "Retry-After": str(reset),
+                    "X-RateLimit-Reset": str(result.reset),
+                    "Retry-After": str(result.retry_after),
                 },
             )
             await response(scope, receive, send)
             return
 
         # 注入限流响应头
+        rate_limit_headers = _rate_limit_headers(result)
+
         async def send_with_headers(message: Message) -> None:
             if message["type"] == "http.response.start":
                 headers = list(message.get("headers", []))
-                headers.append((b"x-ratelimit-limit", str(limit).encode()))
-                headers.append((b"x-ratelimit-remaining", str(remaining).encode()))
-                headers.append((b"x-ratelimit-reset", str(reset).encode()))
+                headers.extend(rate_limit_headers)
                 message["headers"] = headers
             await send(message)
 
         await self.app(scope, receive, send_with_headers)
 
-    async def _check_rate_limit(
-        self, key: str, limit: int, window: int
-    ) -> tuple[bool, int, int]:
-        """检查限流。返回: (是否允许, 剩余次数, 重置时间)"""
-        try:
-            redis = await get_redis()
-            current = await redis.get(key)
-
-            if current is None:
-                await redis.setex(key, window, 1)
-                return True, limit - 1, window
-
-            count = int(current)
-            if count >= limit:
-                ttl = await redis.ttl(key)
-                return False, 0, ttl
-
-            await redis.incr(key)
-            return True, limit - count - 1, await redis.ttl(key)
-        except Exception as e:
-            logger.warning("rate_limit_error", error=str(e))
-            return True, limit, window
-
 
 class RequestLoggingMiddleware:
     """
@@ -163,7 +158,7 @@ class RequestLoggingMiddleware:
     P1-004: 记录所有 API 请求和响应
     """
 
-    SKIP_PATHS = ["/docs", "/openapi.json", "/redoc", "/health"]
+    SKIP_PATHS = ("/docs", "/openapi.json", "/redoc", "/health")
 
     def __init__(self, app: ASGIApp, enabled: bool = True):
         self.app = app
@@ -176,7 +171,7 @@ class RequestLoggingMiddleware:
             return
 
         path = scope.get("path", "")
-        if any(path.startswith(skip) for skip in self.SKIP_PATHS):
+        if path.startswith(self.SKIP_PATHS):
             await self.app(scope, receive, send)
             return
 
@@ -225,11 +220,13 @@ class AuthRateLimitMiddleware:
     AUTH_LIMIT = 5
     AUTH_WINDOW = 15 * 60
 
-    AUTH_PATHS = ["/api/v1/auth/login", "/api/v1/auth/register"]
+    AUTH_PATHS = ("/api/v1/auth/login", "/api/v1/auth/register")
 
-    def __init__(self, app: ASGIApp, enabled: bool = True):
+    def __init__(self, app: ASGIApp, enabled: bool = True, limiter: Optional[RateLimiter] = None):
         self.app = app
         self.enabled = enabled
+        # 配额很小，不做本地预过滤，全部由 Redis 精确判定
+        self.limiter = limiter or RateLimiter(local_prefilter=False)
 
     async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         if scope["type"] != "http" or not self.enabled:
@@ -237,37 +234,26 @@ class AuthRateLimitMiddleware:
             return
 
         path = scope.get("path", "")
-        if not any(path.startswith(p) for p in self.AUTH_PATHS):
+        if not path.startswith(self.AUTH_PATHS):
             await self.app(scope, receive, send)
             return
 
-        client_ip = _get_client_ip(scope)
+        client_ip = get_client_ip(scope)
         key = f"ratelimit:auth:{client_ip}"
 
-        try:
-            redis = await get_redis()
-            current = await redis.get(key)
-
-            if current is None:
-                await redis.setex(key, self.AUTH_WINDOW, 1)
-            else:
-                count = int(current)
-                if count >= self.AUTH_LIMIT:
-                    ttl = await redis.ttl(key)
-                    logger.warning(
-                        "auth_rate_limit_exceeded",
-                        client_ip=client_ip, path=path
-                    )
-                    response = JSONResponse(
-                        status_code=429,
-                        content={"detail": f"登录尝试次数过多，请 {int(ttl / 60) + 1} 分钟后再试"},
-                        headers={"Retry-After": str(ttl)},
-                    )
-                    await response(scope, receive, send)
-                    return
-                await redis.incr(key)
-        except Exception as e:
-            logger.warning("auth_rate_limit_error", error=str(e))
+        result = await self.limiter.hit(key, self.AUTH_LIMIT, self.AUTH_WINDOW)
+        if not result.allowed:
+            logger.warning(
+                "auth_rate_limit_exceeded",
+                client_ip=client_ip, path=path
+            )
+            response = JSONResponse(
+                status_code=429,
+                content={"detail": f"登录尝试次数过多，请 {int(result.retry_after / 60) + 1} 分钟后再试"},
+                headers={"Retry-After": str(result.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
 
         await self.app(scope, receive, send)
 
@@ -4,11 +4,11 @@ P0-004: 从 JWT Token 解析 tenant_id，而非信任客户端 Header
 """
 
 import contextvars
+from functools import lru_cache
 from starlette.types import ASGIApp, Scope, Receive, Send
-from jose import jwt, JWTError
 import uuid
 
-from app.core.config import get_settings
+from app.core.middleware.auth import get_auth_claims
 
 # 全局租户上下文 (用于在请求生命周期内共享租户信息)
 tenant_context: contextvars.ContextVar[str | None] = contextvars.ContextVar("tenant_context", default=None)
@@ -23,6 +23,18 @@ PUBLIC_PATHS = [
     "/favicon.ico",
     "/",
 ]
+# "/" 仅精确匹配（作为前缀会匹配所有路径）
+_PUBLIC_PREFIXES = tuple(prefix for prefix in PUBLIC_PATHS if prefix != "/")
+
+
+@lru_cache(maxsize=4096)
+def _is_valid_uuid(value: str) -> bool:
+    """验证是有效的 UUID（按租户缓存结果）"""
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
 
 
 class TenantMiddleware:
@@ -30,46 +42,27 @@ class TenantMiddleware:
     多租户中间件（纯 ASGI）
 
     功能：
-    1. 从 JWT Token 中解析 tenant_id（安全）
+    1. 从已验证的 JWT claims 中读取 tenant_id（安全）
     2. 设置租户上下文供后续请求使用
     3. 自动跳过公开接口
     """
 
     def __init__(self, app: ASGIApp):
         self.app = app
-        self.settings = get_settings()
 
     def _is_public_path(self, path: str) -> bool:
         """检查是否为公开接口"""
-        return any(path.startswith(prefix) for prefix in PUBLIC_PATHS)
+        return path == "/" or path.startswith(_PUBLIC_PREFIXES)
 
     def _extract_tenant_from_jwt(self, scope: Scope) -> str | None:
-        """从 ASGI scope 的 Authorization Header 中提取 tenant_id"""
-        auth_header = ""
-        for key, value in scope.get("headers", []):
-            if key.decode().lower() == "authorization":
-                auth_header = value.decode()
-                break
-
-        if not auth_header or not auth_header.startswith("Bearer "):
+        """从已验证的 JWT claims（AuthClaimsMiddleware）中提取 tenant_id"""
+        claims = get_auth_claims(scope)
+        if not claims:
             return None
 
-        token = auth_header[7:]
-
-        try:
-            payload = jwt.decode(
-                token,
-                self.settings.secret_key,
-                algorithms=[self.settings.algorithm]
-            )
-            tenant_id = payload.get("tenant_id")
-
-            if tenant_id:
-                uuid.UUID(tenant_id)  # 验证是有效的 UUID
-                return tenant_id
-
-        except (JWTError, ValueError):
-            pass
+        tenant_id = claims.get("tenant_id")
+        if tenant_id and _is_valid_uuid(tenant_id):
+            return tenant_id
 
         return None
 
@@ -0,0 +1,160 @@
+"""
+游标分页与流式导出
+- keyset 分页：按 (排序列, id) 降序，游标为上一页最后一行的 (排序值, id)，深分页成本恒定
+- 流式导出：服务端游标分批读取，逐批输出 NDJSON / CSV，内存占用与导出行数无关
+
+列表接口保持返回数组，下一页游标通过响应头 X-Next-Cursor 返回（无更多数据时不返回）
+"""
+
+import base64
+import csv
+import io
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Generic, Optional, Sequence, TypeVar
+
+from fastapi import HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import Select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import InstrumentedAttribute
+
+T = TypeVar("T")
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# 流式导出每批读取的行数
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+@dataclass
+class Page(Generic[T]):
+    """一页结果"""
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(sort_value: date | datetime, row_id: uuid.UUID) -> str:
+    raw = json.dumps([sort_value.isoformat(), str(row_id)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_column: InstrumentedAttribute) -> tuple[date | datetime, uuid.UUID]:
+    """解析游标，格式错误时返回 400"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_raw, id_raw = json.loads(base64.urlsafe_b64decode(padded))
+        python_type = sort_column.type.python_type
+        sort_value = (
+            datetime.fromisoformat(sort_raw) if python_type is datetime
+            else date.fromisoformat(sort_raw)
+        )
+        return sort_value, uuid.UUID(id_raw)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="无效的分页游标")
+
+
+def keyset_query(
+    query: Select,
+    sort_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    cursor: Optional[str] = None,
+) -> Select:
+    """按 (sort_column, id) 降序排序，并从游标之后开始"""
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor, sort_column)
+        # (sort, id) < (cursor_sort, cursor_id)，展开写法便于使用复合索引
+        query = query.where(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id),
+        ))
+    return query.order_by(sort_column.desc(), id_column.desc())
+
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    sort_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+) -> Page:
+    """执行 keyset 分页查询（多取一行判断是否还有下一页）"""
+    result = await db.execute(keyset_query(query, sort_column, id_column, cursor).limit(limit + 1))
+    items = list(result.scalars().all())
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
+    return Page(items=items, next_cursor=next_cursor)
+
+
+def page_response(response: Response, page: Page) -> list:
+    """写入下一页游标响应头并返回当前页数据"""
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    return page.items
+
+
+async def stream_scalars(
+    session_maker: async_sessionmaker,
+    query: Select,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[Sequence[Any]]:
+    """
+    服务端游标分批读取 ORM 对象
+    使用独立会话：响应流在依赖注入的会话关闭之后才被消费
+    identity map 为弱引用，已输出的对象随批次释放
+    """
+    async with session_maker() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for partition in result.scalars().partitions(batch_size):
+            yield partition
+
+
+def _serialize_rows(rows: Sequence[Any], schema: type[BaseModel]) -> list[dict[str, Any]]:
+    return [schema.model_validate(row).model_dump(mode="json") for row in rows]
+
+
+async def _ndjson_body(batches: AsyncIterator[Sequence[Any]], schema: type[BaseModel]) -> AsyncIterator[str]:
+    async for rows in batches:
+        yield "".join(
+            json.dumps(item, ensure_ascii=False) + "\n" for item in _serialize_rows(rows, schema)
+        )
+
+
+async def _csv_body(batches: AsyncIterator[Sequence[Any]], schema: type[BaseModel]) -> AsyncIterator[str]:
+    fields = list(schema.model_fields)
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction="ignore")
+    buffer.write("\ufeff")  # Excel 识别 UTF-8
+    writer.writeheader()
+    async for rows in batches:
+        writer.writerows(_serialize_rows(rows, schema))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(
+    batches: AsyncIterator[Sequence[Any]],
+    schema: type[BaseModel],
+    export_format: str,
+    filename: str,
+) -> StreamingResponse:
+    """构造 NDJSON/CSV 流式导出响应"""
+    body: Callable = _csv_body if export_format == "csv" else _ndjson_body
+    return StreamingResponse(
+        body(batches, schema),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"},
+    )
@@ -0,0 +1,136 @@
+"""
+限流引擎
+- RedisGCRABackend: GCRA（通用信元速率算法）单个 Lua 脚本原子完成判定与写入，每次请求一次 Redis 往返
+- LocalTokenBucket: 进程内令牌桶；作为预过滤器时按配额的 FLOOD_FACTOR 倍放宽，
+  只拦截单个进程内就明显超出配额的洪泛流量，不访问 Redis；精确判定仍由共享后端完成
+
+两种后端实现相同的 hit(key, limit, window) 接口，可按需替换
+"""
+
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.cache import get_redis
+from app.core.logging import get_logger
+
+logger = get_logger("core.rate_limiter")
+
+
+@dataclass
+class RateLimitResult:
+    """限流判定结果（时间单位：秒）"""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset: int  # 配额完全恢复所需时间
+    retry_after: int = 0  # 被拒绝时距下一次可用的时间
+
+
+# GCRA：键中保存理论到达时间 TAT（微秒），使用 Redis 服务器时间避免多实例时钟偏差
+# 返回 {是否允许, 剩余次数, 重试等待毫秒, 恢复毫秒}
+_GCRA_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000000 + tonumber(t[2])
+local interval = tonumber(ARGV[1])
+local burst = interval * tonumber(ARGV[2])
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + interval
+local allow_at = new_tat - burst
+if allow_at > now then
+    return {0, 0, math.ceil((allow_at - now) / 1000), math.ceil((tat - now) / 1000)}
+end
+redis.call('SET', KEYS[1], string.format('%.0f', new_tat), 'PX', math.ceil((new_tat - now) / 1000))
+return {1, math.floor((now - allow_at) / interval), 0, math.ceil((new_tat - now) / 1000)}
+"""
+
+
+class RedisGCRABackend:
+    """基于 Redis 的 GCRA 限流（多进程/多实例共享配额）"""
+
+    def __init__(self):
+        self._script = None
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        redis = await get_redis()
+        if self._script is None:
+            # EVALSHA 调用，脚本缺失时自动回退 EVAL
+            self._script = redis.register_script(_GCRA_LUA)
+        interval_us = window * 1_000_000 / limit
+        allowed, remaining, retry_ms, reset_ms = await self._script(
+            keys=[key], args=[interval_us, limit], client=redis
+        )
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=int(remaining),
+            reset=math.ceil(int(reset_ms) / 1000),
+            retry_after=math.ceil(int(retry_ms) / 1000),
+        )
+
+
+class LocalTokenBucket:
+    """进程内令牌桶（容量 limit，每 window 秒补满），键数量按 LRU 限制"""
+
+    MAX_KEYS = 10000
+
+    def __init__(self, max_keys: int = MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        return self.take(key, limit, window)
+
+    def take(self, key: str, limit: int, window: int) -> RateLimitResult:
+        rate = limit / window
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (float(limit), now))
+        tokens = min(float(limit), tokens + (now - updated_at) * rate)
+
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=int(tokens),
+            reset=math.ceil((limit - tokens) / rate),
+            retry_after=0 if allowed else math.ceil((1 - tokens) / rate),
+        )
+
+
+class RateLimiter:
+    """
+    限流器：本地令牌桶预过滤 + 共享后端判定
+    后端异常时放行（与原实现一致，Redis 故障不影响业务）
+    """
+
+    # 预过滤放宽倍数：单进程内超过 FLOOD_FACTOR 倍配额才在本地拒绝
+    FLOOD_FACTOR = 2
+
+    def __init__(self, backend=None, local_prefilter: bool = True):
+        self.backend = backend or RedisGCRABackend()
+        self.prefilter = LocalTokenBucket() if local_prefilter else None
+
+    async def hit(self, key: str, limit: int, window: int) -> RateLimitResult:
+        if self.prefilter is not None:
+            local = self.prefilter.take(key, limit * self.FLOOD_FACTOR, window)
+            if not local.allowed:
+                return RateLimitResult(
+                    allowed=False, limit=limit, remaining=0,
+                    reset=local.reset, retry_after=local.retry_after,
+                )
+        try:
+            return await self.backend.hit(key, limit, window)
+        except Exception as e:
+            logger.warning("rate_limit_error", key=key, error=str(e))
+            return RateLimitResult(allowed=True, limit=limit, remaining=limit, reset=window)
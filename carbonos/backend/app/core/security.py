@@ -3,6 +3,9 @@
 """
 
 import bcrypt
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Any
 from jose import jwt
@@ -54,3 +57,33 @@ def decode_token(token: str) -> dict[str, Any] | None:
         return payload
     except jwt.JWTError:
         return None
+
+
+# ============ 已验证 Token 缓存 ============
+# 同一 Token 在有效期内会被反复提交，验签结果按 Token 哈希缓存（无效 Token 同样缓存，避免重复验签）
+
+CLAIMS_CACHE_SIZE = 4096
+# 无效 Token 的缓存时间（秒）
+INVALID_TOKEN_TTL = 60
+
+_claims_cache: OrderedDict[bytes, tuple[float, dict[str, Any] | None]] = OrderedDict()
+
+
+def decode_token_cached(token: str) -> dict[str, Any] | None:
+    """decode_token 的 LRU 缓存版本，条目在 Token 过期时失效"""
+    key = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    entry = _claims_cache.get(key)
+    if entry is not None:
+        expires_at, claims = entry
+        if expires_at > now:
+            _claims_cache.move_to_end(key)
+            return claims
+        del _claims_cache[key]
+
+    claims = decode_token(token)
+    expires_at = float(claims.get("exp", now)) if claims else now + INVALID_TOKEN_TTL
+    _claims_cache[key] = (expires_at, claims)
+    if len(_claims_cache) > CLAIMS_CACHE_SIZE:
+        _claims_cache.popitem(last=False)
+    return claims
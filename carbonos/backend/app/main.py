@@ -25,7 +25,9 @@ from app.api.pcf import router as pcf_router
 from app.api.admin import router as admin_router
 from app.api.ai import router as ai_diagnostic_router
 from app.api.survey import router as survey_router
-from app.core.database import engine, Base
+from app.api.report import router as report_router
+from app.api.jobs import router as jobs_router
+from app.core.database import engine, read_engine, Base
 from app.core.config import get_settings
 
 # 引入模型以确保建表
@@ -48,7 +50,9 @@ async def lifespan(app: FastAPI):
     """
     # 启动时
     from app.core.logging import setup_logging, get_logger
-    from app.core.cache import get_redis, close_redis
+    from app.core.cache import (
+        get_redis, close_redis, start_invalidation_listener, stop_invalidation_listener
+    )
     
     # 初始化日志
     setup_logging()
@@ -78,10 +82,26 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning("redis_connection_failed", error=str(e))
     
+    # 订阅跨 worker 缓存失效通知（排放因子表等）
+    start_invalidation_listener()
+    
+    # 缓存预热（后台执行，不阻塞启动）
+    from app.services.cache_warmer import cache_warmer
+    cache_warmer.start(warm_on_start=get_settings().cache_warm_on_startup)
+    
     yield
     
     # 关闭时
+    await cache_warmer.stop()
+    await stop_invalidation_listener()
     await close_redis()
+    await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
+    from app.core.metrics import shutdown_metrics
+    from app.services.report_generator import shutdown_render_pool
+    shutdown_render_pool()
+    shutdown_metrics()
     logger.info("application_shutdown")
 
 
@@ -147,6 +167,10 @@ app.add_middleware(RequestLoggingMiddleware, enabled=True)
 from app.core.metrics import PrometheusMiddleware, metrics_endpoint, init_metrics
 app.add_middleware(PrometheusMiddleware, enabled=not settings.debug)
 
+# 8. 认证声明中间件（最先执行：解析一次 JWT，claims 供以上中间件与 get_current_user 共用）
+from app.core.middleware.auth import AuthClaimsMiddleware
+app.add_middleware(AuthClaimsMiddleware)
+
 init_metrics()
 
 
@@ -161,6 +185,8 @@ app.include_router(simulation_router, prefix="/api/v1")
 app.include_router(pcf_router, prefix="/api/v1")
 app.include_router(admin_router, prefix="/api/v1")
 app.include_router(survey_router, prefix="/api/v1")
+app.include_router(report_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
 
 
 # ============ 健康检查 ============
@@ -8,7 +8,7 @@ from datetime import datetime
 from typing import Optional, Any
 from enum import Enum
 
-from sqlalchemy import String, DateTime, Text, Enum as SQLEnum
+from sqlalchemy import String, DateTime, Text, Enum as SQLEnum, Index
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -84,6 +84,13 @@ class AuditLog(Base):
     success: Mapped[bool] = mapped_column(default=True)
     error_message: Mapped[str | None] = mapped_column(Text)
 
+    # 游标分页：按 (timestamp, id) 倒序
+    __table_args__ = (
+        Index('ix_audit_logs_tenant_ts', 'tenant_id', 'timestamp', 'id'),
+        Index('ix_audit_logs_user_ts', 'user_id', 'timestamp', 'id'),
+        Index('ix_audit_logs_resource_ts', 'resource_type', 'resource_id', 'timestamp'),
+    )
+
 
 class AuditLogRepository:
     """审计日志仓库"""
@@ -134,7 +141,7 @@ class AuditLogRepository:
         result = await self.db.execute(
             select(AuditLog)
             .where(AuditLog.user_id == user_id)
-            .order_by(AuditLog.timestamp.desc())
+            .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
             .limit(limit)
             .offset(offset)
         )
@@ -150,7 +157,7 @@ class AuditLogRepository:
         result = await self.db.execute(
             select(AuditLog)
             .where(AuditLog.tenant_id == tenant_id)
-            .order_by(AuditLog.timestamp.desc())
+            .order_by(AuditLog.timestamp.desc(), AuditLog.id.desc())
             .limit(limit)
             .offset(offset)
         )
@@ -167,11 +174,10 @@ class AuditLogRepository:
         if resource_id:
             query = query.where(AuditLog.resource_id == resource_id)
         result = await self.db.execute(
-            query.order_by(AuditLog.timestamp.desc()).limit(limit)
+            query.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit)
         )
         return list(result.scalars().all())
 
-
 async def log_audit_event(
     db: AsyncSession,
     action: AuditAction,
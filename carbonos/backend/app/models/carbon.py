@@ -5,7 +5,11 @@ P1-005: 添加复合索引优化查询性能
 
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, Float, ForeignKey, Enum as SQLEnum, Text, Boolean, Index
+from datetime import date
+from sqlalchemy import (
+    String, DateTime, Date, Float, Integer, ForeignKey, Enum as SQLEnum, Text, Boolean,
+    Index, UniqueConstraint
+)
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 import enum
@@ -91,6 +95,8 @@ class CarbonEmission(Base):
         Index('ix_carbon_emissions_tenant_org', 'tenant_id', 'organization_id'),
         Index('ix_carbon_emissions_tenant_date', 'tenant_id', 'calculation_date'),
         Index('ix_carbon_emissions_tenant_scope', 'tenant_id', 'scope'),
+        # 仪表盘按组织+时间范围聚合
+        Index('ix_carbon_emissions_tenant_org_date', 'tenant_id', 'organization_id', 'calculation_date'),
     )
 
 
@@ -128,3 +134,70 @@ class CarbonInventory(Base):
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class EmissionRollupDaily(Base):
+    """
+    排放日汇总（预聚合）
+    由 CarbonCalculationEngine 写入排放记录时增量维护，可通过 scripts/rebuild_rollups.py 重建
+    """
+    __tablename__ = "emission_rollups"
+    
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        primary_key=True, 
+        default=uuid.uuid4
+    )
+    tenant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("tenants.id"),
+        nullable=False
+    )
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        ForeignKey("organizations.id"),
+        nullable=False
+    )
+    scope: Mapped[EmissionScope] = mapped_column(SQLEnum(EmissionScope), nullable=False)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    emission_amount: Mapped[float] = mapped_column(Float, nullable=False, default=0)  # tCO2e
+    record_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'organization_id', 'scope', 'day', name='uq_emission_rollups_key'),
+        Index('ix_emission_rollups_tenant_day', 'tenant_id', 'day'),
+    )
+
+
+class EmissionRollupMonthly(Base):
+    """排放月汇总（预聚合），month 为当月 1 日"""
+    __tablename__ = "emission_rollups_monthly"
+    
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        primary_key=True, 
+        default=uuid.uuid4
+    )
+    tenant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("tenants.id"),
+        nullable=False
+    )
+    organization_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), 
+        ForeignKey("organizations.id"),
+        nullable=False
+    )
+    scope: Mapped[EmissionScope] = mapped_column(SQLEnum(EmissionScope), nullable=False)
+    month: Mapped[date] = mapped_column(Date, nullable=False)
+    emission_amount: Mapped[float] = mapped_column(Float, nullable=False, default=0)  # tCO2e
+    record_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        UniqueConstraint('tenant_id', 'organization_id', 'scope', 'month', name='uq_emission_rollups_monthly_key'),
+        Index('ix_emission_rollups_monthly_tenant_month', 'tenant_id', 'month'),
+    )
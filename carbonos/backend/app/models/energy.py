@@ -4,7 +4,7 @@
 
 import uuid
 from datetime import datetime, date
-from sqlalchemy import String, DateTime, Date, Float, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import String, DateTime, Date, Float, ForeignKey, Enum as SQLEnum, Text, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import UUID
 import enum
@@ -32,6 +32,12 @@ class DataSource(str, enum.Enum):
     IOT = "iot"  # IoT 设备
 
 
+# API 批量提交数据的幂等键只约束 source = api 的行（手动录入/导入允许同日多条）
+# 迁移创建的 PostgreSQL 枚举使用小写标签，SQLite（create_all）按枚举名存储
+API_SOURCE_PREDICATE_POSTGRESQL = "source = 'api'"
+API_SOURCE_PREDICATE_SQLITE = "source = 'API'"
+
+
 class EnergyData(Base):
     """能源数据表"""
     __tablename__ = "energy_data"
@@ -47,6 +53,13 @@ class EnergyData(Base):
         nullable=False,
         index=True
     )
+    # SaaS 租户隔离
+    tenant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("tenants.id"),
+        nullable=False,
+        index=True
+    )
     energy_type: Mapped[EnergyType] = mapped_column(
         SQLEnum(EnergyType), 
         nullable=False,
@@ -64,6 +77,18 @@ class EnergyData(Base):
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     created_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+    
+    __table_args__ = (
+        Index('ix_energy_data_tenant_org_date', 'tenant_id', 'organization_id', 'data_date'),
+        # 游标分页：按 (data_date, id) 倒序
+        Index('ix_energy_data_tenant_date_id', 'tenant_id', 'data_date', 'id'),
+        Index(
+            'uq_energy_data_api_key', 'tenant_id', 'organization_id', 'energy_type', 'data_date',
+            unique=True,
+            postgresql_where=text(API_SOURCE_PREDICATE_POSTGRESQL),
+            sqlite_where=text(API_SOURCE_PREDICATE_SQLITE),
+        ),
+    )
 
 
 class ImportRecord(Base):
@@ -86,6 +111,12 @@ class ImportRecord(Base):
     failed_rows: Mapped[int] = mapped_column(default=0)
     status: Mapped[str] = mapped_column(String(20), default="pending")  # pending, processing, completed, failed
     error_message: Mapped[str | None] = mapped_column(Text)
+    job_id: Mapped[str | None] = mapped_column(String(32))  # 后台任务 ID，status 由任务状态驱动
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     created_by: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True))
+
+    __table_args__ = (
+        # 游标分页：按 (created_at, id) 倒序
+        Index('ix_import_records_org_created', 'organization_id', 'created_at', 'id'),
+    )
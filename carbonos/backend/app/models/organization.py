@@ -5,7 +5,9 @@
 
 import uuid
 from datetime import datetime
-from sqlalchemy import String, DateTime, ForeignKey, Text, Enum as SQLEnum
+from sqlalchemy import (
+    Integer, String, DateTime, ForeignKey, Index, Text, Enum as SQLEnum, delete, event, insert, select
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 import enum
@@ -73,6 +75,29 @@ class Organization(Base):
     )
 
 
+class OrganizationClosure(Base):
+    """
+    组织闭包表：每个 (祖先, 后代) 组合一行（含自身，depth=0）
+    子树聚合只需按 ancestor_id 取后代，按 depth=1 分组即为直接下级的分项汇总
+    """
+    __tablename__ = "organization_closure"
+    __table_args__ = (
+        Index("ix_organization_closure_descendant", "descendant_id", "depth"),
+    )
+
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("organizations.id"), primary_key=True
+    )
+    descendant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("organizations.id"), primary_key=True
+    )
+    depth: Mapped[int] = mapped_column(Integer, nullable=False)
+    # SaaS 租户隔离
+    tenant_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("tenants.id"), nullable=False
+    )
+
+
 class UserOrganization(Base):
     """用户-组织关联表（多对多）"""
     __tablename__ = "user_organizations"
@@ -96,3 +121,42 @@ class UserOrganization(Base):
     )
     role: Mapped[str] = mapped_column(String(50), default="member")  # admin, manager, member
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+@event.listens_for(Organization, "after_insert")
+def _insert_organization_closure(mapper, connection, target: Organization) -> None:
+    """
+    由父组织的闭包行生成闭包行：父组织的每个祖先深度 +1，另加自身（depth=0）
+    同一次 flush 中经 parent 关系新建的父组织先于子组织插入（含本事件），闭包行已存在；
+    组织创建后不支持移动到其他父节点
+    """
+    ancestors = []
+    if target.parent_id is not None:
+        ancestors = connection.execute(
+            select(OrganizationClosure.ancestor_id, OrganizationClosure.depth).where(
+                OrganizationClosure.descendant_id == target.parent_id,
+                OrganizationClosure.tenant_id == target.tenant_id,  # P0-002: 租户隔离
+            )
+        ).all()
+        if not ancestors:
+            raise ValueError(f"父组织不存在: {target.parent_id}")
+    connection.execute(insert(OrganizationClosure), [
+        {"ancestor_id": target.id, "descendant_id": target.id, "depth": 0, "tenant_id": target.tenant_id},
+        *(
+            {
+                "ancestor_id": ancestor_id,
+                "descendant_id": target.id,
+                "depth": depth + 1,
+                "tenant_id": target.tenant_id,
+            }
+            for ancestor_id, depth in ancestors
+        ),
+    ])
+
+
+@event.listens_for(Organization, "before_delete")
+def _delete_organization_closure(mapper, connection, target: Organization) -> None:
+    """删除组织前清理闭包行（API 只允许删除叶子组织）"""
+    connection.execute(delete(OrganizationClosure).where(
+        (OrganizationClosure.descendant_id == target.id) | (OrganizationClosure.ancestor_id == target.id)
+    ))
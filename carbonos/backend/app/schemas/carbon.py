@@ -4,9 +4,12 @@
 
 import uuid
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 
+# 单次批量核算的最大记录数
+MAX_BATCH_CALCULATION_SIZE = 10000
+
 
 class EmissionFactorBase(BaseModel):
     """排放因子基础"""
@@ -47,6 +50,19 @@ class CarbonCalculateRequest(BaseModel):
     period_end: Optional[datetime] = None
 
 
+class CarbonCalculateBatchRequest(BaseModel):
+    """批量碳核算请求"""
+    items: list[CarbonCalculateRequest] = Field(..., max_length=MAX_BATCH_CALCULATION_SIZE)
+
+
+class CarbonCalculateBatchResponse(BaseModel):
+    """批量碳核算结果"""
+    inserted: int
+    total_emission: float  # tCO2e
+    elapsed_ms: float
+    rows_per_second: float  # 吞吐量（行/秒）
+
+
 class CarbonEmissionResponse(BaseModel):
     """碳排放记录响应"""
     id: uuid.UUID
@@ -79,6 +95,13 @@ class CarbonInventoryResponse(BaseModel):
         from_attributes = True
 
 
+class OrganizationEmissionTotal(BaseModel):
+    """下级组织分项排放（含其全部下级）"""
+    organization_id: uuid.UUID
+    name: str
+    total: float
+
+
 class CarbonSummary(BaseModel):
     """碳排放汇总"""
     organization_id: uuid.UUID
@@ -88,3 +111,5 @@ class CarbonSummary(BaseModel):
     scope_3: float
     total: float
     breakdown: dict[str, float]  # 按能源类型分类
+    include_descendants: bool = False
+    children: Optional[list[OrganizationEmissionTotal]] = None  # 按直接下级分项（include_descendants 时返回）
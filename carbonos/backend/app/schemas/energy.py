@@ -4,8 +4,11 @@
 
 import uuid
 from datetime import datetime, date
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import Any, Optional
+
+# 单次批量录入的最大行数
+MAX_ENERGY_BATCH_SIZE = 50000
 
 
 class EnergyDataBase(BaseModel):
@@ -35,8 +38,29 @@ class EnergyDataResponse(EnergyDataBase):
 
 
 class EnergyDataBatch(BaseModel):
-    """批量能源数据"""
-    data: list[EnergyDataCreate]
+    """
+    批量能源数据
+    各行在服务端逐行校验（单行错误不影响其他行），因此此处不声明行类型
+    """
+    data: list[dict[str, Any]] = Field(..., max_length=MAX_ENERGY_BATCH_SIZE)
+    upsert: bool = False  # 按 (组织, 能源类型, 日期) 覆盖已提交的数据，重复提交幂等
+
+
+class EnergyDataRowError(BaseModel):
+    """批量录入的单行错误"""
+    index: int  # data 中的下标（从 0 开始）
+    field: Optional[str] = None
+    message: str
+
+
+class EnergyDataBatchResponse(BaseModel):
+    """批量能源数据录入结果"""
+    total: int
+    success_count: int  # inserted + updated
+    failed_count: int
+    inserted: int
+    updated: int
+    errors: list[EnergyDataRowError] = []
 
 
 class ImportRecordResponse(BaseModel):
@@ -49,6 +73,7 @@ class ImportRecordResponse(BaseModel):
     failed_rows: int
     status: str
     error_message: Optional[str] = None
+    job_id: Optional[str] = None
     created_at: datetime
 
     class Config:
@@ -0,0 +1,29 @@
+"""
+后台任务 Schema
+"""
+
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Any, Optional
+
+
+class JobAccepted(BaseModel):
+    """任务已提交"""
+    job_id: str
+    status: str
+
+
+class JobResponse(BaseModel):
+    """任务状态与进度"""
+    id: str
+    kind: str
+    status: str  # queued, running, retrying, succeeded, failed
+    progress: float = 0
+    message: Optional[str] = None
+    attempts: int = 0
+    max_attempts: int = 0
+    error: Optional[str] = None
+    result: Optional[dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
@@ -15,6 +15,8 @@ from app.models.user import User, UserRole, UserStatus
 from app.models.tenant import Tenant, TenantPlan
 from app.models.organization import Organization, OrganizationType
 from app.models.carbon import CarbonEmission, EmissionScope, EmissionFactor
+from app.services.rollup import EmissionRollupService
+from app.services.factor_cache import factor_cache
 from app.models.energy import EnergyData
 
 # 配置日志
@@ -171,6 +173,9 @@ async def seed_data():
                         )
                         db.add(emission)
                 
+                # 模拟数据绕过核算引擎直接写入，需要重建预聚合表
+                await db.flush()
+                await EmissionRollupService(db).rebuild(tenant.id)
                 logger.info("Mock data generated.")
                 
             else:
@@ -182,6 +187,8 @@ async def seed_data():
                 logger.info("Reset Test Tenant User: password/status/lockout cleared")
 
             await db.commit()
+            # 因子直接写库，需通知各 worker 重新加载因子表
+            await factor_cache.invalidate()
             logger.info("Seed completed successfully.")
             
         except Exception as e:
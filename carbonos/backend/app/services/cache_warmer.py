@@ -0,0 +1,178 @@
+"""
+缓存预热
+- 启动时：排放因子列表、平台统计，以及活跃租户近两个月有排放数据的组织的仪表盘摘要/趋势
+- 写入后：数据写入使仪表盘缓存失效（代数递增）后，重新预热写入的组织及其上级组织的子树汇总；
+  延迟 cache_warm_delay 秒合并短时间内的多次写入
+
+预热走正常读取路径（CacheManager.fetch）：已缓存的键直接返回，多个 worker 同时预热时由租约去重
+仪表盘缓存一律由主库计算：副本延迟时读到的写入前数据会以新代数键缓存，且后续预热命中缓存不会覆盖
+"""
+
+import asyncio
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.cache import CacheManager, get_redis, session_loader
+from app.core.config import get_settings
+from app.core.database import async_session_maker, replica_router
+from app.core.logging import get_logger
+from app.models.carbon import EmissionRollupMonthly
+from app.models.tenant import Tenant, TenantStatus
+from app.services.dashboard import DashboardService
+from app.services.factor_cache import load_factor_list
+from app.services.org_hierarchy import on_emissions_written
+from app.services.platform_stats import compute_global_stats
+
+logger = get_logger("services.cache_warmer")
+
+# (tenant_id, organization_id, include_descendants)
+WarmTarget = tuple[uuid.UUID, uuid.UUID, bool]
+
+
+class CacheWarmer:
+    """缓存预热器（每个进程一个实例，start 之前登记的写入事件被忽略）"""
+
+    TREND_PERIODS = ("month", "year")
+
+    def __init__(self):
+        settings = get_settings()
+        self.concurrency = settings.cache_warm_concurrency
+        self.max_organizations = settings.cache_warm_max_organizations
+        self.delay = settings.cache_warm_delay
+        self._running = False
+        self._pending: set[WarmTarget] = set()
+        self._factor_list_pending = False
+        self._startup_task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def start(self, warm_on_start: bool = True) -> None:
+        """启动预热器（应用启动时调用）；warm_on_start 时在后台执行启动预热"""
+        self._running = True
+        if warm_on_start and self._startup_task is None:
+            self._startup_task = asyncio.create_task(self.warm_startup())
+
+    async def stop(self) -> None:
+        """停止预热器，取消未完成的预热"""
+        self._running = False
+        for task in (self._startup_task, self._flush_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._startup_task = self._flush_task = None
+        self._pending.clear()
+
+    # ============ 启动预热 ============
+
+    async def warm_startup(self) -> int:
+        """预热全局缓存与近期活跃组织的仪表盘，返回预热的组织数"""
+        started = time.perf_counter()
+        try:
+            session_maker = await replica_router.session_maker()
+            cache = CacheManager(await get_redis())
+            await cache.emission_factors(session_loader(session_maker, load_factor_list))
+            await cache.global_stats(session_loader(session_maker, compute_global_stats))
+            targets = await self.active_organizations(session_maker)
+            await self.warm(async_session_maker, targets)
+        except Exception as e:
+            logger.warning("cache_warm_failed", error=str(e))
+            return 0
+        logger.info(
+            "cache_warmed",
+            organizations=len(targets),
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 2),
+        )
+        return len(targets)
+
+    async def active_organizations(self, session_maker: async_sessionmaker) -> list[WarmTarget]:
+        """活跃租户中上月以来有排放汇总的组织，按最近更新时间倒序，最多 max_organizations 个"""
+        since = (date.today().replace(day=1) - timedelta(days=1)).replace(day=1)
+        async with session_maker() as db:
+            rows = (await db.execute(
+                select(EmissionRollupMonthly.tenant_id, EmissionRollupMonthly.organization_id)
+                .join(Tenant, Tenant.id == EmissionRollupMonthly.tenant_id)
+                .where(Tenant.status == TenantStatus.ACTIVE, EmissionRollupMonthly.month >= since)
+                .group_by(EmissionRollupMonthly.tenant_id, EmissionRollupMonthly.organization_id)
+                .order_by(func.max(EmissionRollupMonthly.updated_at).desc())
+                .limit(self.max_organizations)
+            )).all()
+        return [(row.tenant_id, row.organization_id, False) for row in rows]
+
+    # ============ 写入后预热 ============
+
+    def schedule(
+        self,
+        tenant_id: uuid.UUID,
+        organization_ids: set[uuid.UUID],
+        ancestor_ids: set[uuid.UUID],
+    ) -> None:
+        """
+        数据写入回调：登记写入组织的单组织仪表盘与上级组织（含自身）的子树仪表盘
+        """
+        if not self._running:
+            return
+        self._pending.update((tenant_id, org_id, False) for org_id in organization_ids)
+        self._pending.update((tenant_id, org_id, True) for org_id in ancestor_ids)
+        self._ensure_flush()
+
+    def schedule_factor_list(self) -> None:
+        """排放因子变更后重新预热因子列表"""
+        if not self._running:
+            return
+        self._factor_list_pending = True
+        self._ensure_flush()
+
+    def _ensure_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self.delay)
+        # 刚写入的数据从主库读取，避免副本延迟导致预热旧值
+        while self._pending or self._factor_list_pending:
+            targets, self._pending = list(self._pending), set()
+            try:
+                if self._factor_list_pending:
+                    self._factor_list_pending = False
+                    await CacheManager(await get_redis()).emission_factors(
+                        session_loader(async_session_maker, load_factor_list)
+                    )
+                await self.warm(async_session_maker, targets)
+            except Exception as e:
+                logger.warning("cache_rewarm_failed", error=str(e))
+
+    # ============ 预热执行 ============
+
+    async def warm(self, session_maker: async_sessionmaker, targets: list[WarmTarget]) -> None:
+        """并发预热仪表盘摘要与趋势（并发数不超过 concurrency，每个组织一个会话）"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def warm_one(tenant_id: uuid.UUID, organization_id: uuid.UUID, include_descendants: bool) -> None:
+            async with semaphore:
+                try:
+                    async with session_maker() as db:
+                        service = DashboardService(db, session_maker)
+                        await service.get_summary(tenant_id, organization_id, include_descendants)
+                        for period in self.TREND_PERIODS:
+                            await service.get_trends(tenant_id, organization_id, period, include_descendants)
+                except Exception as e:
+                    logger.warning(
+                        "dashboard_warm_failed",
+                        tenant_id=str(tenant_id),
+                        organization_id=str(organization_id),
+                        error=str(e),
+                    )
+
+        await asyncio.gather(*(warm_one(*target) for target in targets))
+
+
+# 进程级单例
+cache_warmer = CacheWarmer()
+on_emissions_written(cache_warmer.schedule)
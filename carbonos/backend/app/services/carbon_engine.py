@@ -2,15 +2,27 @@
 碳核算引擎服务
 """
 
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Iterable, Optional, Sequence
 import uuid
 
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, or_, and_
 
+from app.core.logging import get_logger
 from app.models.carbon import EmissionFactor, CarbonEmission, EmissionScope
 from app.models.energy import EnergyType
+from app.schemas.carbon import CarbonCalculateRequest
+from app.services.factor_cache import factor_cache
+from app.services.org_hierarchy import OrganizationHierarchy
+from app.services.rollup import EmissionRollupService
+
+logger = get_logger("services.carbon_engine")
+
+# (factor_value, unit, scope, factor_id)
+ResolvedFactor = tuple[float, str, EmissionScope, Optional[uuid.UUID]]
 
 
 class CarbonCalculationEngine:
@@ -35,32 +47,115 @@ class CarbonCalculationEngine:
         energy_type: str, 
         factor_id: Optional[uuid.UUID] = None
     ) -> tuple[float, str, EmissionScope]:
-        """获取排放因子"""
+        """获取排放因子（优先读取进程内因子表）"""
+        if await factor_cache.ensure_fresh(self.db):
+            cached = factor_cache.lookup(energy_type, factor_id)
+            if cached:
+                return cached[0], cached[1], cached[2]
+        else:
+            factor = await self._query_emission_factor(energy_type, factor_id)
+            if factor:
+                return factor.factor_value, factor.unit, factor.scope
+        
+        # 使用内置默认值
+        default = self.DEFAULT_FACTORS.get(energy_type)
+        if default:
+            return default["factor"], default["unit"], EmissionScope(default["scope"])
+        
+        raise ValueError(f"未找到能源类型 {energy_type} 的排放因子")
+    
+    async def _query_emission_factor(
+        self,
+        energy_type: str,
+        factor_id: Optional[uuid.UUID] = None
+    ) -> Optional[EmissionFactor]:
+        """直接查询数据库（因子表不可用时的回退路径）"""
         if factor_id:
             result = await self.db.execute(
                 select(EmissionFactor).where(EmissionFactor.id == factor_id)
             )
             factor = result.scalar_one_or_none()
             if factor:
-                return factor.factor_value, factor.unit, factor.scope
+                return factor
         
-        # 查找默认因子
         result = await self.db.execute(
             select(EmissionFactor)
             .where(EmissionFactor.energy_type == energy_type)
             .where(EmissionFactor.is_default == True)
         )
-        factor = result.scalar_one_or_none()
+        return result.scalars().first()
+    
+    async def resolve_emission_factors(
+        self,
+        keys: Iterable[tuple[str, Optional[uuid.UUID]]],
+    ) -> dict[tuple[str, Optional[uuid.UUID]], ResolvedFactor]:
+        """
+        批量解析排放因子（因子表命中时零查询，否则单次查询）
         
-        if factor:
-            return factor.factor_value, factor.unit, factor.scope
+        与 get_emission_factor 的优先级一致：指定因子 > 库内默认因子 > 内置默认值
+        """
+        keys = set(keys)
+        if await factor_cache.ensure_fresh(self.db):
+            return self._resolve_from_cache(keys)
         
-        # 使用内置默认值
-        default = self.DEFAULT_FACTORS.get(energy_type)
-        if default:
-            return default["factor"], default["unit"], EmissionScope(default["scope"])
+        factor_ids = {factor_id for _, factor_id in keys if factor_id}
+        energy_types = {energy_type for energy_type, _ in keys}
         
-        raise ValueError(f"未找到能源类型 {energy_type} 的排放因子")
+        conditions = [
+            and_(
+                EmissionFactor.energy_type.in_(energy_types),
+                EmissionFactor.is_default == True
+            )
+        ]
+        if factor_ids:
+            conditions.append(EmissionFactor.id.in_(factor_ids))
+        
+        result = await self.db.execute(select(EmissionFactor).where(or_(*conditions)))
+        by_id: dict[uuid.UUID, EmissionFactor] = {}
+        defaults: dict[str, EmissionFactor] = {}
+        for factor in result.scalars().all():
+            by_id[factor.id] = factor
+            if factor.is_default:
+                defaults.setdefault(factor.energy_type, factor)
+        
+        resolved = {}
+        for energy_type, factor_id in keys:
+            factor = by_id.get(factor_id) if factor_id else None
+            if factor is None:
+                factor = defaults.get(energy_type)
+            if factor is not None:
+                resolved[(energy_type, factor_id)] = (
+                    factor.factor_value, factor.unit, factor.scope, factor.id
+                )
+                continue
+            
+            default = self.DEFAULT_FACTORS.get(energy_type)
+            if default is None:
+                raise ValueError(f"未找到能源类型 {energy_type} 的排放因子")
+            resolved[(energy_type, factor_id)] = (
+                default["factor"], default["unit"], EmissionScope(default["scope"]), factor_id
+            )
+        
+        return resolved
+    
+    def _resolve_from_cache(
+        self,
+        keys: set[tuple[str, Optional[uuid.UUID]]],
+    ) -> dict[tuple[str, Optional[uuid.UUID]], ResolvedFactor]:
+        """从进程内因子表解析"""
+        resolved = {}
+        for energy_type, factor_id in keys:
+            cached = factor_cache.lookup(energy_type, factor_id)
+            if cached:
+                resolved[(energy_type, factor_id)] = cached
+                continue
+            default = self.DEFAULT_FACTORS.get(energy_type)
+            if default is None:
+                raise ValueError(f"未找到能源类型 {energy_type} 的排放因子")
+            resolved[(energy_type, factor_id)] = (
+                default["factor"], default["unit"], EmissionScope(default["scope"]), factor_id
+            )
+        return resolved
     
     async def calculate_emission(
         self,
@@ -74,7 +169,11 @@ class CarbonCalculationEngine:
         tenant_id: Optional[uuid.UUID] = None,  # P0-002: 添加租户 ID 参数
     ) -> CarbonEmission:
         """计算碳排放"""
-        factor_value, factor_unit, scope = await self.get_emission_factor(energy_type, factor_id)
+        # 解析出实际使用的因子 ID（未指定时关联默认因子）
+        key = (energy_type, factor_id)
+        factor_value, factor_unit, scope, resolved_factor_id = (
+            await self.resolve_emission_factors([key])
+        )[key]
         
         # 计算排放量 (kg -> t)
         emission_kg = activity_data * factor_value
@@ -95,15 +194,97 @@ class CarbonCalculationEngine:
             calculation_date=datetime.utcnow(),
             period_start=period_start,
             period_end=period_end,
-            emission_factor_id=factor_id,  # 关联排放因子
+            emission_factor_id=resolved_factor_id,  # 关联排放因子
         )
         
         self.db.add(emission)
+        await self.db.flush()
+        # 同一事务内增量维护日/月汇总
+        await EmissionRollupService(self.db).apply([emission])
         await self.db.commit()
         await self.db.refresh(emission)
+        await OrganizationHierarchy.invalidate_emissions(self.db, tenant_id, [organization_id])
         
         return emission
     
+    async def calculate_emissions_bulk(
+        self,
+        items: Sequence[CarbonCalculateRequest],
+        tenant_id: Optional[uuid.UUID] = None,
+    ) -> dict:
+        """
+        批量计算碳排放
+        
+        因子解析一次查询，排放量使用 NumPy 整批计算，
+        所有记录在同一事务内以多行 INSERT 写入。
+        """
+        if tenant_id is None:
+            raise ValueError("tenant_id 是必填参数，用于多租户数据隔离")
+        
+        started = time.perf_counter()
+        count = len(items)
+        if count == 0:
+            return {"inserted": 0, "total_emission": 0.0, "elapsed_ms": 0.0, "rows_per_second": 0.0}
+        
+        factors = await self.resolve_emission_factors(
+            (item.energy_type, item.emission_factor_id) for item in items
+        )
+        resolved = [factors[(item.energy_type, item.emission_factor_id)] for item in items]
+        
+        # 计算排放量 (kg -> t)
+        activity = np.fromiter((item.activity_data for item in items), dtype=np.float64, count=count)
+        factor_values = np.fromiter((r[0] for r in resolved), dtype=np.float64, count=count)
+        emission_ton = activity * factor_values / 1000
+        
+        calculation_date = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "organization_id": item.organization_id,
+                "tenant_id": tenant_id,
+                "scope": scope,
+                "activity_data": item.activity_data,
+                "activity_unit": item.activity_unit,
+                "emission_amount": amount,
+                "calculation_date": calculation_date,
+                "period_start": item.period_start,
+                "period_end": item.period_end,
+                "emission_factor_id": factor_id,
+                "created_at": calculation_date,
+            }
+            for item, (_, _, scope, factor_id), amount in zip(items, resolved, emission_ton.tolist())
+        ]
+        
+        # executemany + insertmanyvalues：SQLAlchemy 按页渲染为多行 INSERT ... VALUES，
+        # 避免超出驱动的绑定参数上限
+        try:
+            await self.db.execute(insert(CarbonEmission), rows)
+            await EmissionRollupService(self.db).apply(rows)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        await OrganizationHierarchy.invalidate_emissions(
+            self.db, tenant_id, (item.organization_id for item in items)
+        )
+        
+        elapsed = time.perf_counter() - started
+        rows_per_second = count / elapsed if elapsed > 0 else 0.0
+        logger.info(
+            "emission_bulk_calculated",
+            tenant_id=str(tenant_id),
+            rows=count,
+            elapsed_ms=round(elapsed * 1000, 2),
+            rows_per_second=round(rows_per_second, 1),
+        )
+        
+        return {
+            "inserted": count,
+            "total_emission": float(emission_ton.sum()),
+            "elapsed_ms": round(elapsed * 1000, 2),
+            "rows_per_second": round(rows_per_second, 1),
+        }
+    
     @staticmethod
     def get_scope_description(scope: EmissionScope) -> str:
         """获取范围描述"""
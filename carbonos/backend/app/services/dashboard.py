@@ -0,0 +1,183 @@
+"""
+仪表盘指标服务
+核心指标基于日/月预聚合表，通过条件聚合 (FILTER WHERE) 在一次扫描中完成计算
+include_descendants 时按闭包表汇总组织及其全部下级组织（仍为单条查询）
+"""
+
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.cache import CacheManager, get_redis, session_loader
+from app.core.database import async_session_maker
+from app.core.logging import get_logger
+from app.models.carbon import EmissionRollupDaily, EmissionRollupMonthly
+from app.models.energy import EnergyData
+from app.services.org_hierarchy import organization_filter
+from app.services.timeseries import bucketed_sum
+
+logger = get_logger("services.dashboard")
+
+
+class DashboardService:
+    """仪表盘指标服务"""
+
+    # 年度排放目标 (模拟目标: 5000t)
+    YEARLY_TARGET = 5000
+
+    def __init__(self, db: AsyncSession, session_maker: Optional[async_sessionmaker] = None):
+        self.db = db
+        # 缓存未命中时的计算使用独立会话（默认主库），不绑定调用方的请求会话
+        self.session_maker = session_maker or async_session_maker
+
+    async def compute_summary(
+        self,
+        tenant_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        now: Optional[datetime] = None,
+        include_descendants: bool = False,
+    ) -> dict:
+        """单条 SQL（月汇总表）计算本月/上月/年度排放与本月费用"""
+        now = now or datetime.utcnow()
+        this_month_start = datetime(now.year, now.month, 1).date()
+        last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
+        year_start = this_month_start.replace(month=1)
+
+        amount = EmissionRollupMonthly.emission_amount
+        month = EmissionRollupMonthly.month
+
+        # 本月能耗费用（同一语句内的标量子查询）
+        cost_query = select(func.coalesce(func.sum(EnergyData.cost), 0)).where(
+            organization_filter(EnergyData.organization_id, tenant_id, organization_id, include_descendants),
+            EnergyData.tenant_id == tenant_id,  # P0-002: 租户隔离
+            EnergyData.data_date >= this_month_start
+        ).scalar_subquery()
+
+        query = select(
+            func.coalesce(func.sum(amount).filter(month >= this_month_start), 0).label("this_month"),
+            func.coalesce(func.sum(amount).filter(month == last_month_start), 0).label("last_month"),
+            func.coalesce(func.sum(amount).filter(month >= year_start), 0).label("this_year"),
+            cost_query.label("total_cost"),
+        ).where(
+            organization_filter(EmissionRollupMonthly.organization_id, tenant_id, organization_id, include_descendants),
+            EmissionRollupMonthly.tenant_id == tenant_id,  # P0-002: 租户隔离
+            month >= min(last_month_start, year_start)
+        )
+
+        row = (await self.db.execute(query)).one()
+        return self._build_summary(row.this_month, row.last_month, row.this_year, row.total_cost)
+
+    @classmethod
+    def _build_summary(
+        cls,
+        total_emission: float,
+        last_emission: float,
+        current_year_emission: float,
+        total_cost: float,
+    ) -> dict:
+        total_emission = total_emission or 0
+        last_emission = last_emission or 0
+        current_year_emission = current_year_emission or 0
+        total_cost = total_cost or 0
+
+        emission_trend = ((total_emission - last_emission) / last_emission * 100) if last_emission > 0 else 0
+        progress = min(round((current_year_emission / cls.YEARLY_TARGET) * 100, 1), 100)
+
+        return {
+            "total_emission": round(total_emission, 2),
+            "emission_trend": round(emission_trend, 1),
+            "total_cost": round(total_cost, 2),
+            "year_progress": progress,
+            "year_target": cls.YEARLY_TARGET,
+            "current_year_emission": round(current_year_emission, 2)
+        }
+
+    async def get_summary(
+        self,
+        tenant_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        include_descendants: bool = False,
+    ) -> dict:
+        """获取仪表盘摘要（优先读取缓存，并发未命中只计算一次；Redis 不可用时直接计算）"""
+        try:
+            cache = CacheManager(await get_redis())
+        except Exception as e:
+            logger.warning("dashboard_cache_unavailable", error=str(e))
+            return await self.compute_summary(tenant_id, organization_id, include_descendants=include_descendants)
+
+        load = session_loader(
+            self.session_maker,
+            lambda db: DashboardService(db).compute_summary(
+                tenant_id, organization_id, include_descendants=include_descendants
+            ),
+        )
+        return await cache.dashboard_summary(
+            str(tenant_id), str(organization_id), load, subtree=include_descendants
+        )
+
+    async def compute_trends(
+        self,
+        tenant_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        period: str = "month",
+        now: Optional[datetime] = None,
+        include_descendants: bool = False,
+    ) -> list[dict]:
+        """排放趋势：year 为最近 12 个月，其余为最近 30 天（单次查询，空桶补零）"""
+        now = now or datetime.utcnow()
+        if period == "year":
+            unit, periods, model, column = "month", 12, EmissionRollupMonthly, EmissionRollupMonthly.month
+        else:
+            unit, periods, model, column = "day", 30, EmissionRollupDaily, EmissionRollupDaily.day
+
+        series = await bucketed_sum(
+            self.db,
+            model.emission_amount,
+            column,
+            [
+                organization_filter(model.organization_id, tenant_id, organization_id, include_descendants),
+                model.tenant_id == tenant_id,  # P0-002: 租户隔离
+            ],
+            end=now,
+            unit=unit,
+            periods=periods,
+        )
+
+        return [
+            {
+                "name": f"{start.month}月" if unit == "month" else f"{start.day}日",
+                "value": round(total, 2)
+            }
+            for start, total in series
+        ]
+
+    async def get_trends(
+        self,
+        tenant_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        period: str = "month",
+        include_descendants: bool = False,
+    ) -> list[dict]:
+        """获取排放趋势（优先读取缓存，并发未命中只计算一次；Redis 不可用时直接计算）"""
+        period = "year" if period == "year" else "month"
+
+        try:
+            cache = CacheManager(await get_redis())
+        except Exception as e:
+            logger.warning("dashboard_cache_unavailable", error=str(e))
+            return await self.compute_trends(
+                tenant_id, organization_id, period, include_descendants=include_descendants
+            )
+
+        load = session_loader(
+            self.session_maker,
+            lambda db: DashboardService(db).compute_trends(
+                tenant_id, organization_id, period, include_descendants=include_descendants
+            ),
+        )
+        return await cache.dashboard_trends(
+            str(tenant_id), str(organization_id), period, load, subtree=include_descendants
+        )
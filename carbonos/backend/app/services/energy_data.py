@@ -0,0 +1,245 @@
+"""
+能源数据批量写入
+- copy: 纯追加（PostgreSQL COPY，SQLite executemany），用于文件导入
+- upsert: API 批量提交，按 (tenant, org, energy_type, data_date) 去重；
+  PostgreSQL 先 COPY 到临时表，再一条 INSERT ... SELECT ... ON CONFLICT 写入
+"""
+
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Sequence
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import insert, select, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.energy import (
+    API_SOURCE_PREDICATE_POSTGRESQL, API_SOURCE_PREDICATE_SQLITE, DataSource, EnergyData, EnergyType
+)
+from app.models.organization import Organization
+from app.schemas.energy import EnergyDataCreate
+
+_batch_adapter = TypeAdapter(list[EnergyDataCreate])
+
+# 写入列顺序
+ENERGY_DATA_COLUMNS = (
+    "id", "organization_id", "tenant_id", "energy_type", "data_date", "consumption",
+    "unit", "cost", "source", "remarks", "created_at", "created_by",
+)
+# 幂等键（对应部分唯一索引 uq_energy_data_api_key，仅约束 source = api 的数据）
+UPSERT_KEY = ("tenant_id", "organization_id", "energy_type", "data_date")
+# 冲突时更新的列
+UPSERT_UPDATE_COLUMNS = ("consumption", "unit", "cost", "remarks", "created_by")
+
+
+def _copy_record(row: dict[str, Any]) -> tuple:
+    # 枚举按迁移中定义的小写标签写入
+    return tuple(
+        row[column].value if isinstance(row[column], (EnergyType, DataSource)) else row[column]
+        for column in ENERGY_DATA_COLUMNS
+    )
+
+
+class EnergyDataWriter:
+    """能源数据批量写入器（调用方负责提交事务）"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @property
+    def _is_postgresql(self) -> bool:
+        return self.db.bind.dialect.name == "postgresql"
+
+    async def _raw_connection(self):
+        connection = await self.db.connection()
+        raw = await connection.get_raw_connection()
+        return raw.driver_connection
+
+    async def copy(self, rows: Sequence[dict[str, Any]]) -> None:
+        """批量追加写入"""
+        if not rows:
+            return
+        if self._is_postgresql:
+            raw = await self._raw_connection()
+            await raw.copy_records_to_table(
+                EnergyData.__tablename__,
+                records=[_copy_record(row) for row in rows],
+                columns=list(ENERGY_DATA_COLUMNS),
+            )
+        else:
+            await self.db.execute(insert(EnergyData), list(rows))
+
+    async def upsert(
+        self, rows: Sequence[dict[str, Any]], update: bool = True
+    ) -> tuple[set[uuid.UUID], set[uuid.UUID]]:
+        """
+        按幂等键写入（rows 需已在批次内去重）
+        update=True 时冲突行覆盖更新，否则跳过
+        返回 (新插入的行 ID, 被更新的已有行 ID)；被跳过的行不在结果中
+        """
+        if not rows:
+            return set(), set()
+        if self._is_postgresql:
+            returned = await self._upsert_postgresql(rows, update)
+        else:
+            returned = await self._upsert_sqlite(rows, update)
+
+        submitted = {row["id"] for row in rows}
+        inserted = returned & submitted
+        return inserted, returned - inserted
+
+    async def _upsert_postgresql(self, rows: Sequence[dict[str, Any]], update: bool) -> set[uuid.UUID]:
+        raw = await self._raw_connection()
+        await raw.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS _energy_data_staging "
+            "(LIKE energy_data INCLUDING DEFAULTS) ON COMMIT DROP"
+        )
+        await raw.copy_records_to_table(
+            "_energy_data_staging",
+            records=[_copy_record(row) for row in rows],
+            columns=list(ENERGY_DATA_COLUMNS),
+        )
+        columns = ", ".join(ENERGY_DATA_COLUMNS)
+        if update:
+            action = "DO UPDATE SET " + ", ".join(
+                f"{column} = EXCLUDED.{column}" for column in UPSERT_UPDATE_COLUMNS
+            )
+        else:
+            action = "DO NOTHING"
+        result = await self.db.execute(text(
+            f"INSERT INTO energy_data ({columns}) "
+            f"SELECT {columns} FROM _energy_data_staging "
+            f"ON CONFLICT ({', '.join(UPSERT_KEY)}) WHERE {API_SOURCE_PREDICATE_POSTGRESQL} {action} "
+            f"RETURNING id"
+        ))
+        returned = {row[0] for row in result.all()}
+        await raw.execute("TRUNCATE _energy_data_staging")
+        return returned
+
+    async def _upsert_sqlite(self, rows: Sequence[dict[str, Any]], update: bool) -> set[uuid.UUID]:
+        # 语句只编译一次，按参数列表执行（insertmanyvalues 自动分批并保留 RETURNING）
+        table = EnergyData.__table__
+        stmt = sqlite.insert(table)
+        index_where = text(API_SOURCE_PREDICATE_SQLITE)
+        if update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(UPSERT_KEY),
+                index_where=index_where,
+                set_={column: stmt.excluded[column] for column in UPSERT_UPDATE_COLUMNS},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=list(UPSERT_KEY), index_where=index_where)
+        # Core 执行，跳过 ORM 批量持久化的逐行处理
+        connection = await self.db.connection()
+        result = await connection.execute(stmt.returning(table.c.id), list(rows))
+        return set(result.scalars().all())
+
+
+def _row_error(index: int, message: str, field: Optional[str] = None) -> dict[str, Any]:
+    return {"index": index, "field": field, "message": message}
+
+
+def validate_energy_batch(
+    items: Sequence[dict[str, Any]],
+) -> tuple[list[tuple[int, EnergyDataCreate]], list[dict[str, Any]]]:
+    """
+    整批 Pydantic 校验（一次调用），返回 (有效行, 行错误)
+    存在错误时仅对其余行再校验一次
+    """
+    try:
+        return list(enumerate(_batch_adapter.validate_python(items))), []
+    except ValidationError as e:
+        errors, failed = [], set()
+        for error in e.errors():
+            loc = error["loc"]
+            index = loc[0] if loc and isinstance(loc[0], int) else 0
+            failed.add(index)
+            field = ".".join(str(part) for part in loc[1:]) or None
+            errors.append(_row_error(index, error["msg"], field))
+
+    indices = [index for index in range(len(items)) if index not in failed]
+    parsed = _batch_adapter.validate_python([items[index] for index in indices])
+    return list(zip(indices, parsed)), errors
+
+
+async def bulk_create_energy_data(
+    db: AsyncSession,
+    items: Sequence[dict[str, Any]],
+    tenant_id: uuid.UUID,
+    created_by: Optional[uuid.UUID] = None,
+    upsert: bool = False,
+) -> dict[str, Any]:
+    """
+    API 批量录入能源数据（调用方负责提交事务）
+    
+    - 逐行错误收集：字段校验、能源类型、组织归属（P0-002）、批次内重复
+    - upsert=True: 已存在的 (组织, 能源类型, 日期) 覆盖更新；否则作为“已存在”错误返回
+    """
+    started = time.perf_counter()
+    valid, errors = validate_energy_batch(items)
+
+    org_ids = {item.organization_id for _, item in valid}
+    allowed_orgs = set((await db.execute(
+        select(Organization.id).where(
+            Organization.id.in_(org_ids),
+            Organization.tenant_id == tenant_id  # P0-002: 租户隔离
+        )
+    )).scalars().all()) if org_ids else set()
+
+    now = datetime.utcnow()
+    rows: list[dict[str, Any]] = []
+    row_index: dict[uuid.UUID, int] = {}
+    seen: dict[tuple, int] = {}
+    for index, item in valid:
+        try:
+            energy_type = EnergyType(item.energy_type)
+        except ValueError:
+            errors.append(_row_error(index, f"未知能源类型: {item.energy_type}", "energy_type"))
+            continue
+        if item.organization_id not in allowed_orgs:
+            errors.append(_row_error(index, "组织不存在", "organization_id"))
+            continue
+        key = (item.organization_id, energy_type, item.data_date)
+        if key in seen:
+            errors.append(_row_error(index, f"与第 {seen[key]} 行重复"))
+            continue
+        seen[key] = index
+
+        row_id = uuid.uuid4()
+        row_index[row_id] = index
+        rows.append({
+            "id": row_id,
+            "organization_id": item.organization_id,
+            "tenant_id": tenant_id,  # P0-002: 强制注入
+            "energy_type": energy_type,
+            "data_date": item.data_date,
+            "consumption": item.consumption,
+            "unit": item.unit,
+            "cost": item.cost,
+            "source": DataSource.API,
+            "remarks": item.remarks,
+            "created_at": now,
+            "created_by": created_by,
+        })
+
+    inserted, updated = await EnergyDataWriter(db).upsert(rows, update=upsert)
+    if not upsert and len(inserted) < len(rows):
+        for row in rows:
+            if row["id"] not in inserted:
+                errors.append(_row_error(row_index[row["id"]], "数据已存在（可使用 upsert 覆盖）"))
+
+    errors.sort(key=lambda error: error["index"])
+    failed_count = len({error["index"] for error in errors})
+    return {
+        "total": len(items),
+        "success_count": len(inserted) + len(updated),
+        "failed_count": failed_count,
+        "inserted": len(inserted),
+        "updated": len(updated),
+        "errors": errors,
+        # 实际写入的组织（调用方提交后据此失效仪表盘缓存）
+        "organization_ids": {row["organization_id"] for row in rows if row["id"] in inserted or row["id"] in updated},
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
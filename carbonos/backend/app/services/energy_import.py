@@ -0,0 +1,292 @@
+"""
+能源数据流式导入服务
+支持 .xlsx（openpyxl 只读模式）与 .csv（逐行读取），按块校验并批量写入：
+
+- 解析在线程池中逐块进行，不阻塞事件循环
+- 每块写入后提交，并渐进更新 ImportRecord 的行数统计（可断点续导）
+- PostgreSQL 使用 COPY 写入，其他数据库使用 executemany
+- 内存占用只与块大小相关，与文件行数无关
+"""
+
+import asyncio
+import codecs
+import csv
+import time
+import uuid
+from datetime import date, datetime
+from itertools import islice
+from typing import Any, Awaitable, BinaryIO, Callable, Iterator, Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import get_logger
+from app.models.energy import DataSource, EnergyType, ImportRecord
+from app.services.energy_data import EnergyDataWriter
+
+logger = get_logger(__name__)
+
+
+# 每块行数（一次校验 + 一次批量写入 + 一次提交）
+IMPORT_CHUNK_SIZE = 5000
+# error_message 中保留的错误样例数量
+MAX_ERROR_SAMPLES = 50
+
+# 表头别名 -> 字段
+HEADER_ALIASES: dict[str, str] = {
+    "日期": "data_date",
+    "数据日期": "data_date",
+    "data_date": "data_date",
+    "date": "data_date",
+    "能源类型": "energy_type",
+    "energy_type": "energy_type",
+    "消耗量": "consumption",
+    "用量": "consumption",
+    "consumption": "consumption",
+    "单位": "unit",
+    "unit": "unit",
+    "费用": "cost",
+    "费用(元)": "cost",
+    "cost": "cost",
+    "备注": "remarks",
+    "remarks": "remarks",
+}
+REQUIRED_FIELDS = ("data_date", "energy_type", "consumption", "unit")
+
+# 能源类型中文名
+ENERGY_TYPE_ALIASES: dict[str, EnergyType] = {
+    "电力": EnergyType.ELECTRICITY,
+    "电": EnergyType.ELECTRICITY,
+    "天然气": EnergyType.NATURAL_GAS,
+    "煤炭": EnergyType.COAL,
+    "柴油": EnergyType.DIESEL,
+    "汽油": EnergyType.GASOLINE,
+    "蒸汽": EnergyType.STEAM,
+    "热力": EnergyType.HEAT,
+    "水": EnergyType.WATER,
+}
+
+
+class ImportFormatError(ValueError):
+    """文件格式错误（无法继续导入）"""
+
+
+def iter_csv_rows(fileobj: BinaryIO) -> Iterator[Sequence[Any]]:
+    """逐行读取 CSV（兼容 UTF-8 BOM）"""
+    reader = csv.reader(codecs.getreader("utf-8-sig")(fileobj, errors="replace"))
+    yield from reader
+
+
+def iter_xlsx_rows(fileobj: BinaryIO) -> Iterator[Sequence[Any]]:
+    """以只读模式逐行读取首个工作表"""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def open_row_reader(filename: str, fileobj: BinaryIO) -> Iterator[Sequence[Any]]:
+    """按扩展名选择行读取器"""
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return iter_csv_rows(fileobj)
+    if name.endswith(".xlsx"):
+        return iter_xlsx_rows(fileobj)
+    if name.endswith(".xls"):
+        raise ImportFormatError("暂不支持 .xls 格式，请另存为 .xlsx 或 .csv")
+    raise ImportFormatError("仅支持 Excel (.xlsx) 或 CSV 文件")
+
+
+def _parse_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(text, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"日期格式无效: {text}")
+
+
+def _parse_energy_type(value: Any) -> EnergyType:
+    text = str(value).strip()
+    if text in ENERGY_TYPE_ALIASES:
+        return ENERGY_TYPE_ALIASES[text]
+    try:
+        return EnergyType(text.lower())
+    except ValueError:
+        raise ValueError(f"未知能源类型: {text}") from None
+
+
+def _parse_float(value: Any, field: str, required: bool = True) -> Optional[float]:
+    if value is None or (isinstance(value, str) and not value.strip()):
+        if required:
+            raise ValueError(f"{field} 不能为空")
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} 不是有效数字: {value}") from None
+    if number < 0:
+        raise ValueError(f"{field} 不能为负数")
+    return number
+
+
+class EnergyDataImporter:
+    """能源数据导入器（单个文件）"""
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        tenant_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        created_by: Optional[uuid.UUID] = None,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ):
+        self.db = db
+        self.tenant_id = tenant_id
+        self.organization_id = organization_id
+        self.created_by = created_by
+        self.chunk_size = chunk_size
+        self._columns: dict[str, int] = {}
+        self._errors: list[str] = []
+
+    def _bind_header(self, header: Sequence[Any]) -> None:
+        """根据表头确定字段所在列"""
+        columns = {}
+        for index, name in enumerate(header):
+            field = HEADER_ALIASES.get(str(name).strip().lower() if name is not None else "")
+            if field and field not in columns:
+                columns[field] = index
+        missing = [field for field in REQUIRED_FIELDS if field not in columns]
+        if missing:
+            raise ImportFormatError(f"缺少必填列: {', '.join(missing)}")
+        self._columns = columns
+
+    def _cell(self, row: Sequence[Any], field: str) -> Any:
+        index = self._columns.get(field)
+        if index is None or index >= len(row):
+            return None
+        return row[index]
+
+    def _parse_row(self, row: Sequence[Any], now: datetime) -> dict[str, Any]:
+        unit = self._cell(row, "unit")
+        if unit is None or not str(unit).strip():
+            raise ValueError("unit 不能为空")
+        remarks = self._cell(row, "remarks")
+        return {
+            "id": uuid.uuid4(),
+            "organization_id": self.organization_id,
+            "tenant_id": self.tenant_id,  # P0-002: 强制注入租户
+            "energy_type": _parse_energy_type(self._cell(row, "energy_type")),
+            "data_date": _parse_date(self._cell(row, "data_date")),
+            "consumption": _parse_float(self._cell(row, "consumption"), "consumption"),
+            "unit": str(unit).strip()[:20],
+            "cost": _parse_float(self._cell(row, "cost"), "cost", required=False),
+            "source": DataSource.EXCEL,
+            "remarks": str(remarks) if remarks not in (None, "") else None,
+            "created_at": now,
+            "created_by": self.created_by,
+        }
+
+    def _validate_chunk(
+        self, rows: list[Sequence[Any]], first_line: int
+    ) -> tuple[list[dict[str, Any]], int]:
+        """校验一块数据，返回 (有效行, 失败数)"""
+        now = datetime.utcnow()
+        valid, failed = [], 0
+        for offset, row in enumerate(rows):
+            if self._is_blank(row):
+                continue  # 跳过空行，不计入统计
+            try:
+                valid.append(self._parse_row(row, now))
+            except ValueError as e:
+                failed += 1
+                if len(self._errors) < MAX_ERROR_SAMPLES:
+                    self._errors.append(f"第{first_line + offset}行: {e}")
+        return valid, failed
+
+    @staticmethod
+    def _is_blank(row: Sequence[Any]) -> bool:
+        return not any(cell not in (None, "") for cell in row)
+
+    def _skip_committed(self, rows: Iterator[Sequence[Any]], count: int) -> int:
+        """跳过已提交的 count 个非空数据行，返回跳过的物理行数"""
+        skipped = 0
+        while count > 0:
+            row = next(rows, None)
+            if row is None:
+                break
+            skipped += 1
+            if not self._is_blank(row):
+                count -= 1
+        return skipped
+
+    async def run(
+        self,
+        record: ImportRecord,
+        rows: Iterator[Sequence[Any]],
+        resume: bool = False,
+        on_chunk: Optional[Callable[[ImportRecord], Awaitable[None]]] = None,
+    ) -> ImportRecord:
+        """
+        执行导入，逐块提交并更新导入记录的行数统计
+        
+        数据与统计在同一事务内提交，resume=True 时按 total_rows 跳过已提交的行（任务重试不会重复写入）。
+        导入状态由调用方（后台任务）维护；格式错误抛出 ImportFormatError，其他异常回滚后原样抛出。
+        """
+        started = time.perf_counter()
+        record_id = record.id
+        if not resume:
+            record.total_rows = record.success_rows = record.failed_rows = 0
+            record.error_message = None
+            await self.db.commit()
+
+        try:
+            header = await asyncio.to_thread(next, rows, None)
+            if header is None:
+                raise ImportFormatError("文件为空")
+            self._bind_header(header)
+
+            line = 2  # 第 1 行为表头
+            if resume and record.total_rows:
+                line += await asyncio.to_thread(self._skip_committed, rows, record.total_rows)
+
+            while True:
+                chunk = await asyncio.to_thread(lambda: list(islice(rows, self.chunk_size)))
+                if not chunk:
+                    break
+                valid, failed = self._validate_chunk(chunk, line)
+                line += len(chunk)
+
+                await EnergyDataWriter(self.db).copy(valid)
+                record.total_rows += len(valid) + failed
+                record.success_rows += len(valid)
+                record.failed_rows += failed
+                if self._errors:
+                    record.error_message = "\n".join(self._errors)
+                await self.db.commit()
+                if on_chunk:
+                    await on_chunk(record)
+        except Exception as e:
+            await self.db.rollback()
+            if not isinstance(e, ImportFormatError):
+                logger.error("energy_import_failed", record_id=str(record_id), error=str(e))
+            raise
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            "energy_import_finished",
+            record_id=str(record_id),
+            total_rows=record.total_rows,
+            success_rows=record.success_rows,
+            failed_rows=record.failed_rows,
+            elapsed_ms=round(elapsed * 1000, 2),
+        )
+        return record
@@ -0,0 +1,193 @@
+"""
+排放因子进程内缓存
+EmissionFactor 只在超管调用 POST /carbon/factors 时变化，
+因此每个进程常驻一份完整因子表，查询不再访问数据库。
+
+一致性：
+- Redis 保存版本号与因子快照，新进程优先从快照加载
+- 创建因子时递增版本号并通过 Pub/Sub 通知所有 worker
+- 定期比对版本号，兜底 Pub/Sub 消息丢失
+- 同时比对数据库指纹（行数 + 最大 updated_at），兜底未经 invalidate() 的写入
+  （种子脚本、迁移、手工 SQL）；快照带 TTL，避免异常数据长期驻留
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import CacheManager, get_redis, on_invalidation, publish_invalidation
+from app.core.logging import get_logger
+from app.models.carbon import EmissionFactor, EmissionScope
+from app.schemas.carbon import EmissionFactorResponse
+
+logger = get_logger("services.factor_cache")
+
+FACTOR_VERSION_KEY = f"{CacheManager.PREFIX}factors:version"
+FACTOR_SNAPSHOT_KEY = f"{CacheManager.PREFIX}factors:snapshot"
+FACTOR_CHANNEL = f"{CacheManager.PREFIX}factors:invalidate"
+
+# (factor_value, unit, scope, factor_id)
+CachedFactor = tuple[float, str, EmissionScope, uuid.UUID]
+
+
+class EmissionFactorTable:
+    """
+    进程内排放因子表
+    键: (energy_type, factor_id, is_default)，默认因子额外登记在 (energy_type, None, True)
+    """
+
+    # 版本号比对间隔（秒）；Redis 不可用时同时作为本地表的最长有效期
+    VERSION_CHECK_INTERVAL = 30
+    # Redis 快照有效期（秒）
+    SNAPSHOT_TTL = 3600
+
+    def __init__(self):
+        self._table: dict[tuple[str, Optional[uuid.UUID], bool], CachedFactor] = {}
+        self._by_id: dict[uuid.UUID, CachedFactor] = {}
+        self._version: Optional[int] = None
+        self._fingerprint: Optional[str] = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    def lookup(self, energy_type: str, factor_id: Optional[uuid.UUID] = None) -> Optional[CachedFactor]:
+        """查询因子：指定因子优先，其次为该能源类型的默认因子"""
+        if factor_id:
+            factor = self._by_id.get(factor_id)
+            if factor is not None:
+                return factor
+        return self._table.get((energy_type, None, True))
+
+    def mark_stale(self, _message: str = "") -> None:
+        """标记本地表过期，下次查询前重新加载"""
+        self._stale = True
+
+    def clear(self) -> None:
+        """清空本地表"""
+        self._table.clear()
+        self._by_id.clear()
+        self._version = None
+        self._fingerprint = None
+        self._stale = True
+
+    def _fill(self, rows: list[dict]) -> None:
+        table = {}
+        by_id = {}
+        for row in rows:
+            factor_id = uuid.UUID(str(row["id"]))
+            entry = (float(row["factor_value"]), row["unit"], EmissionScope(row["scope"]), factor_id)
+            table[(row["energy_type"], factor_id, bool(row["is_default"]))] = entry
+            by_id[factor_id] = entry
+            if row["is_default"]:
+                table.setdefault((row["energy_type"], None, True), entry)
+        self._table = table
+        self._by_id = by_id
+
+    async def _load_from_db(self, db: AsyncSession) -> list[dict]:
+        result = await db.execute(select(EmissionFactor).order_by(EmissionFactor.created_at))
+        return [
+            {
+                "id": str(f.id),
+                "energy_type": f.energy_type,
+                "is_default": bool(f.is_default),
+                "factor_value": f.factor_value,
+                "unit": f.unit,
+                "scope": f.scope.value,
+            }
+            for f in result.scalars().all()
+        ]
+
+    async def _load_fingerprint(self, db: AsyncSession) -> str:
+        """因子表指纹：行数 + 最大更新时间，单条聚合查询"""
+        result = await db.execute(
+            select(func.count(EmissionFactor.id), func.max(EmissionFactor.updated_at))
+        )
+        count, updated_at = result.one()
+        return f"{count}:{updated_at.isoformat() if updated_at else ''}"
+
+    async def ensure_fresh(self, db: AsyncSession) -> bool:
+        """
+        保证本地表可用
+        正常情况下仅做时间比较；返回 False 表示加载失败，调用方应回退到数据库查询
+        """
+        now = time.monotonic()
+        if not self._stale and now - self._checked_at < self.VERSION_CHECK_INTERVAL:
+            return True
+
+        async with self._lock:
+            if not self._stale and time.monotonic() - self._checked_at < self.VERSION_CHECK_INTERVAL:
+                return True
+            try:
+                await self._reload(db)
+            except Exception as e:
+                logger.warning("factor_cache_reload_failed", error=str(e))
+                return False
+            self._checked_at = time.monotonic()
+            self._stale = False
+            return True
+
+    async def _reload(self, db: AsyncSession) -> None:
+        try:
+            redis = await get_redis()
+            version = int(await redis.get(FACTOR_VERSION_KEY) or 0)
+        except Exception:
+            # Redis 不可用：直接从数据库加载，依靠检查间隔限制过期时间
+            self._fill(await self._load_from_db(db))
+            self._version = None
+            self._fingerprint = None
+            return
+
+        fingerprint = await self._load_fingerprint(db)
+        if version == self._version and fingerprint == self._fingerprint and not self._stale:
+            return
+
+        snapshot = await redis.get(FACTOR_SNAPSHOT_KEY)
+        if snapshot:
+            data = json.loads(snapshot)
+            if data.get("version") == version and data.get("fingerprint") == fingerprint:
+                self._fill(data["factors"])
+                self._version = version
+                self._fingerprint = fingerprint
+                return
+
+        rows = await self._load_from_db(db)
+        self._fill(rows)
+        self._version = version
+        self._fingerprint = fingerprint
+        await redis.set(
+            FACTOR_SNAPSHOT_KEY,
+            json.dumps({"version": version, "fingerprint": fingerprint, "factors": rows}),
+            ex=self.SNAPSHOT_TTL,
+        )
+        logger.info("factor_cache_loaded", version=version, count=len(rows))
+
+    async def invalidate(self) -> None:
+        """因子变更后调用：递增版本号并通知所有 worker"""
+        self.mark_stale()
+        version = ""
+        try:
+            redis = await get_redis()
+            version = str(await redis.incr(FACTOR_VERSION_KEY))
+            await CacheManager(redis).delete_emission_factors()
+        except Exception as e:
+            logger.warning("factor_cache_version_bump_failed", error=str(e))
+        await publish_invalidation(FACTOR_CHANNEL, version)
+
+
+async def load_factor_list(db: AsyncSession) -> list[dict]:
+    """排放因子列表（GET /carbon/factors 的缓存内容，按类别排序）"""
+    result = await db.execute(select(EmissionFactor).order_by(EmissionFactor.category))
+    return [
+        EmissionFactorResponse.model_validate(factor).model_dump(mode="json")
+        for factor in result.scalars().all()
+    ]
+
+
+# 进程级单例
+factor_cache = EmissionFactorTable()
+on_invalidation(FACTOR_CHANNEL, factor_cache.mark_stale)
@@ -0,0 +1,197 @@
+"""
+组织层级服务
+- 一条递归 CTE 读取租户的全部组织，内存中 O(n) 组装树
+- 组织树按租户缓存（Redis），组织增删改时失效
+- 子树聚合使用闭包表 OrganizationClosure：后代集合与直接下级分项均为单条查询
+- 数据写入后递增所属组织及其全部上级组织的缓存代数（子树汇总包含下级数据）
+"""
+
+import uuid
+from typing import Any, Callable, Iterable, Optional, Sequence
+
+from sqlalchemy import Select, and_, func, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.cache import CacheManager, get_redis
+from app.core.logging import get_logger
+from app.models.organization import Organization, OrganizationClosure
+from app.schemas.organization import OrganizationResponse
+
+logger = get_logger("services.org_hierarchy")
+
+# 数据写入回调 (tenant_id, 写入的组织, 含自身的全部上级组织)，如缓存预热
+_emission_write_handlers: list[Callable[[uuid.UUID, set[uuid.UUID], set[uuid.UUID]], None]] = []
+
+
+def on_emissions_written(handler: Callable[[uuid.UUID, set[uuid.UUID], set[uuid.UUID]], None]) -> None:
+    """注册数据写入回调（在缓存失效后同步调用，应只做登记等轻量操作）"""
+    _emission_write_handlers.append(handler)
+
+
+def subtree_ids_query(tenant_id: uuid.UUID, organization_id: uuid.UUID) -> Select:
+    """组织本身及全部下级组织 ID 的子查询（闭包表主键前缀扫描）"""
+    return select(OrganizationClosure.descendant_id).where(
+        OrganizationClosure.ancestor_id == organization_id,
+        OrganizationClosure.tenant_id == tenant_id,  # P0-002: 租户隔离
+    )
+
+
+def organization_filter(
+    column: Any,
+    tenant_id: uuid.UUID,
+    organization_id: uuid.UUID,
+    include_descendants: bool = False,
+) -> Any:
+    """按组织过滤；include_descendants 时包含全部下级组织"""
+    if include_descendants:
+        return column.in_(subtree_ids_query(tenant_id, organization_id))
+    return column == organization_id
+
+
+def child_totals_query(model: Any, value_column: Any, tenant_id: uuid.UUID, organization_id: uuid.UUID) -> Select:
+    """
+    按直接下级分项汇总 (organization_id, name, total)，每个下级包含其整棵子树；
+    组织自身的数据单独一行（organization_id 为组织本身）。调用方追加时间等过滤条件
+    """
+    branch = aliased(OrganizationClosure)  # 组织 -> 直接下级（或自身）
+    member = aliased(OrganizationClosure)  # 直接下级 -> 数据所属组织
+    return (
+        select(
+            branch.descendant_id.label("organization_id"),
+            Organization.name,
+            func.sum(value_column).label("total"),
+        )
+        .select_from(model)
+        .join(member, member.descendant_id == model.organization_id)
+        .join(branch, branch.descendant_id == member.ancestor_id)
+        .join(Organization, Organization.id == branch.descendant_id)
+        .where(
+            branch.ancestor_id == organization_id,
+            branch.tenant_id == tenant_id,  # P0-002: 租户隔离
+            or_(branch.depth == 1, and_(branch.depth == 0, member.depth == 0)),
+        )
+        .group_by(branch.descendant_id, Organization.name)
+    )
+
+
+def build_tree(organizations: Sequence[Organization]) -> list[dict[str, Any]]:
+    """
+    组装组织树（父节点须排在子节点之前）
+    返回可直接 JSON 序列化的嵌套字典
+    """
+    nodes: dict[uuid.UUID, dict[str, Any]] = {}
+    roots: list[dict[str, Any]] = []
+    for org in organizations:
+        node = OrganizationResponse.model_validate(org).model_dump(mode="json")
+        node["children"] = []
+        nodes[org.id] = node
+        parent = nodes.get(org.parent_id) if org.parent_id else None
+        if parent is not None:
+            parent["children"].append(node)
+        else:
+            roots.append(node)
+    return roots
+
+
+class OrganizationHierarchy:
+    """组织层级服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def load(self, tenant_id: uuid.UUID) -> list[Organization]:
+        """递归 CTE 从顶级组织（园区）向下遍历，按层级、创建时间排序"""
+        tree = (
+            select(Organization.id, literal(0).label("depth"))
+            .where(
+                Organization.tenant_id == tenant_id,  # P0-002: 租户隔离
+                Organization.parent_id.is_(None),
+            )
+            .cte("org_tree", recursive=True)
+        )
+        children = (
+            select(Organization.id, (tree.c.depth + 1).label("depth"))
+            .join(tree, Organization.parent_id == tree.c.id)
+            .where(Organization.tenant_id == tenant_id)  # P0-002: 租户隔离
+        )
+        tree = tree.union_all(children)
+
+        result = await self.db.execute(
+            select(Organization)
+            .join(tree, Organization.id == tree.c.id)
+            .order_by(tree.c.depth, Organization.created_at)
+        )
+        return list(result.scalars().all())
+
+    async def get_tree(self, tenant_id: uuid.UUID) -> list[dict[str, Any]]:
+        """获取组织树（优先读取缓存，Redis 不可用时直接查询）"""
+        cache: Optional[CacheManager] = None
+        try:
+            cache = CacheManager(await get_redis())
+            cached = await cache.get_org_tree(str(tenant_id))
+            if cached is not None:
+                return cached
+        except Exception as e:
+            logger.warning("org_tree_cache_unavailable", error=str(e))
+            cache = None
+
+        tree = build_tree(await self.load(tenant_id))
+
+        if cache is not None:
+            try:
+                await cache.set_org_tree(str(tenant_id), tree)
+            except Exception as e:
+                logger.warning("org_tree_cache_set_failed", error=str(e))
+        return tree
+
+    @staticmethod
+    async def invalidate(tenant_id: uuid.UUID) -> None:
+        """组织变更后清除租户组织树缓存"""
+        try:
+            await CacheManager(await get_redis()).delete_org_tree(str(tenant_id))
+        except Exception as e:
+            logger.warning("org_tree_cache_invalidate_failed", tenant_id=str(tenant_id), error=str(e))
+
+    @staticmethod
+    async def invalidate_emissions(
+        db: AsyncSession,
+        tenant_id: uuid.UUID,
+        organization_ids: Iterable[uuid.UUID],
+    ) -> None:
+        """
+        能源/排放数据写入并提交后调用：使这些组织及其上级组织的仪表盘缓存失效
+        上级组织经闭包表一次查出；失败只记录日志，缓存由 TTL 兜底
+        """
+        organization_ids = set(organization_ids)
+        if not organization_ids:
+            return
+        try:
+            ancestors = set((await db.execute(
+                select(OrganizationClosure.ancestor_id).distinct().where(
+                    OrganizationClosure.descendant_id.in_(organization_ids),
+                    OrganizationClosure.tenant_id == tenant_id,  # P0-002: 租户隔离
+                )
+            )).scalars().all())
+            await CacheManager(await get_redis()).invalidate_organizations(
+                str(tenant_id), (str(org_id) for org_id in ancestors | organization_ids)
+            )
+        except Exception as e:
+            logger.warning("dashboard_cache_invalidate_failed", tenant_id=str(tenant_id), error=str(e))
+            return
+        # 闭包表中的上级组织包含自身（depth=0），据此排除不属于该租户的组织
+        for handler in _emission_write_handlers:
+            handler(tenant_id, organization_ids & ancestors, ancestors)
+
+    @staticmethod
+    async def invalidate_tenant(tenant_id: uuid.UUID) -> None:
+        """汇总重建等租户级变更后清除该租户全部缓存"""
+        try:
+            await CacheManager(await get_redis()).invalidate_tenant_cache(str(tenant_id))
+        except Exception as e:
+            logger.warning("tenant_cache_invalidate_failed", tenant_id=str(tenant_id), error=str(e))
+
+    async def subtree_ids(self, tenant_id: uuid.UUID, organization_id: uuid.UUID) -> list[uuid.UUID]:
+        """组织本身及全部下级组织 ID（组织不存在时为空）"""
+        result = await self.db.execute(subtree_ids_query(tenant_id, organization_id))
+        return list(result.scalars().all())
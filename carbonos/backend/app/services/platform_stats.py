@@ -0,0 +1,24 @@
+"""
+平台运营统计（超级管理员）
+"""
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.carbon import EmissionRollupMonthly
+from app.models.tenant import Tenant, TenantStatus
+from app.models.user import User
+
+
+async def compute_global_stats(db: AsyncSession) -> dict:
+    """租户数、活跃租户数、用户数与累计排放（跨租户聚合）"""
+    tenant_count = await db.scalar(select(func.count(Tenant.id)))
+    active_count = await db.scalar(select(func.count(Tenant.id)).where(Tenant.status == TenantStatus.ACTIVE))
+    user_count = await db.scalar(select(func.count(User.id)))
+    emission_total = await db.scalar(select(func.sum(EmissionRollupMonthly.emission_amount))) or 0.0
+    return {
+        "total_tenants": tenant_count or 0,
+        "active_tenants": active_count or 0,
+        "total_users": user_count or 0,
+        "total_emissions": emission_total,
+    }
@@ -0,0 +1,173 @@
+"""
+认证主体缓存
+get_current_user 每个请求都需要用户的 id / tenant_id / role / status / is_superuser，
+这些字段只在少数管理操作中变化，因此缓存在进程内 LRU + Redis 中，请求不再查询 users 表。
+
+一致性：
+- 修改密码、员工更新/删除、租户状态变更后调用 invalidate / invalidate_tenant
+- 删除 Redis 键并通过 Pub/Sub 通知所有 worker 清除本地条目
+- 本地条目有效期较短，兜底 Pub/Sub 消息丢失
+"""
+
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import CacheManager, get_redis, on_invalidation, publish_invalidation
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.models.user import User, UserRole, UserStatus
+
+logger = get_logger("services.principal_cache")
+
+PRINCIPAL_KEY = f"{CacheManager.PREFIX}principal:{{user_id}}"
+PRINCIPAL_CHANNEL = f"{CacheManager.PREFIX}principal:invalidate"
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    已认证用户（路由所需字段）
+    字段与 User 同名，权限依赖与业务路由可直接使用
+    """
+    id: uuid.UUID
+    tenant_id: Optional[uuid.UUID]
+    role: UserRole
+    status: UserStatus
+    is_superuser: bool
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "id": str(self.id),
+            "tenant_id": str(self.tenant_id) if self.tenant_id else None,
+            "role": self.role.value,
+            "status": self.status.value,
+            "is_superuser": self.is_superuser,
+        })
+
+    @classmethod
+    def from_json(cls, raw: str) -> "Principal":
+        data = json.loads(raw)
+        return cls(
+            id=uuid.UUID(data["id"]),
+            tenant_id=uuid.UUID(data["tenant_id"]) if data["tenant_id"] else None,
+            role=UserRole(data["role"]),
+            status=UserStatus(data["status"]),
+            is_superuser=bool(data["is_superuser"]),
+        )
+
+
+class PrincipalCache:
+    """进程内 LRU + Redis 的认证主体缓存"""
+
+    def __init__(self):
+        settings = get_settings()
+        self.ttl = settings.principal_cache_ttl
+        self.local_ttl = min(settings.principal_cache_local_ttl, self.ttl)
+        self.max_size = settings.principal_cache_size
+        self._local: OrderedDict[uuid.UUID, tuple[float, Principal]] = OrderedDict()
+
+    def _get_local(self, user_id: uuid.UUID) -> Optional[Principal]:
+        entry = self._local.get(user_id)
+        if entry is None:
+            return None
+        expires_at, principal = entry
+        if expires_at < time.monotonic():
+            del self._local[user_id]
+            return None
+        self._local.move_to_end(user_id)
+        return principal
+
+    def _set_local(self, principal: Principal) -> None:
+        self._local[principal.id] = (time.monotonic() + self.local_ttl, principal)
+        self._local.move_to_end(principal.id)
+        while len(self._local) > self.max_size:
+            self._local.popitem(last=False)
+
+    def drop_local(self, message: str = "") -> None:
+        """Pub/Sub 回调：清除本地条目（消息为空时清空全部）"""
+        if not message:
+            self._local.clear()
+            return
+        for user_id in message.split(","):
+            try:
+                self._local.pop(uuid.UUID(user_id), None)
+            except ValueError:
+                continue
+
+    def clear(self) -> None:
+        """清空本地缓存"""
+        self._local.clear()
+
+    async def _load_from_db(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[Principal]:
+        row = (await db.execute(
+            select(User.id, User.tenant_id, User.role, User.status, User.is_superuser)
+            .where(User.id == user_id)
+        )).one_or_none()
+        if row is None:
+            return None
+        return Principal(
+            id=row.id,
+            tenant_id=row.tenant_id,
+            role=row.role,
+            status=row.status,
+            is_superuser=bool(row.is_superuser),
+        )
+
+    async def get(self, db: AsyncSession, user_id: uuid.UUID) -> Optional[Principal]:
+        """本地 LRU -> Redis -> 数据库；用户不存在时返回 None（不缓存）"""
+        principal = self._get_local(user_id)
+        if principal is not None:
+            return principal
+
+        key = PRINCIPAL_KEY.format(user_id=user_id)
+        redis = None
+        try:
+            redis = await get_redis()
+            raw = await redis.get(key)
+            if raw:
+                principal = Principal.from_json(raw)
+                self._set_local(principal)
+                return principal
+        except Exception as e:
+            redis = None
+            logger.warning("principal_cache_read_failed", error=str(e))
+
+        principal = await self._load_from_db(db, user_id)
+        if principal is None:
+            return None
+        self._set_local(principal)
+        if redis is not None:
+            try:
+                await redis.setex(key, self.ttl, principal.to_json())
+            except Exception as e:
+                logger.warning("principal_cache_write_failed", error=str(e))
+        return principal
+
+    async def invalidate(self, user_ids: Iterable[uuid.UUID]) -> None:
+        """用户变更后调用：删除 Redis 键并通知所有 worker"""
+        user_ids = [str(user_id) for user_id in user_ids]
+        if not user_ids:
+            return
+        try:
+            redis = await get_redis()
+            await redis.delete(*(PRINCIPAL_KEY.format(user_id=user_id) for user_id in user_ids))
+        except Exception as e:
+            logger.warning("principal_cache_delete_failed", error=str(e))
+        await publish_invalidation(PRINCIPAL_CHANNEL, ",".join(user_ids))
+
+    async def invalidate_tenant(self, db: AsyncSession, tenant_id: uuid.UUID) -> None:
+        """租户状态变更后调用：失效该租户全部用户"""
+        user_ids = (await db.execute(select(User.id).where(User.tenant_id == tenant_id))).scalars().all()
+        await self.invalidate(user_ids)
+
+
+# 进程级单例
+principal_cache = PrincipalCache()
+on_invalidation(PRINCIPAL_CHANNEL, principal_cache.drop_local)
@@ -1,71 +1,274 @@
 """
 报告生成服务
+- PDF 渲染在进程池中执行（reportlab 为纯 Python CPU 密集型，线程池仍受 GIL 限制）
+- 渲染结果按 (组织, 年度, 汇总数据, 生成日期, 模板版本) 的内容哈希缓存在磁盘，数据不变时当天直接复用
+- 缓存目录定期清理：超过 report_cache_ttl_days 的文件删除，总大小超过 report_cache_max_bytes 时淘汰最久未用的文件
+- 批量模式：租户下所有组织并发渲染，并发数不超过进程池大小
 """
 
-import io
-from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.lib import colors
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logging import get_logger
+from app.models.organization import Organization
+from app.services.report_render import TEMPLATE_VERSION, render_carbon_inventory_pdf
+from app.services.rollup import EmissionRollupService
+
+logger = get_logger("services.report_generator")
+
+_render_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    """PDF 渲染进程池（延迟创建；spawn 启动，子进程不继承事件循环与数据库连接）"""
+    global _render_pool
+    if _render_pool is None:
+        _render_pool = ProcessPoolExecutor(
+            max_workers=get_settings().report_render_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _render_pool
+
+
+def _discard_render_pool(pool: ProcessPoolExecutor) -> None:
+    """丢弃已损坏的进程池（并发请求只重建一次）"""
+    global _render_pool
+    if _render_pool is pool:
+        _render_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _render_pdf(*args) -> bytes:
+    """在进程池中渲染；子进程异常退出（OOM、渲染库崩溃）使进程池损坏时重建并重试一次"""
+    loop = asyncio.get_running_loop()
+    pool = get_render_pool()
+    try:
+        return await loop.run_in_executor(pool, render_carbon_inventory_pdf, *args)
+    except BrokenProcessPool as e:
+        logger.warning("report_render_pool_broken", error=str(e))
+        _discard_render_pool(pool)
+    return await loop.run_in_executor(get_render_pool(), render_carbon_inventory_pdf, *args)
+
+
+def shutdown_render_pool() -> None:
+    """关闭渲染进程池（应用/worker 退出时调用）"""
+    global _render_pool
+    if _render_pool is not None:
+        _render_pool.shutdown(wait=False, cancel_futures=True)
+        _render_pool = None
+
+
+def _summary(scope_totals: dict[str, float]) -> dict[str, float]:
+    return {
+        "scope_1": scope_totals.get("scope_1", 0),
+        "scope_2": scope_totals.get("scope_2", 0),
+        "scope_3": scope_totals.get("scope_3", 0),
+        "total": sum(scope_totals.values())
+    }
+
+
+# 上次清理缓存目录的时间（monotonic），写入缓存时按 SWEEP_INTERVAL 节流
+_last_sweep: Optional[float] = None
+
+
+class ReportCache:
+    """按内容哈希缓存的报告文件（API 与 worker 共享 upload_dir）"""
+
+    SWEEP_INTERVAL = 600  # 秒
+
+    def __init__(self, directory: Optional[str] = None):
+        settings = get_settings()
+        self.directory = directory or settings.report_cache_dir or os.path.join(
+            settings.upload_dir, "reports", "cache"
+        )
+
+    @staticmethod
+    def key(org: Organization, year: int, summary: dict[str, float], generated_on: date) -> str:
+        """报告内容哈希：组织名称与生成日期会写入报告，一并参与计算"""
+        content = json.dumps({
+            "organization_id": str(org.id),
+            "organization_name": org.name,
+            "year": year,
+            "summary": summary,
+            "generated_on": generated_on.isoformat(),
+            "template_version": TEMPLATE_VERSION,
+        }, sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(self._path(key))  # 记录最近使用时间，清理时按此淘汰
+        except OSError:
+            pass
+        return content
+
+    def set(self, key: str, content: bytes) -> None:
+        # 先写临时文件再原子替换，并发写同一键时不会读到半个文件
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, self._path(key))
+
+        global _last_sweep
+        now = time.monotonic()
+        if _last_sweep is None or now - _last_sweep >= self.SWEEP_INTERVAL:
+            _last_sweep = now
+            settings = get_settings()
+            self.sweep(settings.report_cache_ttl_days * 86400, settings.report_cache_max_bytes)
+
+    def sweep(self, max_age: float, max_bytes: int) -> int:
+        """
+        删除超过 max_age 秒未使用的文件（含写入中断遗留的临时文件），
+        总大小仍超过 max_bytes 时从最久未用的文件开始删除；返回删除的文件数
+        """
+        try:
+            entries = [
+                entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith((".pdf", ".tmp"))
+            ]
+        except FileNotFoundError:
+            return 0
+
+        files = []
+        for entry in entries:
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue  # 其他进程已删除
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        cutoff = time.time() - max_age
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for mtime, size, path in files:
+            if mtime >= cutoff:
+                if total <= max_bytes:
+                    break
+                if path.endswith(".tmp"):
+                    continue  # 正在写入的临时文件
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            total -= size
+
+        if removed:
+            logger.info("report_cache_swept", removed=removed, remaining_bytes=total)
+        return removed
 
 
 class ReportGenerator:
     """PDF 报告生成器"""
-    
+
+    @staticmethod
+    async def render_inventory_report(
+        db: AsyncSession,
+        tenant_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        year: int,
+    ) -> Optional[bytes]:
+        """
+        汇总年度排放（月汇总表）并生成碳盘查报告 PDF
+        组织不存在或不属于该租户时返回 None
+        """
+        org = (await db.execute(select(Organization).where(
+            Organization.id == organization_id,
+            Organization.tenant_id == tenant_id  # P0-002: 租户隔离
+        ))).scalar_one_or_none()
+        if not org:
+            return None
+
+        scope_totals = await EmissionRollupService(db).scope_totals(
+            tenant_id,
+            organization_id=organization_id,
+            start=date(year, 1, 1),
+            end=date(year + 1, 1, 1),
+        )
+        return await ReportGenerator.render_cached(org, year, _summary(scope_totals))
+
+    @staticmethod
+    async def render_tenant_reports(
+        db: AsyncSession,
+        tenant_id: uuid.UUID,
+        year: int,
+        concurrency: Optional[int] = None,
+    ) -> list[tuple[Organization, bytes]]:
+        """
+        批量生成租户下所有组织的年度报告
+        组织与汇总各一条查询；渲染并发数默认等于进程池大小
+        """
+        orgs = (await db.execute(
+            select(Organization)
+            .where(Organization.tenant_id == tenant_id)  # P0-002: 租户隔离
+            .order_by(Organization.name)
+        )).scalars().all()
+        totals = await EmissionRollupService(db).scope_totals_by_organization(
+            tenant_id, start=date(year, 1, 1), end=date(year + 1, 1, 1)
+        )
+        generated_on = date.today()  # 同一批次使用相同的生成日期
+
+        semaphore = asyncio.Semaphore(concurrency or get_settings().report_render_workers)
+
+        async def render(org: Organization) -> tuple[Organization, bytes]:
+            async with semaphore:
+                content = await ReportGenerator.render_cached(
+                    org, year, _summary(totals.get(org.id, {})), generated_on
+                )
+            return org, content
+
+        return list(await asyncio.gather(*(render(org) for org in orgs)))
+
+    @staticmethod
+    async def render_cached(
+        org: Organization,
+        year: int,
+        summary: dict[str, float],
+        generated_on: Optional[date] = None,
+    ) -> bytes:
+        """命中内容哈希缓存时直接返回，否则在进程池中渲染并写入缓存"""
+        generated_on = generated_on or date.today()
+        cache = ReportCache()
+        key = ReportCache.key(org, year, summary, generated_on)
+        content = await asyncio.to_thread(cache.get, key)
+        if content is not None:
+            return content
+
+        content = await _render_pdf(org.name, year, summary, generated_on)
+        try:
+            await asyncio.to_thread(cache.set, key, content)
+        except OSError as e:
+            logger.warning("report_cache_set_failed", error=str(e))
+        return content
+
     @staticmethod
     def generate_carbon_inventory_report(
         org_name: str,
         year: int,
         summary: dict
     ) -> bytes:
-        """生成碳盘查报告 PDF"""
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        
-        # 标题
-        c.setFont("Helvetica-Bold", 24)
-        c.drawString(50, height - 50, "Carbon Inventory Report")
-        
-        # 基本信息
-        c.setFont("Helvetica", 12)
-        c.drawString(50, height - 100, f"Organization: {org_name}")
-        c.drawString(50, height - 120, f"Year: {year}")
-        c.drawString(50, height - 140, f"Generated: {datetime.now().strftime('%Y-%m-%d')}")
-        
-        # 排放汇总
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, height - 180, "Emission Summary (tCO2e)")
-        
-        c.setFont("Helvetica", 12)
-        y = height - 210
-        
-        c.drawString(50, y, "Scope 1 (Direct):")
-        c.drawRightString(300, y, f"{summary.get('scope_1', 0):.2f}")
-        
-        y -= 25
-        c.drawString(50, y, "Scope 2 (Energy Indirect):")
-        c.drawRightString(300, y, f"{summary.get('scope_2', 0):.2f}")
-        
-        y -= 25
-        c.drawString(50, y, "Scope 3 (Other Indirect):")
-        c.drawRightString(300, y, f"{summary.get('scope_3', 0):.2f}")
-        
-        y -= 40
-        c.line(50, y + 15, 300, y + 15)
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(50, y, "Total Emissions:")
-        c.drawRightString(300, y, f"{summary.get('total', 0):.2f}")
-        
-        # 底部声明
-        c.setFont("Helvetica-Oblique", 10)
-        c.setFillColor(colors.grey)
-        c.drawString(50, 50, "Generated by CarbonOS SaaS Platform")
-        
-        c.showPage()
-        c.save()
-        
-        buffer.seek(0)
-        return buffer.getvalue()
+        """生成碳盘查报告 PDF（当前进程内同步渲染）"""
+        return render_carbon_inventory_pdf(org_name, year, summary)
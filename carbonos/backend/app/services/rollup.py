@@ -0,0 +1,252 @@
+"""
+排放预聚合服务
+维护 emission_rollups（日）与 emission_rollups_monthly（月）两张汇总表，
+读接口的查询成本只与周期数相关，与原始记录数无关。
+
+- apply: 与排放记录写入在同一事务内增量累加（UPSERT）
+- rebuild: 从 carbon_emissions 全量重建（回填/校正）
+"""
+
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Iterable, Mapping, Optional
+
+from sqlalchemy import select, delete, func, cast, Date
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.carbon import (
+    CarbonEmission, EmissionRollupDaily, EmissionRollupMonthly, EmissionScope
+)
+from app.services.org_hierarchy import child_totals_query, organization_filter
+
+
+# 单条 UPSERT 的最大行数（避免超出驱动绑定参数上限）
+UPSERT_CHUNK_SIZE = 1000
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _field(emission: Any, name: str) -> Any:
+    if isinstance(emission, Mapping):
+        return emission[name]
+    return getattr(emission, name)
+
+
+class EmissionRollupService:
+    """排放预聚合服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @property
+    def _dialect(self) -> str:
+        return self.db.bind.dialect.name
+
+    def _insert(self, model):
+        """按方言选择支持 ON CONFLICT 的 INSERT"""
+        if self._dialect == "postgresql":
+            return postgresql.insert(model)
+        return sqlite.insert(model)
+
+    async def apply(self, emissions: Iterable[Any]) -> None:
+        """
+        将新写入的排放记录累加到日/月汇总
+        emissions 可为 CarbonEmission 对象或同名键的 dict；调用方负责提交事务
+        """
+        daily: dict[tuple, list] = defaultdict(lambda: [0.0, 0])
+        monthly: dict[tuple, list] = defaultdict(lambda: [0.0, 0])
+
+        for emission in emissions:
+            day = _field(emission, "calculation_date").date()
+            base = (
+                _field(emission, "tenant_id"),
+                _field(emission, "organization_id"),
+                EmissionScope(_field(emission, "scope")),
+            )
+            amount = _field(emission, "emission_amount")
+            for bucket, key in ((daily, base + (day,)), (monthly, base + (_month_start(day),))):
+                bucket[key][0] += amount
+                bucket[key][1] += 1
+
+        await self._upsert(EmissionRollupDaily, "day", daily)
+        await self._upsert(EmissionRollupMonthly, "month", monthly)
+
+    async def _upsert(self, model, period_column: str, deltas: dict[tuple, list]) -> None:
+        if not deltas:
+            return
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "tenant_id": tenant_id,
+                "organization_id": organization_id,
+                "scope": scope,
+                period_column: period,
+                "emission_amount": amount,
+                "record_count": count,
+                "updated_at": now,
+            }
+            for (tenant_id, organization_id, scope, period), (amount, count) in deltas.items()
+        ]
+        for offset in range(0, len(rows), UPSERT_CHUNK_SIZE):
+            stmt = self._insert(model).values(rows[offset:offset + UPSERT_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["tenant_id", "organization_id", "scope", period_column],
+                set_={
+                    "emission_amount": model.emission_amount + stmt.excluded.emission_amount,
+                    "record_count": model.record_count + stmt.excluded.record_count,
+                    "updated_at": stmt.excluded.updated_at,
+                },
+            )
+            await self.db.execute(stmt)
+
+    def _day_expr(self):
+        if self._dialect == "postgresql":
+            return cast(CarbonEmission.calculation_date, Date)
+        return func.date(CarbonEmission.calculation_date)
+
+    def _month_expr(self):
+        if self._dialect == "postgresql":
+            return cast(func.date_trunc("month", CarbonEmission.calculation_date), Date)
+        return func.date(CarbonEmission.calculation_date, "start of month")
+
+    async def rebuild(self, tenant_id: Optional[uuid.UUID] = None) -> int:
+        """
+        从原始记录重建汇总表（可限定租户）
+        返回重建的日汇总行数；调用方负责提交事务
+        """
+        for model in (EmissionRollupDaily, EmissionRollupMonthly):
+            stmt = delete(model)
+            if tenant_id is not None:
+                stmt = stmt.where(model.tenant_id == tenant_id)
+            await self.db.execute(stmt)
+
+        total = 0
+        for model, period_column, period_expr in (
+            (EmissionRollupDaily, "day", self._day_expr()),
+            (EmissionRollupMonthly, "month", self._month_expr()),
+        ):
+            query = select(
+                CarbonEmission.tenant_id,
+                CarbonEmission.organization_id,
+                CarbonEmission.scope,
+                period_expr.label("period"),
+                func.sum(CarbonEmission.emission_amount).label("amount"),
+                func.count(CarbonEmission.id).label("count"),
+            ).group_by(
+                CarbonEmission.tenant_id,
+                CarbonEmission.organization_id,
+                CarbonEmission.scope,
+                period_expr,
+            )
+            if tenant_id is not None:
+                query = query.where(CarbonEmission.tenant_id == tenant_id)
+
+            rows = (await self.db.execute(query)).all()
+            if not rows:
+                continue
+            now = datetime.utcnow()
+            await self.db.execute(
+                self._insert(model),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "tenant_id": row.tenant_id,
+                        "organization_id": row.organization_id,
+                        "scope": row.scope,
+                        period_column: row.period if isinstance(row.period, date)
+                        else date.fromisoformat(row.period),
+                        "emission_amount": row.amount or 0,
+                        "record_count": row.count,
+                        "updated_at": now,
+                    }
+                    for row in rows
+                ],
+            )
+            if model is EmissionRollupDaily:
+                total = len(rows)
+        return total
+
+    async def scope_totals(
+        self,
+        tenant_id: uuid.UUID,
+        organization_id: Optional[uuid.UUID] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        include_descendants: bool = False,
+    ) -> dict[str, float]:
+        """
+        按范围汇总 [start, end)
+        起止均为月初时使用月汇总表，否则使用日汇总表
+        include_descendants: 汇总组织及其全部下级组织（闭包表，单条查询）
+        """
+        model, period = self._period_model(start, end)
+
+        query = select(
+            model.scope, func.sum(model.emission_amount).label("total")
+        ).where(model.tenant_id == tenant_id).group_by(model.scope)
+        if organization_id is not None:
+            query = query.where(
+                organization_filter(model.organization_id, tenant_id, organization_id, include_descendants)
+            )
+        query = self._period_filter(query, period, start, end)
+
+        result = await self.db.execute(query)
+        return {EmissionScope(row.scope).value: row.total or 0 for row in result.all()}
+
+    async def scope_totals_by_organization(
+        self,
+        tenant_id: uuid.UUID,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> dict[uuid.UUID, dict[str, float]]:
+        """租户内所有组织按范围汇总 [start, end)（单条查询）"""
+        model, period = self._period_model(start, end)
+        query = select(
+            model.organization_id, model.scope, func.sum(model.emission_amount).label("total")
+        ).where(model.tenant_id == tenant_id).group_by(model.organization_id, model.scope)
+        query = self._period_filter(query, period, start, end)
+
+        totals: dict[uuid.UUID, dict[str, float]] = defaultdict(dict)
+        for row in (await self.db.execute(query)).all():
+            totals[row.organization_id][EmissionScope(row.scope).value] = row.total or 0
+        return dict(totals)
+
+    async def child_totals(
+        self,
+        tenant_id: uuid.UUID,
+        organization_id: uuid.UUID,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> list[dict[str, Any]]:
+        """按直接下级组织分项汇总 [start, end)（每个下级含其子树，单条查询）"""
+        model, period = self._period_model(start, end)
+        query = child_totals_query(model, model.emission_amount, tenant_id, organization_id).where(
+            model.tenant_id == tenant_id
+        )
+        query = self._period_filter(query, period, start, end)
+
+        result = await self.db.execute(query)
+        return [
+            {"organization_id": row.organization_id, "name": row.name, "total": row.total or 0}
+            for row in result.all()
+        ]
+
+    @staticmethod
+    def _period_model(start: Optional[date], end: Optional[date]):
+        """起止均为月初时使用月汇总表，否则使用日汇总表"""
+        if all(d is None or d.day == 1 for d in (start, end)):
+            return EmissionRollupMonthly, EmissionRollupMonthly.month
+        return EmissionRollupDaily, EmissionRollupDaily.day
+
+    @staticmethod
+    def _period_filter(query, period, start: Optional[date], end: Optional[date]):
+        if start is not None:
+            query = query.where(period >= start)
+        if end is not None:
+            query = query.where(period < end)
+        return query
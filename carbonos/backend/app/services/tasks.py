@@ -0,0 +1,183 @@
+"""
+后台任务处理函数
+由 app.worker 导入注册；API 进程只通过任务类型常量提交任务
+"""
+
+import asyncio
+import os
+import uuid
+import zipfile
+from typing import Any, Optional
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker
+from app.core.jobs import JobContext, JobStatus, PermanentJobError, job_handler
+from app.models.energy import ImportRecord
+from app.services.energy_import import EnergyDataImporter, ImportFormatError, open_row_reader
+from app.services.org_hierarchy import OrganizationHierarchy
+from app.services.report_generator import ReportGenerator
+from app.services.rollup import EmissionRollupService
+
+# 任务类型
+ENERGY_IMPORT = "energy_import"
+INVENTORY_REPORT = "inventory_report"
+INVENTORY_REPORT_BULK = "inventory_report_bulk"
+ROLLUP_REBUILD = "rollup_rebuild"
+
+# 任务状态 -> ImportRecord.status
+_IMPORT_STATUS = {
+    JobStatus.RUNNING: "processing",
+    JobStatus.RETRYING: "pending",
+    JobStatus.SUCCEEDED: "completed",
+    JobStatus.FAILED: "failed",
+}
+
+
+def job_storage_path(*parts: str) -> str:
+    """任务文件存储路径（API 与 worker 共享 upload_dir）"""
+    path = os.path.join(get_settings().upload_dir, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+# ============ 能源数据导入 ============
+
+async def sync_import_record(ctx: JobContext, status: str, error: Optional[str]) -> None:
+    """ImportRecord.status 跟随任务状态；终态时清理上传文件"""
+    record_status = _IMPORT_STATUS.get(status)
+    if record_status is None:
+        return
+    async with async_session_maker() as db:
+        record = await db.get(ImportRecord, uuid.UUID(ctx.payload["record_id"]))
+        if record is None:
+            return
+        record.status = record_status
+        if status == JobStatus.FAILED and error:
+            record.error_message = "\n".join(filter(None, [error, record.error_message]))
+        await db.commit()
+
+    if status in (JobStatus.SUCCEEDED, JobStatus.FAILED):
+        try:
+            os.remove(ctx.payload["path"])
+        except FileNotFoundError:
+            pass
+
+
+@job_handler(ENERGY_IMPORT, on_state=sync_import_record)
+async def run_energy_import(ctx: JobContext) -> dict[str, Any]:
+    """导入上传文件；重试时从已提交的行之后继续"""
+    path = ctx.payload["path"]
+    async with async_session_maker() as db:
+        record = await db.get(ImportRecord, uuid.UUID(ctx.payload["record_id"]))
+        if record is None:
+            raise PermanentJobError("导入记录不存在")
+        if not os.path.exists(path):
+            raise PermanentJobError("上传文件已丢失，请重新导入")
+
+        # 失败回滚会使 record 过期，finally 中不能再访问其属性
+        organization_id = record.organization_id
+        importer = EnergyDataImporter(
+            db,
+            tenant_id=uuid.UUID(ctx.tenant_id),
+            organization_id=organization_id,
+            created_by=record.created_by,
+        )
+        size = os.path.getsize(path) or 1
+        with open(path, "rb") as f:
+            async def on_chunk(current: ImportRecord) -> None:
+                # 以文件读取位置估算进度
+                await ctx.progress(min(f.tell() / size * 100, 99), f"已处理 {current.total_rows} 行")
+
+            try:
+                await importer.run(
+                    record,
+                    open_row_reader(record.filename, f),
+                    resume=ctx.attempt > 1,
+                    on_chunk=on_chunk,
+                )
+            except ImportFormatError as e:
+                raise PermanentJobError(str(e)) from e
+            finally:
+                # 已提交的分块即使后续失败也已可见
+                await OrganizationHierarchy.invalidate_emissions(
+                    db, importer.tenant_id, [organization_id]
+                )
+
+        return {
+            "record_id": str(record.id),
+            "total_rows": record.total_rows,
+            "success_rows": record.success_rows,
+            "failed_rows": record.failed_rows,
+        }
+
+
+# ============ 碳盘查报告 ============
+
+@job_handler(INVENTORY_REPORT)
+async def run_inventory_report(ctx: JobContext) -> dict[str, Any]:
+    """生成碳盘查报告 PDF，结果文件通过 /jobs/{id}/result 下载"""
+    year = int(ctx.payload["year"])
+    async with async_session_maker() as db:
+        content = await ReportGenerator.render_inventory_report(
+            db,
+            tenant_id=uuid.UUID(ctx.tenant_id),
+            organization_id=uuid.UUID(ctx.payload["organization_id"]),
+            year=year,
+        )
+    if content is None:
+        raise PermanentJobError("组织不存在")
+
+    path = job_storage_path("reports", f"{ctx.id}.pdf")
+    with open(path, "wb") as f:
+        f.write(content)
+    return {
+        "path": path,
+        "filename": f"Carbon_Inventory_{year}.pdf",
+        "media_type": "application/pdf",
+    }
+
+
+def _write_report_archive(path: str, reports: list[tuple[str, bytes]]) -> None:
+    # PDF 已压缩，归档时不再压缩
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for filename, content in reports:
+            archive.writestr(filename, content)
+
+
+@job_handler(INVENTORY_REPORT_BULK)
+async def run_inventory_report_bulk(ctx: JobContext) -> dict[str, Any]:
+    """租户下所有组织的碳盘查报告，打包为 ZIP"""
+    year = int(ctx.payload["year"])
+    async with async_session_maker() as db:
+        reports = await ReportGenerator.render_tenant_reports(db, uuid.UUID(ctx.tenant_id), year)
+    if not reports:
+        raise PermanentJobError("租户下没有组织")
+
+    path = job_storage_path("reports", f"{ctx.id}.zip")
+    await asyncio.to_thread(
+        _write_report_archive,
+        path,
+        [(f"Carbon_Inventory_{org.code}_{year}.pdf", content) for org, content in reports],
+    )
+    return {
+        "path": path,
+        "filename": f"Carbon_Inventory_{year}.zip",
+        "media_type": "application/zip",
+        "count": len(reports),
+    }
+
+
+# ============ 排放汇总重算 ============
+
+@job_handler(ROLLUP_REBUILD)
+async def run_rollup_rebuild(ctx: JobContext) -> dict[str, Any]:
+    """从原始排放记录重建租户的日/月汇总"""
+    async with async_session_maker() as db:
+        try:
+            rows = await EmissionRollupService(db).rebuild(uuid.UUID(ctx.tenant_id))
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    await OrganizationHierarchy.invalidate_tenant(uuid.UUID(ctx.tenant_id))
+    return {"daily_rows": rows}
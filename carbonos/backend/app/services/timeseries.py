@@ -0,0 +1,101 @@
+"""
+时间序列分桶聚合服务
+单条 SQL 返回整段序列，空桶补零
+
+- PostgreSQL: generate_series 生成时间桶 + date_trunc 左连接
+- 其他方言 (SQLite 测试): strftime 分组后在内存中补零
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Literal, Sequence
+
+from sqlalchemy import select, func, and_, cast, Date, DateTime, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+BucketUnit = Literal["day", "month"]
+
+_INTERVALS = {"day": "interval '1 day'", "month": "interval '1 month'"}
+_STRFTIME = {"day": "%Y-%m-%d", "month": "%Y-%m"}
+
+
+def truncate(value: datetime, unit: BucketUnit) -> datetime:
+    """截断到桶起点"""
+    if unit == "month":
+        return datetime(value.year, value.month, 1)
+    return datetime(value.year, value.month, value.day)
+
+
+def shift(value: datetime, unit: BucketUnit, periods: int) -> datetime:
+    """桶起点平移 periods 个单位"""
+    if unit == "month":
+        month_index = value.year * 12 + value.month - 1 + periods
+        return datetime(month_index // 12, month_index % 12 + 1, 1)
+    return value + timedelta(days=periods)
+
+
+def bucket_starts(end: datetime, unit: BucketUnit, periods: int) -> list[datetime]:
+    """以 end 所在桶为最后一个桶，返回 periods 个桶起点（升序）"""
+    last = truncate(end, unit)
+    return [shift(last, unit, -i) for i in range(periods - 1, -1, -1)]
+
+
+async def bucketed_sum(
+    db: AsyncSession,
+    value_column: Any,
+    time_column: Any,
+    filters: Sequence[Any],
+    end: datetime,
+    unit: BucketUnit,
+    periods: int,
+) -> list[tuple[datetime, float]]:
+    """
+    按天/月分桶求和
+
+    Args:
+        value_column: 求和列
+        time_column: 时间列 (DateTime 或 Date)
+        filters: 额外过滤条件（租户、组织等）
+        end: 序列截止时间（所在桶为最后一个桶）
+        unit: 分桶单位 day/month
+        periods: 桶数量
+
+    Returns:
+        [(桶起点, 合计值)]，空桶为 0
+    """
+    starts = bucket_starts(end, unit, periods)
+    range_start = starts[0]
+    range_end = shift(starts[-1], unit, 1)
+    if isinstance(time_column.type, Date):
+        in_range = [time_column >= range_start.date(), time_column < range_end.date()]
+    else:
+        in_range = [time_column >= range_start, time_column < range_end]
+
+    if db.bind.dialect.name == "postgresql":
+        series = select(
+            func.generate_series(
+                range_start, starts[-1], literal_column(_INTERVALS[unit])
+            ).label("bucket")
+        ).subquery()
+        bucket = func.date_trunc(unit, cast(time_column, DateTime))
+        table = time_column.table
+        query = (
+            select(series.c.bucket, func.coalesce(func.sum(value_column), 0).label("total"))
+            .select_from(
+                series.outerjoin(table, and_(bucket == series.c.bucket, *in_range, *filters))
+            )
+            .group_by(series.c.bucket)
+            .order_by(series.c.bucket)
+        )
+        result = await db.execute(query)
+        return [(row.bucket.replace(tzinfo=None), float(row.total)) for row in result.all()]
+
+    # 可移植回退：按格式化后的时间分组，内存补零
+    label = func.strftime(_STRFTIME[unit], time_column)
+    query = (
+        select(label.label("bucket"), func.sum(value_column).label("total"))
+        .where(*in_range, *filters)
+        .group_by(label)
+    )
+    result = await db.execute(query)
+    totals = {row.bucket: float(row.total or 0) for row in result.all()}
+    return [(start, totals.get(start.strftime(_STRFTIME[unit]), 0.0)) for start in starts]
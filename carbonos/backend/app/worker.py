@@ -0,0 +1,51 @@
+"""
+后台任务 worker 入口
+与 API 进程分开部署，执行导入、报告生成、重算等重任务
+
+用法:
+    python -m app.worker
+"""
+
+import asyncio
+import signal
+
+from app.core.cache import close_redis
+from app.core.database import engine
+from app.core.jobs import JobWorker
+from app.core.logging import get_logger, setup_logging
+from app.services.cache_warmer import cache_warmer
+from app.services.report_generator import shutdown_render_pool
+import app.services.tasks  # noqa: F401  注册任务处理函数
+
+# 引入模型以确保外键解析
+from app.models.tenant import Tenant  # noqa: F401
+from app.models.user import User  # noqa: F401
+from app.models.organization import Organization  # noqa: F401
+
+
+async def main() -> None:
+    setup_logging()
+    logger = get_logger("app.worker")
+    worker = JobWorker()
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, worker.stop)
+        except NotImplementedError:  # Windows
+            pass
+
+    # 导入等任务写入数据后重新预热仪表盘缓存（启动预热由 API 进程负责）
+    cache_warmer.start(warm_on_start=False)
+    try:
+        await worker.run()
+    finally:
+        await cache_warmer.stop()
+        shutdown_render_pool()
+        await close_redis()
+        await engine.dispose()
+        logger.info("worker_shutdown")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
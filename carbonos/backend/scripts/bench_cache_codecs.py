@@ -0,0 +1,120 @@
+"""
+缓存编解码基准
+按实际缓存内容的结构构造载荷（仪表盘摘要/趋势、排放因子列表、组织树），
+对比各编解码器与压缩组合的载荷大小与编码/解码耗时（微秒）。未安装的依赖自动跳过。
+
+用法:
+    python scripts/bench_cache_codecs.py --iterations 2000
+    python scripts/bench_cache_codecs.py --factors 2000 --organizations 5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# 添加项目根目录到 sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.cache_codec import CODECS, COMPRESSORS, CacheSerializer
+from app.models.organization import Organization, OrganizationType
+from app.schemas.carbon import EmissionFactorResponse
+from app.services.dashboard import DashboardService
+from app.services.org_hierarchy import build_tree
+
+
+def _envelope(value) -> dict:
+    """CacheManager.fetch 写入的缓存结构"""
+    return {"v": value, "e": time.time() + 60, "d": 0.012}
+
+
+def build_payloads(factor_count: int, organization_count: int) -> dict[str, object]:
+    now = datetime.utcnow()
+    summary = DashboardService._build_summary(1234.56, 1100.2, 4321.0, 98765.4)
+    trends_month = [{"name": f"{day}日", "value": round(random.uniform(10, 500), 2)} for day in range(1, 31)]
+    trends_year = [{"name": f"{month}月", "value": round(random.uniform(300, 9000), 2)} for month in range(1, 13)]
+
+    factors = [
+        EmissionFactorResponse(
+            id=uuid.uuid4(),
+            name=f"电网排放因子-{i}",
+            category=random.choice(["电力", "燃料", "热力", "交通"]),
+            energy_type=random.choice(["electricity", "natural_gas", "diesel", "steam"]),
+            scope=random.choice(["scope_1", "scope_2", "scope_3"]),
+            factor_value=random.uniform(0.1, 3.0),
+            unit="kgCO2e/kWh",
+            source="生态环境部 2023",
+            region=random.choice(["华东", "华北", "华南", None]),
+            year=2023,
+            is_default=i % 10 == 0,
+            created_at=now - timedelta(days=i),
+        ).model_dump(mode="json")
+        for i in range(factor_count)
+    ]
+
+    organizations = []
+    for i in range(organization_count):
+        parent = random.choice(organizations[: max(1, i // 4)]) if organizations else None
+        organizations.append(Organization(
+            id=uuid.uuid4(),
+            name=f"组织-{i}",
+            code=f"ORG{i:05d}",
+            type=OrganizationType.PARK if parent is None else OrganizationType.ENTERPRISE,
+            parent_id=parent.id if parent else None,
+            address="上海市浦东新区",
+            created_at=now,
+            updated_at=now,
+        ))
+
+    return {
+        "dashboard_summary": _envelope(summary),
+        "dashboard_trends_month": _envelope(trends_month),
+        "dashboard_trends_year": _envelope(trends_year),
+        "emission_factors": _envelope(factors),
+        "org_tree": build_tree(organizations),
+    }
+
+
+def measure(serializer: CacheSerializer, payload: object, iterations: int) -> tuple[int, float, float]:
+    encoded = serializer.encode(payload)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        serializer.encode(payload)
+    encode_us = (time.perf_counter() - started) / iterations * 1e6
+    started = time.perf_counter()
+    for _ in range(iterations):
+        serializer.decode(encoded)
+    decode_us = (time.perf_counter() - started) / iterations * 1e6
+    return len(encoded), encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="缓存编解码基准")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--factors", type=int, default=500)
+    parser.add_argument("--organizations", type=int, default=1000)
+    parser.add_argument("--compress-min-bytes", type=int, default=4096)
+    args = parser.parse_args()
+
+    random.seed(42)
+    payloads = build_payloads(args.factors, args.organizations)
+    codecs = [name for name, spec in CODECS.items() if spec[3]]
+    compressions = [""] + [name for name, spec in COMPRESSORS.items() if spec[3]]
+
+    print(f"{'payload':<24}{'codec':<10}{'compress':<10}{'bytes':>10}{'encode_us':>12}{'decode_us':>12}")
+    for payload_name, payload in payloads.items():
+        # 大载荷的迭代次数按比例减少
+        iterations = max(10, args.iterations // max(1, len(CacheSerializer("json").encode(payload)) // 4096))
+        for codec in codecs:
+            for compression in compressions:
+                serializer = CacheSerializer(codec, compression, args.compress_min_bytes)
+                size, encode_us, decode_us = measure(serializer, payload, iterations)
+                print(f"{payload_name:<24}{codec:<10}{compression or '-':<10}"
+                      f"{size:>10}{encode_us:>12.1f}{decode_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
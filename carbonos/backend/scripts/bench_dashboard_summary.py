@@ -0,0 +1,170 @@
+"""
+仪表盘摘要延迟基准
+对比旧版 4 次 SUM 查询（扫描原始记录）与基于月汇总表的单次条件聚合查询
+
+用法:
+    python scripts/bench_dashboard_summary.py --rows 100000 --iterations 200
+    python scripts/bench_dashboard_summary.py --url postgresql+asyncpg://... --rows 500000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+# 添加项目根目录到 sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select, func, insert, delete
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.database import Base
+from app.models.tenant import Tenant
+from app.models.user import User  # noqa: F401  确保外键目标表已注册
+from app.models.organization import Organization, OrganizationType
+from app.models.carbon import CarbonEmission, EmissionScope
+from app.models.energy import EnergyData, EnergyType
+from app.services.dashboard import DashboardService
+from app.services.rollup import EmissionRollupService
+
+
+async def legacy_summary(db: AsyncSession, tenant_id, organization_id) -> dict:
+    """旧版实现：4 次独立 SUM 查询"""
+    now = datetime.utcnow()
+    this_month_start = datetime(now.year, now.month, 1)
+    last_month_start = (this_month_start - timedelta(days=1)).replace(day=1)
+
+    base = (
+        CarbonEmission.organization_id == organization_id,
+        CarbonEmission.tenant_id == tenant_id,
+    )
+    total_emission = (await db.execute(select(func.sum(CarbonEmission.emission_amount)).where(
+        *base, CarbonEmission.calculation_date >= this_month_start
+    ))).scalar() or 0
+    last_emission = (await db.execute(select(func.sum(CarbonEmission.emission_amount)).where(
+        *base,
+        CarbonEmission.calculation_date >= last_month_start,
+        CarbonEmission.calculation_date < this_month_start
+    ))).scalar() or 0
+    total_cost = (await db.execute(select(func.sum(EnergyData.cost)).where(
+        EnergyData.organization_id == organization_id,
+        EnergyData.tenant_id == tenant_id,
+        EnergyData.data_date >= this_month_start.date()
+    ))).scalar() or 0
+    year_emission = (await db.execute(select(func.sum(CarbonEmission.emission_amount)).where(
+        *base, CarbonEmission.calculation_date >= datetime(now.year, 1, 1)
+    ))).scalar() or 0
+    return DashboardService._build_summary(total_emission, last_emission, year_emission, total_cost)
+
+
+async def seed(session_maker, rows: int):
+    """写入一个租户/组织及随机分布在最近 400 天的排放记录"""
+    async with session_maker() as db:
+        tenant = Tenant(name="bench", code=f"bench_{uuid.uuid4().hex[:8]}")
+        db.add(tenant)
+        await db.flush()
+        org = Organization(
+            name="bench", code=f"bench_{uuid.uuid4().hex[:8]}",
+            type=OrganizationType.PARK, tenant_id=tenant.id
+        )
+        db.add(org)
+        await db.flush()
+
+        now = datetime.utcnow()
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "id": uuid.uuid4(),
+                "organization_id": org.id,
+                "tenant_id": tenant.id,
+                "emission_factor_id": uuid.uuid4(),
+                "scope": random.choice(list(EmissionScope)),
+                "activity_data": 1000.0,
+                "activity_unit": "kWh",
+                "emission_amount": random.random() * 10,
+                "calculation_date": now - timedelta(days=random.randint(0, 400)),
+                "created_at": now,
+            })
+            if len(batch) >= 5000:
+                await db.execute(insert(CarbonEmission), batch)
+                batch = []
+        if batch:
+            await db.execute(insert(CarbonEmission), batch)
+        await db.execute(insert(EnergyData), [{
+            "id": uuid.uuid4(),
+            "organization_id": org.id,
+            "tenant_id": tenant.id,
+            "energy_type": EnergyType.ELECTRICITY,
+            "data_date": (now - timedelta(days=d)).date(),
+            "consumption": 100.0,
+            "unit": "kWh",
+            "cost": 80.0,
+            "created_at": now,
+        } for d in range(60)])
+        await EmissionRollupService(db).rebuild(tenant.id)
+        await db.commit()
+        return tenant.id, org.id
+
+
+async def measure(session_maker, fn, iterations: int) -> list[float]:
+    samples = []
+    async with session_maker() as db:
+        for _ in range(iterations):
+            started = time.perf_counter()
+            await fn(db)
+            samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(name: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{name:<12} mean={statistics.mean(samples):8.2f}ms "
+        f"p50={statistics.median(samples):8.2f}ms p95={p95:8.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="仪表盘摘要延迟基准")
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_dashboard.db")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.url, echo=False)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    if args.url.startswith("sqlite"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    print(f"seeding {args.rows} emission rows ...")
+    tenant_id, org_id = await seed(session_maker, args.rows)
+
+    legacy = await measure(session_maker, lambda db: legacy_summary(db, tenant_id, org_id), args.iterations)
+    single = await measure(
+        session_maker,
+        lambda db: DashboardService(db).compute_summary(tenant_id, org_id),
+        args.iterations,
+    )
+    report("4 queries", legacy)
+    report("single scan", single)
+
+    async with session_maker() as db:
+        await db.execute(delete(CarbonEmission).where(CarbonEmission.tenant_id == tenant_id))
+        await db.execute(delete(EnergyData).where(EnergyData.tenant_id == tenant_id))
+        await db.execute(delete(Organization).where(Organization.id == org_id))
+        await db.execute(delete(Tenant).where(Tenant.id == tenant_id))
+        await db.commit()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+能源数据批量录入基准
+对比旧版逐条 ORM add 与 bulk_create_energy_data（整批校验 + 单次写入）
+
+用法:
+    python scripts/bench_energy_batch.py --rows 50000
+    python scripts/bench_energy_batch.py --url postgresql+asyncpg://... --rows 50000 --upsert
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+# 添加项目根目录到 sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.database import Base
+from app.models.tenant import Tenant
+from app.models.user import User  # noqa: F401  确保外键目标表已注册
+from app.models.organization import Organization, OrganizationType
+from app.models.energy import EnergyData, EnergyType, DataSource
+from app.schemas.energy import EnergyDataCreate
+from app.services.energy_data import bulk_create_energy_data
+
+ENERGY_TYPES = [(EnergyType.ELECTRICITY, "kWh"), (EnergyType.NATURAL_GAS, "m³"), (EnergyType.STEAM, "t")]
+
+
+def generate_items(org_ids: list[uuid.UUID], rows: int) -> list[dict]:
+    """生成 (组织, 能源类型, 日期) 互不重复的请求行"""
+    start = date(2020, 1, 1)
+    items = []
+    for i in range(rows):
+        energy_type, unit = ENERGY_TYPES[i % len(ENERGY_TYPES)]
+        org_id = org_ids[(i // len(ENERGY_TYPES)) % len(org_ids)]
+        day = i // (len(ENERGY_TYPES) * len(org_ids))
+        items.append({
+            "organization_id": str(org_id),
+            "energy_type": energy_type.value,
+            "data_date": (start + timedelta(days=day)).isoformat(),
+            "consumption": round(random.uniform(10, 5000), 2),
+            "unit": unit,
+            "cost": round(random.uniform(10, 3000), 2),
+        })
+    return items
+
+
+async def legacy_batch(db: AsyncSession, items: list[dict], tenant_id: uuid.UUID) -> None:
+    """旧版实现：逐条构造 ORM 对象"""
+    for raw in items:
+        item = EnergyDataCreate.model_validate(raw)
+        db.add(EnergyData(
+            organization_id=item.organization_id,
+            energy_type=EnergyType(item.energy_type),
+            data_date=item.data_date,
+            consumption=item.consumption,
+            unit=item.unit,
+            cost=item.cost,
+            remarks=item.remarks,
+            source=DataSource.MANUAL,
+            tenant_id=tenant_id,
+        ))
+    await db.commit()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="能源数据批量录入基准")
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_energy_batch.db")
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--orgs", type=int, default=20)
+    parser.add_argument("--upsert", action="store_true", help="第二次以 upsert 重复提交")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    engine = create_async_engine(args.url, echo=False)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    if args.url.startswith("sqlite"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    async with session_maker() as db:
+        tenant = Tenant(name="bench", code=f"bench_{uuid.uuid4().hex[:8]}")
+        db.add(tenant)
+        await db.flush()
+        orgs = [
+            Organization(
+                name=f"bench-{i}", code=f"bench_{uuid.uuid4().hex[:8]}",
+                type=OrganizationType.PARK, tenant_id=tenant.id
+            )
+            for i in range(args.orgs)
+        ]
+        db.add_all(orgs)
+        await db.commit()
+        items = generate_items([org.id for org in orgs], args.rows)
+
+        if not args.skip_legacy:
+            started = time.perf_counter()
+            await legacy_batch(db, items, tenant.id)
+            print(f"legacy  rows={args.rows} elapsed={time.perf_counter() - started:.3f}s")
+
+        for attempt in range(2 if args.upsert else 1):
+            started = time.perf_counter()
+            result = await bulk_create_energy_data(db, items, tenant.id, upsert=args.upsert)
+            await db.commit()
+            elapsed = time.perf_counter() - started
+            print(
+                f"bulk    rows={args.rows} inserted={result['inserted']} updated={result['updated']} "
+                f"failed={result['failed_count']} elapsed={elapsed:.3f}s rows/s={args.rows / elapsed:,.0f}"
+            )
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
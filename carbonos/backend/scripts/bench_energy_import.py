@@ -0,0 +1,128 @@
+"""
+能源数据流式导入基准
+生成大文件（CSV 或 xlsx）并通过 EnergyDataImporter 导入，输出吞吐量与峰值内存
+
+用法:
+    python scripts/bench_energy_import.py --rows 1000000 --format csv
+    python scripts/bench_energy_import.py --rows 200000 --format xlsx --chunk-size 10000
+    python scripts/bench_energy_import.py --url postgresql+asyncpg://... --rows 1000000
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from datetime import date, timedelta
+
+# 添加项目根目录到 sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.database import Base
+from app.models.tenant import Tenant
+from app.models.user import User  # noqa: F401  确保外键目标表已注册
+from app.models.organization import Organization, OrganizationType
+from app.models.energy import ImportRecord
+from app.services.energy_import import EnergyDataImporter, open_row_reader
+
+HEADER = ["日期", "能源类型", "消耗量", "单位", "费用", "备注"]
+ENERGY_TYPES = [("电力", "kWh"), ("天然气", "m³"), ("柴油", "L"), ("蒸汽", "t")]
+
+
+def generate_rows(rows: int):
+    start = date(2020, 1, 1)
+    for i in range(rows):
+        energy_type, unit = random.choice(ENERGY_TYPES)
+        yield [
+            (start + timedelta(days=i % 2000)).isoformat(),
+            energy_type,
+            round(random.uniform(10, 5000), 2),
+            unit,
+            round(random.uniform(10, 3000), 2),
+            f"meter-{i % 100}",
+        ]
+
+
+def generate_file(path: str, fmt: str, rows: int) -> None:
+    """流式生成测试文件（生成过程同样不占用与行数成比例的内存）"""
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(generate_rows(rows))
+        return
+
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(HEADER)
+    for row in generate_rows(rows):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def peak_rss_mb() -> float:
+    # Linux 下 ru_maxrss 单位为 KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="能源数据流式导入基准")
+    parser.add_argument("--url", default="sqlite+aiosqlite:///./bench_import.db")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.gettempdir(), f"bench_import_{args.rows}.{args.format}")
+    if not os.path.exists(path):
+        started = time.perf_counter()
+        generate_file(path, args.format, args.rows)
+        print(f"generated {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MB) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+    engine = create_async_engine(args.url, echo=False)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    if args.url.startswith("sqlite"):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+
+    async with session_maker() as db:
+        tenant = Tenant(name="bench", code=f"bench_{uuid.uuid4().hex[:8]}")
+        db.add(tenant)
+        await db.flush()
+        org = Organization(
+            name="bench", code=f"bench_{uuid.uuid4().hex[:8]}",
+            type=OrganizationType.PARK, tenant_id=tenant.id
+        )
+        db.add(org)
+        await db.flush()
+        record = ImportRecord(filename=os.path.basename(path), organization_id=org.id)
+        db.add(record)
+        await db.commit()
+
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        with open(path, "rb") as f:
+            importer = EnergyDataImporter(db, tenant.id, org.id, chunk_size=args.chunk_size)
+            await importer.run(record, open_row_reader(path, f))
+        elapsed = time.perf_counter() - started
+
+    print(f"status={record.status} total={record.total_rows} "
+          f"success={record.success_rows} failed={record.failed_rows}")
+    print(f"elapsed={elapsed:.2f}s rows/s={record.success_rows / elapsed:,.0f}")
+    print(f"peak_rss before={rss_before:.1f}MB after={peak_rss_mb():.1f}MB")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
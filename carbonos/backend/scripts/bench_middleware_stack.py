@@ -0,0 +1,108 @@
+"""
+中间件栈开销基准
+按 main.py 的顺序组装纯 ASGI 中间件栈（业务应用为空响应），直接调用 ASGI 接口，
+输出每个请求的平均/分位耗时（微秒）。限流使用进程内令牌桶后端，不依赖 Redis。
+
+用法:
+    python scripts/bench_middleware_stack.py --requests 50000
+    python scripts/bench_middleware_stack.py --requests 50000 --anonymous
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+# 添加项目根目录到 sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.security import create_access_token
+from app.core.metrics import PrometheusMiddleware
+from app.core.middleware.auth import AuthClaimsMiddleware
+from app.core.middleware.ratelimit import (
+    AuthRateLimitMiddleware, RateLimitMiddleware, SecurityHeadersMiddleware
+)
+from app.core.middleware.tenant import TenantMiddleware
+from app.core.rate_limiter import LocalTokenBucket, RateLimiter
+
+# 浏览器请求的典型请求头
+BROWSER_HEADERS = [
+    (b"host", b"api.scdc.cloud"),
+    (b"user-agent", b"Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36"),
+    (b"accept", b"application/json, text/plain, */*"),
+    (b"accept-language", b"zh-CN,zh;q=0.9,en;q=0.8"),
+    (b"accept-encoding", b"gzip, deflate, br"),
+    (b"origin", b"https://scdc.cloud"),
+    (b"referer", b"https://scdc.cloud/dashboard"),
+    (b"sec-fetch-dest", b"empty"),
+    (b"sec-fetch-mode", b"cors"),
+    (b"sec-fetch-site", b"same-site"),
+    (b"connection", b"keep-alive"),
+    (b"x-real-ip", b"203.0.113.7"),
+    (b"x-forwarded-for", b"203.0.113.7, 10.0.0.2"),
+]
+
+
+async def endpoint(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def build_stack():
+    """与 main.py 相同的顺序（不含 CORS 与请求日志）"""
+    app = TenantMiddleware(endpoint)
+    app = SecurityHeadersMiddleware(app)
+    app = AuthRateLimitMiddleware(app)
+    rate_limit = RateLimitMiddleware(app, limiter=RateLimiter(backend=LocalTokenBucket()))
+    app = PrometheusMiddleware(rate_limit)
+    app = AuthClaimsMiddleware(app)
+    return app, rate_limit
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="中间件栈开销基准")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--anonymous", action="store_true", help="不携带 Token")
+    args = parser.parse_args()
+
+    stack, rate_limit = build_stack()
+    tenant_id = uuid.uuid4()
+    # 预置租户限流配置，避免访问数据库；配额足够大，只测量放行路径
+    rate_limit.tenant_limits._cache[str(tenant_id)] = (float("inf"), (True, 10 ** 9))
+    rate_limit.ANONYMOUS_LIMIT = 10 ** 9
+
+    headers = list(BROWSER_HEADERS)
+    if not args.anonymous:
+        token = create_access_token({"sub": str(uuid.uuid4()), "tenant_id": str(tenant_id)})
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+
+    paths = [f"/api/v1/data/energy/{uuid.uuid4()}" for _ in range(200)] + ["/api/v1/dashboard/summary"] * 200
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    samples = []
+    for i in range(args.requests):
+        scope = {
+            "type": "http", "method": "GET", "path": paths[i % len(paths)],
+            "headers": list(headers), "client": ("10.0.0.2", 51234), "query_string": b"",
+        }
+        started = time.perf_counter()
+        await stack(scope, receive, send)
+        samples.append((time.perf_counter() - started) * 1e6)
+
+    samples = samples[len(samples) // 10:]  # 丢弃预热
+    samples.sort()
+    print(f"requests={args.requests} authenticated={not args.anonymous}")
+    print(f"mean={statistics.mean(samples):.1f}us "
+          f"p50={samples[len(samples) // 2]:.1f}us p99={samples[int(len(samples) * 0.99)]:.1f}us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
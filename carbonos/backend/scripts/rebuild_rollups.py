@@ -0,0 +1,45 @@
+"""
+重建排放预聚合表（emission_rollups / emission_rollups_monthly）
+用于回填、数据修复或直接写入 carbon_emissions 后的校正
+
+用法:
+    python scripts/rebuild_rollups.py
+    python scripts/rebuild_rollups.py --tenant <tenant_uuid>
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import uuid
+
+# 添加项目根目录到 sys.path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import async_session_maker
+from app.models.tenant import Tenant  # noqa: F401  确保外键目标表已注册
+from app.models.user import User  # noqa: F401
+from app.models.organization import Organization  # noqa: F401
+from app.services.rollup import EmissionRollupService
+
+
+async def rebuild(tenant_id: uuid.UUID | None) -> None:
+    async with async_session_maker() as db:
+        try:
+            rows = await EmissionRollupService(db).rebuild(tenant_id)
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+    scope = f"tenant {tenant_id}" if tenant_id else "all tenants"
+    print(f"Rebuilt {rows} daily rollup rows for {scope}.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="重建排放预聚合表")
+    parser.add_argument("--tenant", type=uuid.UUID, default=None, help="仅重建指定租户")
+    args = parser.parse_args()
+
+    if sys.platform == 'win32':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+    asyncio.run(rebuild(args.tenant))
@@ -18,6 +18,7 @@ from app.models.user import User, UserRole, UserStatus
 from app.models.organization import Organization, OrganizationType
 from app.models.carbon import CarbonEmission, EmissionFactor, EmissionScope
 from app.models.energy import EnergyData, EnergyType, DataSource
+from app.services.factor_cache import factor_cache
 
 import bcrypt
 
@@ -124,6 +125,8 @@ async def create_emission_factors(db):
         db.add(factor)
     
     await db.commit()
+    # 因子直接写库，需通知各 worker 重新加载因子表
+    await factor_cache.invalidate()
     print(f"  ✅ 创建 {len(factors)} 个排放因子")
     return factors
 
@@ -220,6 +223,7 @@ async def create_energy_data(db, organizations: list[Organization], days: int =
             # 电力数据
             electricity = EnergyData(
                 id=uuid.uuid4(),
+                tenant_id=org.tenant_id,
                 organization_id=org.id,
                 energy_type=EnergyType.ELECTRICITY,
                 data_date=data_date,
@@ -235,6 +239,7 @@ async def create_energy_data(db, organizations: list[Organization], days: int =
             if random.random() > 0.5:
                 gas = EnergyData(
                     id=uuid.uuid4(),
+                    tenant_id=org.tenant_id,
                     organization_id=org.id,
                     energy_type=EnergyType.NATURAL_GAS,
                     data_date=data_date,
@@ -2,13 +2,21 @@
 集成测试配置
 """
 
+import uuid
+from typing import Any, Optional
+
 import pytest
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from app.main import app
-from app.core.database import Base, get_db
+from app.core.database import Base, get_db, get_read_db, get_read_session_maker, get_session_maker
 from app.core.config import get_settings
+from app.models.organization import Organization, OrganizationType
+from app.models.tenant import Tenant
+from app.models.user import User, UserRole
+from app.services.factor_cache import factor_cache
+from app.services.principal_cache import principal_cache
 
 # 使用内存数据库进行测试 (或测试专用数据库)
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -23,6 +31,9 @@ async def override_get_db():
 
 
 app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+app.dependency_overrides[get_session_maker] = lambda: TestingSessionLocal
+app.dependency_overrides[get_read_session_maker] = lambda: TestingSessionLocal
 
 
 @pytest.fixture(autouse=True)
@@ -30,13 +41,80 @@ async def init_db():
     """初始化数据库"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    factor_cache.clear()  # 每个用例使用独立数据库，清空进程内因子表
+    principal_cache.clear()
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
 
 
+@pytest.fixture
+async def db_session():
+    """直接操作测试数据库的会话"""
+    async with TestingSessionLocal() as session:
+        yield session
+
+
 @pytest.fixture
 async def client():
     """异步 HTTP客户端"""
     async with AsyncClient(app=app, base_url="http://test") as c:
         yield c
+
+
+class SeedFactory:
+    """测试数据工厂：租户 / 组织 / 用户（只 flush，由用例决定何时提交）"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def tenant(self, name: str = "测试租户", **fields: Any) -> Tenant:
+        tenant = Tenant(name=name, code=f"t_{uuid.uuid4().hex[:8]}", **fields)
+        self.db.add(tenant)
+        await self.db.flush()
+        return tenant
+
+    async def organization(
+        self,
+        tenant: Tenant,
+        name: str = "测试园区",
+        type: OrganizationType = OrganizationType.PARK,
+        parent: Optional[Organization] = None,
+        **fields: Any,
+    ) -> Organization:
+        org = Organization(
+            name=name,
+            code=f"o_{uuid.uuid4().hex[:8]}",
+            type=type,
+            tenant_id=tenant.id,
+            parent=parent,
+            **fields,
+        )
+        self.db.add(org)
+        await self.db.flush()
+        return org
+
+    async def tenant_org(
+        self, org_name: str = "测试园区", **tenant_fields: Any
+    ) -> tuple[Tenant, Organization]:
+        """租户及其下的一个园区"""
+        tenant = await self.tenant(**tenant_fields)
+        return tenant, await self.organization(tenant, org_name)
+
+    async def user(self, tenant: Tenant, role: UserRole = UserRole.MANAGER, **fields: Any) -> User:
+        user = User(
+            email=f"{uuid.uuid4().hex[:8]}@example.com",
+            password_hash="x",
+            tenant_id=tenant.id,
+            role=role,
+            **fields,
+        )
+        self.db.add(user)
+        await self.db.flush()
+        return user
+
+
+@pytest.fixture
+def seed(db_session) -> SeedFactory:
+    """测试数据工厂（与 db_session 共用会话）"""
+    return SeedFactory(db_session)
@@ -0,0 +1,41 @@
+"""
+认证声明中间件测试
+"""
+
+import uuid
+
+import pytest
+
+from app.core import security
+from app.core.middleware.auth import AuthClaimsMiddleware, get_auth_claims
+
+
+async def _claims_for(authorization: bytes | None):
+    seen = {}
+
+    async def app(scope, receive, send):
+        seen["claims"] = get_auth_claims(scope)
+
+    headers = [(b"authorization", authorization)] if authorization else []
+    await AuthClaimsMiddleware(app)({"type": "http", "headers": headers}, None, None)
+    return seen["claims"]
+
+
+@pytest.mark.asyncio
+async def test_claims_decoded_once_per_token(monkeypatch):
+    """同一 Token 只验签一次；无效 Token 不产生 claims"""
+    tenant_id = str(uuid.uuid4())
+    token = security.create_access_token({"sub": str(uuid.uuid4()), "tenant_id": tenant_id})
+
+    calls = []
+    decode = security.decode_token
+    monkeypatch.setattr(security, "decode_token", lambda t: calls.append(t) or decode(t))
+    monkeypatch.setattr(security, "_claims_cache", type(security._claims_cache)())
+
+    for _ in range(3):
+        claims = await _claims_for(f"Bearer {token}".encode())
+        assert claims["tenant_id"] == tenant_id
+    assert calls == [token]
+
+    assert await _claims_for(b"Bearer not.a.token") is None
+    assert await _claims_for(None) is None
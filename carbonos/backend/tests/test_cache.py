@@ -0,0 +1,178 @@
+"""
+缓存测试：L1 进程内缓存、代数失效与防击穿（后两者需要可用的 Redis，不可用时跳过）
+"""
+
+import asyncio
+import time
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+from app.core import cache as cache_module
+from app.core.cache import (
+    CacheManager, LocalCache, cached, close_redis, get_binary_redis, get_redis, session_loader
+)
+
+
+def _loader(value, calls: list):
+    async def load():
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+    return load
+
+
+@pytest.fixture
+async def cache():
+    try:
+        client = await get_redis()
+        await client.ping()
+    except Exception:
+        await close_redis()
+        pytest.skip("Redis 不可用")
+    yield CacheManager(client, await get_binary_redis())
+    await close_redis()
+
+
+@pytest.mark.asyncio
+async def test_organization_generation_invalidates_only_that_org(cache):
+    """递增组织代数只影响该组织；单组织与子树缓存互不覆盖"""
+    tenant_id, org_a, org_b = (str(uuid.uuid4()) for _ in range(3))
+    calls = []
+    assert await cache.dashboard_summary(tenant_id, org_a, _loader({"total": 1}, calls)) == {"total": 1}
+    assert await cache.dashboard_summary(tenant_id, org_a, _loader({"total": 3}, calls), subtree=True) == {"total": 3}
+    assert await cache.dashboard_summary(tenant_id, org_b, _loader({"total": 2}, calls)) == {"total": 2}
+
+    assert await cache.dashboard_summary(tenant_id, org_a, _loader({"total": 0}, calls)) == {"total": 1}
+    assert len(calls) == 3
+
+    await cache.invalidate_organizations(tenant_id, [org_a])
+    assert await cache.dashboard_summary(tenant_id, org_a, _loader({"total": 4}, calls)) == {"total": 4}
+    assert await cache.dashboard_summary(tenant_id, org_a, _loader({"total": 5}, calls), subtree=True) == {"total": 5}
+    assert await cache.dashboard_summary(tenant_id, org_b, _loader({"total": 0}, calls)) == {"total": 2}
+
+
+@pytest.mark.asyncio
+async def test_tenant_generation_invalidates_all_tenant_keys(cache):
+    """递增租户代数使该租户的仪表盘与组织树缓存全部失效，其他租户不受影响"""
+    tenant_id, other_tenant, org_id = (str(uuid.uuid4()) for _ in range(3))
+    calls = []
+    await cache.dashboard_trends(tenant_id, org_id, "month", _loader([1], calls))
+    await cache.set_org_tree(tenant_id, [{"id": org_id}])
+    await cache.set_org_tree(other_tenant, [{"id": org_id}])
+
+    await cache.invalidate_tenant_cache(tenant_id)
+    assert await cache.dashboard_trends(tenant_id, org_id, "month", _loader([2], calls)) == [2]
+    assert await cache.get_org_tree(tenant_id) is None
+    assert await cache.get_org_tree(other_tenant) == [{"id": org_id}]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_compute_once(cache):
+    """同一键的并发未命中只执行一次计算"""
+    key = f"{CacheManager.PREFIX}test:{uuid.uuid4()}"
+    calls = []
+    results = await asyncio.gather(*(cache.fetch(key, _loader(1, calls), ttl=60) for _ in range(20)))
+    assert results == [1] * 20
+    assert calls == [1]
+
+
+@pytest.mark.asyncio
+async def test_shared_miss_survives_first_caller_cancel(cache):
+    """共享计算任务使用 loader 自己的会话：首个调用方取消后其他等待者仍拿到结果"""
+    key = f"{CacheManager.PREFIX}test:{uuid.uuid4()}"
+    closed = []
+
+    @asynccontextmanager
+    async def session_maker():
+        session = object()
+        try:
+            yield session
+        finally:
+            closed.append(session)
+
+    async def compute(db):
+        await asyncio.sleep(0.05)
+        assert db not in closed
+        return 1
+
+    first = asyncio.create_task(cache.fetch(key, session_loader(session_maker, compute), ttl=60))
+    await asyncio.sleep(0.01)
+    waiter = asyncio.create_task(cache.fetch(key, session_loader(session_maker, compute), ttl=60))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await waiter == 1
+    assert len(closed) == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_while_lease_held(cache):
+    """逻辑过期后：其他 worker 持有租约时返回旧值，否则由当前请求刷新"""
+    key = f"{CacheManager.PREFIX}test:{uuid.uuid4()}"
+    await cache.set(key, {"v": "old", "e": time.time() - 1, "d": 0.01}, 60)
+    calls = []
+
+    await cache.redis.set(f"{key}:lease", "other-worker", px=10000)
+    assert await cache.fetch(key, _loader("new", calls), ttl=60) == "old"
+    assert calls == []
+
+    await cache.redis.delete(f"{key}:lease")
+    assert await cache.fetch(key, _loader("new", calls), ttl=60) == "new"
+    assert await cache.fetch(key, _loader("newer", calls), ttl=60) == "new"
+    assert calls == ["new"]
+
+
+@pytest.mark.asyncio
+async def test_cached_does_not_rerun_when_cache_write_fails(cache, monkeypatch):
+    """写缓存失败时返回已计算的结果，不再重复执行被装饰函数"""
+    calls = []
+
+    @cached("test:{item}", ttl=60)
+    async def load(item: str):
+        calls.append(item)
+        return {"item": item}
+
+    async def broken_setex(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache.binary, "setex", broken_setex)
+    item = str(uuid.uuid4())
+    assert await load(item=item) == {"item": item}
+    assert calls == [item]
+
+
+def test_local_cache_byte_budget():
+    """超出字节预算时按 LRU 淘汰；超过预算的单个条目不进入 L1"""
+    local = LocalCache(max_bytes=100)
+    local.set("a", 1, 40, ttl=60)
+    local.set("b", 2, 40, ttl=60)
+    assert local.get("a") == 1  # a 变为最近使用
+    local.set("c", 3, 40, ttl=60)
+    assert local.get("b") is None
+    assert local.get("a") == 1 and local.get("c") == 3
+    assert local.size == 82
+
+    local.set("big", 4, 200, ttl=60)
+    assert local.get("big") is None and len(local) == 2
+
+    local.set("expired", 5, 1, ttl=-1)
+    assert local.get("expired") is None and local.size == 82
+
+
+@pytest.mark.asyncio
+async def test_local_tier_served_without_redis_and_invalidated_by_peers(cache, monkeypatch):
+    """L1 命中不访问 Redis；其他 worker 的失效通知清除本地条目"""
+    key = f"{CacheManager.PREFIX}test:{uuid.uuid4()}"
+    await cache.set(key, {"factor": 1}, ttl=60, local_ttl=30)
+
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(cache.binary, "get", unavailable)
+    assert await cache.get(key, local_ttl=30) == {"factor": 1}
+
+    cache_module._drop_local(f"other-worker|{key}")
+    with pytest.raises(ConnectionError):
+        await cache.get(key, local_ttl=30)
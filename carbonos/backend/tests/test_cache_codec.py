@@ -0,0 +1,55 @@
+"""
+缓存编解码测试
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+
+from app.core.cache_codec import CODECS, COMPRESSORS, MSGPACK_AVAILABLE, CacheSerializer
+
+TRENDS = [{"name": f"{day}日", "value": round(day * 1.5, 2)} for day in range(1, 31)]
+
+
+@pytest.mark.parametrize("codec", [name for name, spec in CODECS.items() if spec[3]])
+@pytest.mark.parametrize("compression", [""] + [name for name, spec in COMPRESSORS.items() if spec[3]])
+def test_round_trip(codec, compression):
+    """各编解码器/压缩组合往返一致；超过阈值才压缩"""
+    serializer = CacheSerializer(codec, compression, compress_min_bytes=512)
+    large = serializer.encode(TRENDS * 10)
+    assert serializer.decode(large)[0] == TRENDS * 10
+    assert large[1] == (COMPRESSORS[compression][0] if compression else 0)
+
+    small = serializer.encode({"total": 1})
+    assert small[1] == 0
+    assert serializer.decode(small) == ({"total": 1}, len(small) - 2)
+
+
+def test_payload_readable_after_config_change():
+    """按载荷头部解码：切换配置后仍可读取旧载荷；无头部的旧 JSON 按 JSON 解码"""
+    written = CacheSerializer("orjson", "zlib", compress_min_bytes=0).encode(TRENDS)
+    assert CacheSerializer("json").decode(written)[0] == TRENDS
+
+    legacy = json.dumps(TRENDS).encode()
+    assert CacheSerializer().decode(legacy) == (TRENDS, len(legacy))
+
+
+def test_unavailable_codec_falls_back_to_json():
+    serializer = CacheSerializer("unknown", "unknown")
+    assert (serializer.codec, serializer.compression) == ("json", "")
+
+
+@pytest.mark.skipif(not MSGPACK_AVAILABLE, reason="msgpack 未安装")
+def test_msgpack_preserves_types():
+    """msgpack 扩展类型保留 UUID / datetime / date / Decimal"""
+    value = {
+        "id": uuid.uuid4(),
+        "at": datetime.datetime(2024, 5, 1, 8, 30),
+        "day": datetime.date(2024, 5, 1),
+        "amount": decimal.Decimal("12.345"),
+    }
+    serializer = CacheSerializer("msgpack")
+    assert serializer.decode(serializer.encode(value))[0] == value
@@ -0,0 +1,75 @@
+"""
+缓存预热测试
+"""
+
+import uuid
+from datetime import date
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models.carbon import EmissionRollupMonthly, EmissionScope
+from app.models.tenant import TenantStatus
+from app.services.cache_warmer import CacheWarmer
+
+
+def _rollup(tenant, org, month: date) -> EmissionRollupMonthly:
+    return EmissionRollupMonthly(
+        tenant_id=tenant.id,
+        organization_id=org.id,
+        scope=EmissionScope.SCOPE_2,
+        month=month,
+        emission_amount=1.0,
+        record_count=1,
+    )
+
+
+@pytest.mark.asyncio
+async def test_active_organizations(db_session, seed):
+    """只预热活跃租户中近期有排放汇总的组织"""
+    this_month = date.today().replace(day=1)
+    tenant, org = await seed.tenant_org()
+    suspended, suspended_org = await seed.tenant_org(status=TenantStatus.SUSPENDED)
+    stale_tenant, stale_org = await seed.tenant_org()
+    db_session.add_all([
+        _rollup(tenant, org, this_month),
+        _rollup(suspended, suspended_org, this_month),
+        _rollup(stale_tenant, stale_org, date(2000, 1, 1)),
+    ])
+    await db_session.commit()
+
+    warmer = CacheWarmer()
+    targets = await warmer.active_organizations(
+        async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False)
+    )
+    assert (tenant.id, org.id, False) in targets
+    assert {target[1] for target in targets}.isdisjoint({suspended_org.id, stale_org.id})
+
+
+@pytest.mark.asyncio
+async def test_writes_coalesced_into_one_warm(monkeypatch):
+    """短时间内的多次写入合并为一次预热；写入组织预热单组织视图，上级组织预热子树视图"""
+    warmer = CacheWarmer()
+    warmer.delay = 0
+    batches = []
+
+    async def record(session_maker, targets):
+        batches.append(set(targets))
+
+    monkeypatch.setattr(warmer, "warm", record)
+    tenant_id, parent_id, child_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+
+    warmer.schedule(tenant_id, {child_id}, {child_id, parent_id})
+    assert batches == [] and warmer._flush_task is None  # 未启动时忽略
+
+    warmer.start(warm_on_start=False)
+    warmer.schedule(tenant_id, {child_id}, {child_id, parent_id})
+    warmer.schedule(tenant_id, {child_id}, {child_id, parent_id})
+    await warmer._flush_task
+    await warmer.stop()
+
+    assert batches == [{
+        (tenant_id, child_id, False),
+        (tenant_id, child_id, True),
+        (tenant_id, parent_id, True),
+    }]
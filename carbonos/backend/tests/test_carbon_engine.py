@@ -0,0 +1,166 @@
+"""
+碳核算引擎测试
+- 批量因子解析
+- 批量核算
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select, func
+
+from app.models.carbon import (
+    EmissionFactor, CarbonEmission, EmissionScope, EmissionRollupDaily, EmissionRollupMonthly
+)
+from app.schemas.carbon import CarbonCalculateRequest
+from app.services.carbon_engine import CarbonCalculationEngine
+from app.services.factor_cache import factor_cache
+from app.services.rollup import EmissionRollupService
+
+
+async def _seed(seed):
+    """辅助函数：创建租户、组织与电力默认因子"""
+    tenant, org = await seed.tenant_org()
+    factor = EmissionFactor(
+        name="华东电网",
+        category="电力",
+        energy_type="electricity",
+        scope=EmissionScope.SCOPE_2,
+        factor_value=0.5,
+        unit="kgCO2e/kWh",
+        is_default=True,
+    )
+    seed.db.add(factor)
+    await seed.db.commit()
+    return tenant, org, factor
+
+
+@pytest.mark.asyncio
+async def test_resolve_emission_factors_priority(db_session, seed):
+    """指定因子 > 库内默认因子 > 内置默认值"""
+    _, _, factor = await _seed(seed)
+    engine = CarbonCalculationEngine(db_session)
+
+    resolved = await engine.resolve_emission_factors([
+        ("electricity", None),
+        ("coal", None),
+        ("electricity", factor.id),
+    ])
+
+    assert resolved[("electricity", None)][0] == 0.5
+    assert resolved[("electricity", None)][3] == factor.id
+    assert resolved[("coal", None)][0] == CarbonCalculationEngine.DEFAULT_FACTORS["coal"]["factor"]
+    assert resolved[("electricity", factor.id)][2] == EmissionScope.SCOPE_2
+
+
+@pytest.mark.asyncio
+async def test_resolve_unknown_energy_type(db_session):
+    """未知能源类型应抛出 ValueError"""
+    engine = CarbonCalculationEngine(db_session)
+    with pytest.raises(ValueError):
+        await engine.resolve_emission_factors([("plasma", None)])
+
+
+@pytest.mark.asyncio
+async def test_calculate_emissions_bulk(db_session, seed):
+    """批量核算应一次写入全部记录并返回吞吐量"""
+    tenant, org, factor = await _seed(seed)
+    engine = CarbonCalculationEngine(db_session)
+
+    items = [
+        CarbonCalculateRequest(
+            organization_id=org.id,
+            energy_type="electricity",
+            activity_data=1000 + i,
+            activity_unit="kWh",
+        )
+        for i in range(50)
+    ]
+    result = await engine.calculate_emissions_bulk(items, tenant_id=tenant.id)
+
+    assert result["inserted"] == 50
+    assert result["rows_per_second"] > 0
+    expected = sum((1000 + i) * 0.5 / 1000 for i in range(50))
+    assert result["total_emission"] == pytest.approx(expected)
+
+    count = await db_session.scalar(
+        select(func.count(CarbonEmission.id)).where(CarbonEmission.tenant_id == tenant.id)
+    )
+    assert count == 50
+    stored = await db_session.scalar(select(CarbonEmission).limit(1))
+    assert stored.emission_factor_id == factor.id
+
+
+@pytest.mark.asyncio
+async def test_calculate_emissions_bulk_requires_tenant(db_session):
+    """缺少 tenant_id 应拒绝"""
+    engine = CarbonCalculationEngine(db_session)
+    with pytest.raises(ValueError):
+        await engine.calculate_emissions_bulk([], tenant_id=None)
+
+
+@pytest.mark.asyncio
+async def test_factor_cache_serves_without_db(db_session, seed):
+    """因子表加载后应直接命中，失效后重新加载"""
+    _, _, factor = await _seed(seed)
+    engine = CarbonCalculationEngine(db_session)
+
+    value, unit, scope = await engine.get_emission_factor("electricity")
+    assert (value, unit, scope) == (0.5, "kgCO2e/kWh", EmissionScope.SCOPE_2)
+    assert factor_cache.lookup("electricity", factor.id)[3] == factor.id
+
+    factor.factor_value = 0.6
+    await db_session.commit()
+    # 未失效前仍返回缓存值
+    assert (await engine.get_emission_factor("electricity"))[0] == 0.5
+
+    await factor_cache.invalidate()
+    assert (await engine.get_emission_factor("electricity"))[0] == 0.6
+
+
+@pytest.mark.asyncio
+async def test_rollups_maintained_incrementally(db_session, seed):
+    """单条/批量核算增量维护的汇总应与全量重建结果一致"""
+    tenant, org, _ = await _seed(seed)
+    engine = CarbonCalculationEngine(db_session)
+
+    def request(amount):
+        return CarbonCalculateRequest(
+            organization_id=org.id,
+            energy_type="electricity",
+            activity_data=amount,
+            activity_unit="kWh",
+        )
+
+    await engine.calculate_emission(
+        org.id, "electricity", 2000, "kWh", tenant_id=tenant.id
+    )
+    await engine.calculate_emissions_bulk([request(1000), request(4000)], tenant_id=tenant.id)
+
+    async def snapshot():
+        daily = (await db_session.execute(
+            select(EmissionRollupDaily.day, EmissionRollupDaily.emission_amount, EmissionRollupDaily.record_count)
+            .where(EmissionRollupDaily.tenant_id == tenant.id)
+        )).all()
+        monthly = (await db_session.execute(
+            select(EmissionRollupMonthly.month, EmissionRollupMonthly.emission_amount, EmissionRollupMonthly.record_count)
+            .where(EmissionRollupMonthly.tenant_id == tenant.id)
+        )).all()
+        return [tuple(row) for row in daily], [tuple(row) for row in monthly]
+
+    today = datetime.utcnow().date()
+    incremental = await snapshot()
+    assert incremental[0] == [(today, pytest.approx(3.5), 3)]
+    assert incremental[1] == [(today.replace(day=1), pytest.approx(3.5), 3)]
+
+    rollups = EmissionRollupService(db_session)
+    # 月初区间走月表，非月初区间走日表
+    assert await rollups.scope_totals(tenant.id, start=today.replace(day=1)) == {"scope_2": pytest.approx(3.5)}
+    assert await rollups.scope_totals(tenant.id, start=today, end=today + timedelta(days=1)) == {
+        "scope_2": pytest.approx(3.5)
+    }
+    assert await rollups.scope_totals(tenant.id, end=today) == {}
+
+    await rollups.rebuild(tenant.id)
+    await db_session.commit()
+    assert await snapshot() == incremental
@@ -0,0 +1,110 @@
+"""
+仪表盘指标测试
+"""
+
+import uuid
+from datetime import datetime, date
+
+import pytest
+
+from app.models.carbon import CarbonEmission, EmissionScope
+from app.models.energy import EnergyData, EnergyType
+from app.services.dashboard import DashboardService
+from app.services.rollup import EmissionRollupService
+
+
+async def _commit_with_rollups(db):
+    """直接写入的排放记录需重建汇总表后才能被仪表盘读取"""
+    await db.flush()
+    await EmissionRollupService(db).rebuild()
+    await db.commit()
+
+
+def _emission(tenant, org, when: datetime, amount: float) -> CarbonEmission:
+    return CarbonEmission(
+        organization_id=org.id,
+        tenant_id=tenant.id,
+        emission_factor_id=uuid.uuid4(),
+        scope=EmissionScope.SCOPE_2,
+        activity_data=amount * 1000,
+        activity_unit="kWh",
+        emission_amount=amount,
+        calculation_date=when,
+    )
+
+
+@pytest.mark.asyncio
+async def test_compute_summary_single_scan(db_session, seed):
+    """条件聚合结果应与逐项统计一致，且按租户隔离"""
+    tenant, org = await seed.tenant_org()
+    other_tenant, other_org = await seed.tenant_org()
+
+    db_session.add_all([
+        _emission(tenant, org, datetime(2026, 3, 5), 10.0),   # 本月
+        _emission(tenant, org, datetime(2026, 3, 20), 5.0),   # 本月
+        _emission(tenant, org, datetime(2026, 2, 10), 10.0),  # 上月
+        _emission(tenant, org, datetime(2026, 1, 2), 25.0),   # 年初
+        _emission(tenant, org, datetime(2025, 12, 31), 99.0), # 去年
+        _emission(other_tenant, other_org, datetime(2026, 3, 6), 500.0),
+        EnergyData(
+            organization_id=org.id, tenant_id=tenant.id,
+            energy_type=EnergyType.ELECTRICITY, data_date=date(2026, 3, 1),
+            consumption=100, unit="kWh", cost=88.5,
+        ),
+        EnergyData(
+            organization_id=org.id, tenant_id=tenant.id,
+            energy_type=EnergyType.ELECTRICITY, data_date=date(2026, 2, 1),
+            consumption=100, unit="kWh", cost=1000,
+        ),
+    ])
+    await _commit_with_rollups(db_session)
+
+    summary = await DashboardService(db_session).compute_summary(
+        tenant.id, org.id, now=datetime(2026, 3, 25)
+    )
+
+    assert summary["total_emission"] == 15.0
+    assert summary["emission_trend"] == 50.0
+    assert summary["total_cost"] == 88.5
+    assert summary["current_year_emission"] == 50.0
+    assert summary["year_progress"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_compute_summary_empty(db_session, seed):
+    """无数据时各指标为 0"""
+    tenant, org = await seed.tenant_org()
+    await db_session.commit()
+
+    summary = await DashboardService(db_session).compute_summary(tenant.id, org.id)
+
+    assert summary["total_emission"] == 0
+    assert summary["emission_trend"] == 0
+    assert summary["total_cost"] == 0
+
+
+@pytest.mark.asyncio
+async def test_compute_trends_zero_filled(db_session, seed):
+    """趋势序列应一次返回完整桶并补零"""
+    tenant, org = await seed.tenant_org()
+    db_session.add_all([
+        _emission(tenant, org, datetime(2026, 3, 25, 8), 2.0),
+        _emission(tenant, org, datetime(2026, 3, 25, 20), 3.0),
+        _emission(tenant, org, datetime(2026, 3, 1), 1.0),
+        _emission(tenant, org, datetime(2025, 4, 10), 7.0),
+        _emission(tenant, org, datetime(2025, 3, 31), 100.0),  # 超出 12 个月窗口
+    ])
+    await _commit_with_rollups(db_session)
+    service = DashboardService(db_session)
+
+    daily = await service.compute_trends(tenant.id, org.id, "month", now=datetime(2026, 3, 25, 12))
+    assert len(daily) == 30
+    assert daily[-1] == {"name": "25日", "value": 5.0}
+    assert daily[0]["name"] == "24日"  # 2026-02-24
+    assert sum(point["value"] for point in daily) == 6.0
+
+    monthly = await service.compute_trends(tenant.id, org.id, "year", now=datetime(2026, 3, 25))
+    assert [point["name"] for point in monthly][:2] == ["4月", "5月"]
+    assert monthly[0]["value"] == 7.0
+    assert monthly[-1] == {"name": "3月", "value": 6.0}
+    assert sum(point["value"] for point in monthly) == 13.0
@@ -0,0 +1,83 @@
+"""
+能源数据批量录入测试
+"""
+
+import pytest
+from sqlalchemy import select, func
+
+from app.models.energy import EnergyData, DataSource
+from app.services.energy_data import bulk_create_energy_data
+
+
+def _item(org, day, consumption=100.0, **overrides):
+    item = {
+        "organization_id": str(org.id),
+        "energy_type": "electricity",
+        "data_date": f"2026-05-{day:02d}",
+        "consumption": consumption,
+        "unit": "kWh",
+    }
+    item.update(overrides)
+    return item
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_row_errors(db_session, seed):
+    """有效行整批写入，无效行逐行返回错误"""
+    tenant, org = await seed.tenant_org()
+    _, other_org = await seed.tenant_org()
+    await db_session.commit()
+
+    items = [
+        _item(org, 1),
+        _item(org, 2, consumption="abc"),                # 字段校验失败
+        _item(org, 3, energy_type="plasma"),              # 未知能源类型
+        _item(other_org, 4),                              # 其他租户的组织
+        _item(org, 1, consumption=5),                     # 批次内重复
+        {"energy_type": "electricity"},                   # 缺少字段
+        _item(org, 5, energy_type="natural_gas", unit="m³", cost=12.5),
+    ]
+    result = await bulk_create_energy_data(db_session, items, tenant.id)
+    await db_session.commit()
+
+    assert (result["total"], result["success_count"], result["failed_count"]) == (7, 2, 5)
+    assert [error["index"] for error in result["errors"]][:5] == [1, 2, 3, 4, 5]
+    assert result["errors"][0]["field"] == "consumption"
+    assert result["errors"][1]["field"] == "energy_type"
+    assert result["errors"][2]["field"] == "organization_id"
+
+    rows = (await db_session.execute(
+        select(EnergyData).where(EnergyData.tenant_id == tenant.id)
+    )).scalars().all()
+    assert len(rows) == 2
+    assert all(row.source == DataSource.API for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_batch_upsert_is_idempotent(db_session, seed):
+    """upsert 重复提交覆盖原数据；非 upsert 时重复数据作为行错误返回"""
+    tenant, org = await seed.tenant_org()
+    await db_session.commit()
+    items = [_item(org, day, consumption=day * 10) for day in range(1, 6)]
+
+    first = await bulk_create_energy_data(db_session, items, tenant.id, upsert=True)
+    await db_session.commit()
+    assert (first["inserted"], first["updated"]) == (5, 0)
+
+    items[0]["consumption"] = 999
+    second = await bulk_create_energy_data(db_session, items, tenant.id, upsert=True)
+    await db_session.commit()
+    assert (second["inserted"], second["updated"], second["failed_count"]) == (0, 5, 0)
+
+    count, total = (await db_session.execute(
+        select(func.count(EnergyData.id), func.sum(EnergyData.consumption))
+        .where(EnergyData.organization_id == org.id)
+    )).one()
+    assert count == 5
+    assert total == 999 + 20 + 30 + 40 + 50
+
+    items.append(_item(org, 6))
+    third = await bulk_create_energy_data(db_session, items, tenant.id, upsert=False)
+    await db_session.commit()
+    assert (third["inserted"], third["updated"], third["failed_count"]) == (1, 0, 5)
+    assert "已存在" in third["errors"][0]["message"]
@@ -0,0 +1,203 @@
+"""
+能源数据流式导入测试
+"""
+
+import functools
+import io
+import uuid
+from datetime import date
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from openpyxl import Workbook
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api import data as data_api
+from app.core.config import get_settings
+from app.core.jobs import JobContext
+from app.models.energy import EnergyData, EnergyType, DataSource, ImportRecord
+from app.services import energy_import, tasks
+from app.services.energy_import import EnergyDataImporter, ImportFormatError, open_row_reader
+
+
+async def _seed_record(seed, filename):
+    """辅助函数：创建租户、组织与导入记录"""
+    tenant, org = await seed.tenant_org()
+    record = ImportRecord(filename=filename, organization_id=org.id)
+    seed.db.add(record)
+    await seed.db.commit()
+    return tenant, org, record
+
+
+@pytest.mark.asyncio
+async def test_import_csv_in_chunks(db_session, seed):
+    """CSV 按块导入：有效行写入，无效行计数并记录行号"""
+    tenant, org, record = await _seed_record(seed, "energy.csv")
+    lines = ["﻿日期,能源类型,消耗量,单位,费用"]
+    for day in range(1, 11):
+        lines.append(f"2026-03-{day:02d},电力,{day * 100},kWh,{day * 80}")
+    lines.append("2026-03-32,电力,100,kWh,")   # 日期无效
+    lines.append("2026/03/15,natural_gas,abc,m³,")  # 数字无效
+    lines.append(",,,,")  # 空行
+    lines.append("2026/03/16,natural_gas,50,m³,")
+    content = "\n".join(lines).encode("utf-8")
+
+    importer = EnergyDataImporter(db_session, tenant.id, org.id, chunk_size=4)
+    await importer.run(record, open_row_reader("energy.csv", io.BytesIO(content)))
+
+    assert (record.total_rows, record.success_rows, record.failed_rows) == (13, 11, 2)
+    assert "第12行" in record.error_message and "第13行" in record.error_message
+
+    rows = (await db_session.execute(
+        select(EnergyData).where(EnergyData.tenant_id == tenant.id).order_by(EnergyData.data_date)
+    )).scalars().all()
+    assert len(rows) == 11
+    assert rows[0].energy_type == EnergyType.ELECTRICITY
+    assert rows[0].source == DataSource.EXCEL
+    assert rows[-1].data_date == date(2026, 3, 16)
+    assert rows[-1].cost is None
+
+
+@pytest.mark.asyncio
+async def test_import_xlsx_read_only(db_session, seed):
+    """xlsx 以只读模式解析，支持单元格日期类型"""
+    tenant, org, record = await _seed_record(seed, "energy.xlsx")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["data_date", "energy_type", "consumption", "unit", "remarks"])
+    sheet.append([date(2026, 1, 1), "electricity", 1200.5, "kWh", "一号楼"])
+    sheet.append([date(2026, 1, 2), "柴油", 30, "L", None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    await EnergyDataImporter(db_session, tenant.id, org.id).run(
+        record, open_row_reader("energy.xlsx", buffer)
+    )
+
+    assert record.success_rows == 2
+    total = await db_session.scalar(
+        select(func.sum(EnergyData.consumption)).where(EnergyData.organization_id == org.id)
+    )
+    assert total == pytest.approx(1230.5)
+
+
+@pytest.mark.asyncio
+async def test_import_missing_columns_fails(db_session, seed):
+    """缺少必填列时导入失败且不写入数据"""
+    tenant, org, record = await _seed_record(seed, "bad.csv")
+    content = "日期,消耗量\n2026-03-01,100\n".encode("utf-8")
+
+    with pytest.raises(ImportFormatError, match="energy_type"):
+        await EnergyDataImporter(db_session, tenant.id, org.id).run(
+            record, open_row_reader("bad.csv", io.BytesIO(content))
+        )
+
+    await db_session.refresh(record)
+    assert record.success_rows == 0
+
+    with pytest.raises(ImportFormatError):
+        open_row_reader("legacy.xls", io.BytesIO(b""))
+
+
+@pytest.mark.asyncio
+async def test_import_resume_skips_committed_rows(db_session, seed):
+    """任务重试时从已提交的行之后继续，不重复写入"""
+    tenant, org, record = await _seed_record(seed, "resume.csv")
+    lines = ["日期,能源类型,消耗量,单位"]
+    lines += [f"2026-04-{day:02d},电力,{day},kWh" for day in range(1, 8)]
+    lines.insert(3, "")  # 空行不计入已提交行数
+    content = "\n".join(lines).encode("utf-8")
+
+    # 模拟上一次尝试已提交前 3 行
+    record.total_rows = record.success_rows = 3
+    await db_session.commit()
+    db_session.add_all([
+        EnergyData(
+            organization_id=org.id, tenant_id=tenant.id, energy_type=EnergyType.ELECTRICITY,
+            data_date=date(2026, 4, day), consumption=day, unit="kWh", source=DataSource.EXCEL,
+        )
+        for day in range(1, 4)
+    ])
+    await db_session.commit()
+
+    await EnergyDataImporter(db_session, tenant.id, org.id, chunk_size=2).run(
+        record, open_row_reader("resume.csv", io.BytesIO(content)), resume=True
+    )
+
+    assert (record.total_rows, record.success_rows) == (7, 7)
+    days = (await db_session.execute(
+        select(EnergyData.data_date).where(EnergyData.organization_id == org.id).order_by(EnergyData.data_date)
+    )).scalars().all()
+    assert days == [date(2026, 4, day) for day in range(1, 8)]
+
+
+@pytest.mark.asyncio
+async def test_import_job_failing_midway_invalidates_committed_chunks(
+    db_session, seed, tmp_path, monkeypatch
+):
+    """导入任务中途失败：原异常抛出，已提交分块所属组织的缓存仍被失效"""
+    tenant, org, record = await _seed_record(seed, "broken.csv")
+    path = tmp_path / "broken.csv"
+    lines = ["日期,能源类型,消耗量,单位"]
+    lines += [f"2026-05-{day:02d},电力,{day},kWh" for day in range(1, 8)]
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+    copy = energy_import.EnergyDataWriter.copy
+    copies = []
+
+    async def flaky_copy(self, rows):
+        copies.append(len(rows))
+        await copy(self, rows)
+        if len(copies) == 2:  # 第二块写入后连接中断，事务回滚
+            raise ConnectionError("connection lost")
+
+    invalidated = []
+
+    async def invalidate_emissions(db, tenant_id, organization_ids):
+        invalidated.append((tenant_id, list(organization_ids)))
+
+    monkeypatch.setattr(energy_import.EnergyDataWriter, "copy", flaky_copy)
+    monkeypatch.setattr(tasks, "EnergyDataImporter", functools.partial(EnergyDataImporter, chunk_size=3))
+    monkeypatch.setattr(tasks.OrganizationHierarchy, "invalidate_emissions", invalidate_emissions)
+    monkeypatch.setattr(
+        tasks, "async_session_maker",
+        async_sessionmaker(db_session.bind, class_=AsyncSession, expire_on_commit=False),
+    )
+
+    ctx = JobContext(
+        id=str(uuid.uuid4()), kind=tasks.ENERGY_IMPORT, tenant_id=str(tenant.id),
+        payload={"record_id": str(record.id), "path": str(path)}, attempt=1, max_attempts=3,
+    )
+    with pytest.raises(ConnectionError):
+        await tasks.run_energy_import(ctx)
+
+    assert invalidated == [(tenant.id, [org.id])]
+    committed = await db_session.scalar(
+        select(func.count()).select_from(EnergyData).where(EnergyData.organization_id == org.id)
+    )
+    assert committed == 3
+
+
+@pytest.mark.asyncio
+async def test_upload_save_failure_marks_record_failed(db_session, seed, tmp_path, monkeypatch):
+    """上传文件保存失败：记录标记为失败，不留下不完整的文件"""
+    tenant, org = await seed.tenant_org()
+    user = await seed.user(tenant)
+    await db_session.commit()
+    monkeypatch.setattr(get_settings(), "upload_dir", str(tmp_path))
+
+    def disk_full(src, dst, length):
+        dst.write(b"partial")
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(data_api.shutil, "copyfileobj", disk_full)
+    upload = UploadFile(io.BytesIO(b"data"), filename="energy.csv")
+    with pytest.raises(HTTPException) as exc:
+        await data_api.import_excel(organization_id=org.id, file=upload, db=db_session, current_user=user)
+    assert exc.value.status_code == 500
+
+    record = await db_session.scalar(select(ImportRecord).where(ImportRecord.organization_id == org.id))
+    assert record.status == "failed" and "上传文件保存失败" in record.error_message
+    assert list((tmp_path / "imports").iterdir()) == []
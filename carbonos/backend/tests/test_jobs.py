@@ -0,0 +1,151 @@
+"""
+后台任务队列测试（需要可用的 Redis，不可用时跳过）
+"""
+
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from app.core import jobs
+from app.core.cache import get_redis, close_redis
+from app.core.config import get_settings
+
+
+@pytest.fixture
+async def redis_client(monkeypatch):
+    try:
+        client = await get_redis()
+        await client.ping()
+    except Exception:
+        await close_redis()
+        pytest.skip("Redis 不可用")
+    monkeypatch.setattr(get_settings(), "job_retry_base_delay", 0)
+    yield client
+    await close_redis()
+
+
+@pytest.mark.asyncio
+async def test_job_retries_with_backoff_then_succeeds(redis_client):
+    """失败的任务进入 retrying，重新排队后成功"""
+    kind = f"test_flaky_{uuid.uuid4().hex[:6]}"
+    states = []
+
+    async def on_state(ctx, status, error):
+        states.append(status)
+
+    @jobs.job_handler(kind, on_state=on_state)
+    async def flaky(ctx):
+        await ctx.progress(50)
+        if ctx.attempt == 1:
+            raise RuntimeError("temporary")
+        return {"attempt": ctx.attempt}
+
+    job_id = await jobs.enqueue(kind, {"x": 1}, tenant_id=uuid.uuid4())
+    await redis_client.lrem(jobs.QUEUE_KEY, 0, job_id)
+    worker = jobs.JobWorker()
+
+    await worker.process(job_id)
+    job = await jobs.get_job(job_id)
+    assert job["status"] == jobs.JobStatus.RETRYING
+    assert job["error"] == "temporary"
+    assert await redis_client.zscore(jobs.DELAYED_KEY, job_id) is not None
+
+    await redis_client.zrem(jobs.DELAYED_KEY, job_id)
+    await worker.process(job_id)
+    job = await jobs.get_job(job_id)
+    assert job["status"] == jobs.JobStatus.SUCCEEDED
+    assert job["result"] == {"attempt": 2}
+    assert job["progress"] == 100
+    assert states == ["running", "retrying", "running", "succeeded"]
+
+
+@pytest.mark.asyncio
+async def test_tenant_concurrency_cap_defers_job(redis_client):
+    """租户并发已满时任务延后执行，不计入尝试次数"""
+    kind = f"test_noop_{uuid.uuid4().hex[:6]}"
+
+    @jobs.job_handler(kind)
+    async def noop(ctx):
+        return None
+
+    tenant_id = uuid.uuid4()
+    job_id = await jobs.enqueue(kind, {}, tenant_id=tenant_id)
+    await redis_client.lrem(jobs.QUEUE_KEY, 0, job_id)
+    worker = jobs.JobWorker(tenant_concurrency=1)
+
+    running_key = f"{jobs.RUNNING_KEY_PREFIX}{tenant_id}"
+    await redis_client.set(running_key, 1)
+    try:
+        await worker.process(job_id)
+        job = await jobs.get_job(job_id)
+        assert job["status"] == jobs.JobStatus.QUEUED
+        assert job["attempts"] == 0
+        assert await redis_client.zscore(jobs.DELAYED_KEY, job_id) is not None
+    finally:
+        await redis_client.delete(running_key)
+        await redis_client.zrem(jobs.DELAYED_KEY, job_id)
+
+    await worker.process(job_id)
+    assert (await jobs.get_job(job_id))["status"] == jobs.JobStatus.SUCCEEDED
+    assert not await redis_client.exists(running_key)
+
+
+@pytest.mark.asyncio
+async def test_claimed_job_tracked_until_finished(redis_client):
+    """领取的任务在执行期间位于 worker 的领取列表中，结束后移除；正常退出时注销心跳"""
+    kind = f"test_claim_{uuid.uuid4().hex[:6]}"
+    worker = jobs.JobWorker()
+    claimed = []
+
+    @jobs.job_handler(kind)
+    async def inspect(ctx):
+        claimed.append(await redis_client.lrange(worker.processing_key, 0, -1))
+        worker.stop()
+
+    job_id = await jobs.enqueue(kind, {})
+    await asyncio.wait_for(worker.run(poll_timeout=1), timeout=10)
+
+    assert claimed == [[job_id]]
+    assert (await jobs.get_job(job_id))["status"] == jobs.JobStatus.SUCCEEDED
+    assert not await redis_client.exists(worker.processing_key)
+    assert await redis_client.zscore(jobs.WORKERS_KEY, worker.worker_id) is None
+
+
+@pytest.mark.asyncio
+async def test_reaper_recovers_jobs_of_dead_worker(redis_client):
+    """心跳超时 worker 的任务：未达最大尝试次数时重新排队，否则标记失败"""
+    kind = f"test_reap_{uuid.uuid4().hex[:6]}"
+    states = []
+
+    async def on_state(ctx, status, error):
+        states.append((ctx.id, status))
+
+    @jobs.job_handler(kind, on_state=on_state)
+    async def noop(ctx):
+        return None
+
+    retry_id = await jobs.enqueue(kind, {}, max_attempts=3)
+    exhausted_id = await jobs.enqueue(kind, {}, max_attempts=1)
+    dead = f"dead-{uuid.uuid4().hex[:8]}"
+    dead_key = f"{jobs.PROCESSING_KEY_PREFIX}{dead}"
+    for job_id in (retry_id, exhausted_id):
+        await redis_client.lrem(jobs.QUEUE_KEY, 0, job_id)
+        await redis_client.lpush(dead_key, job_id)
+        await redis_client.hset(jobs._job_key(job_id), mapping={"status": jobs.JobStatus.RUNNING, "attempts": 1})
+    await redis_client.zadd(jobs.WORKERS_KEY, {dead: time.time() - 3600})
+
+    worker = jobs.JobWorker()
+    try:
+        assert await worker.reap() == 2
+        assert (await jobs.get_job(retry_id))["status"] == jobs.JobStatus.RETRYING
+        assert (await jobs.get_job(exhausted_id))["status"] == jobs.JobStatus.FAILED
+        assert await redis_client.lpos(jobs.QUEUE_KEY, retry_id) is not None
+        assert await redis_client.lpos(jobs.QUEUE_KEY, exhausted_id) is None
+        assert sorted(states) == sorted([(retry_id, "retrying"), (exhausted_id, "failed")])
+        assert not await redis_client.exists(dead_key)
+        assert not await redis_client.exists(worker.processing_key)
+        assert await redis_client.zscore(jobs.WORKERS_KEY, dead) is None
+    finally:
+        await redis_client.lrem(jobs.QUEUE_KEY, 0, retry_id)
@@ -0,0 +1,123 @@
+"""
+Prometheus 指标标签测试
+"""
+
+import uuid
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import metrics
+from app.core.config import Settings
+from app.core.database import InstrumentedAsyncQueuePool, engine_options
+from app.core.metrics import (
+    OTHER_TENANTS, UNMATCHED_ROUTE, PrometheusMiddleware, TenantLabels, instrument_engine
+)
+
+
+def _latency_count(endpoint: str) -> float:
+    value = REGISTRY.get_sample_value(
+        "carbonos_http_request_duration_seconds_count", {"method": "GET", "endpoint": endpoint}
+    )
+    return value or 0
+
+
+@pytest.mark.asyncio
+async def test_endpoint_label_is_route_template():
+    """路径参数不进入标签；路由器前缀保留；未匹配请求归入 <unmatched>"""
+    router = APIRouter(prefix="/items")
+
+    @router.get("/{item_id}")
+    async def read_item(item_id: uuid.UUID):
+        return {}
+
+    inner = FastAPI()
+    inner.include_router(router, prefix="/api/metrics-test")
+    app = PrometheusMiddleware(inner)
+
+    template = "/api/metrics-test/items/{item_id}"
+    before = _latency_count(template)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        for _ in range(3):
+            assert (await client.get(f"/api/metrics-test/items/{uuid.uuid4()}")).status_code == 200
+        assert (await client.get("/api/metrics-test/missing")).status_code == 404
+
+    assert _latency_count(template) - before == 3
+    assert _latency_count(UNMATCHED_ROUTE) >= 1
+    assert list(app.routes._labels.values()) == [template]
+
+
+def test_tenant_labels_bounded():
+    """超出前 N 的租户归为 other，刷新后按近期请求量重新排名"""
+    labels = TenantLabels(top_n=2, refresh_interval=3600)
+    assert labels.label("a") == "a"
+    assert labels.label("b") == "b"
+    assert labels.label("c") == OTHER_TENANTS
+    assert labels.label(None) == "unknown"
+
+    for _ in range(5):
+        labels.label("c")
+    labels._refresh()
+    assert labels.label("c") == "c"
+    assert labels.label("b") == OTHER_TENANTS
+
+
+@pytest.mark.asyncio
+async def test_query_instrumentation_counts_per_request(db_session, monkeypatch):
+    """引擎事件按指纹计数；同一语句参数不同指纹相同；超阈值的慢查询写日志"""
+    instrument_engine(db_session.bind)
+    slow = []
+    monkeypatch.setattr(metrics.logger, "warning", lambda event, **kw: slow.append((event, kw)))
+    monkeypatch.setattr(metrics.get_settings(), "db_slow_query_ms", 0)
+
+    queries = metrics.RequestQueries()
+    token = metrics._request_queries.set(queries)
+    try:
+        for value in (1, 2, 3):
+            await db_session.execute(text(f"SELECT {value}"))
+    finally:
+        metrics._request_queries.reset(token)
+
+    assert queries.total == 3
+    assert len(queries.by_fingerprint) == 1
+    assert [event for event, _ in slow] == ["db_slow_query"] * 3
+    assert slow[0][1]["statement"] == "SELECT ?" and slow[0][1]["rows"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pool_gauges(tmp_path):
+    """连接池使用量/溢出/等待时间指标，按 pool 标签区分主库与副本"""
+    pool_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedAsyncQueuePool, pool_name="replica", pool_size=1, max_overflow=1,
+    )
+    labels = {"pool": "replica"}
+    waits = REGISTRY.get_sample_value("carbonos_db_pool_checkout_wait_seconds_count", labels) or 0
+
+    async with pool_engine.connect() as first, pool_engine.connect() as second:
+        await first.execute(text("SELECT 1"))
+        await second.execute(text("SELECT 1"))
+        assert REGISTRY.get_sample_value("carbonos_db_pool_capacity", labels) == 2
+        assert REGISTRY.get_sample_value("carbonos_db_pool_connections_in_use", labels) == 2
+        assert REGISTRY.get_sample_value("carbonos_db_pool_overflow_connections", labels) == 1
+
+    assert REGISTRY.get_sample_value("carbonos_db_pool_connections_in_use", labels) == 0
+    assert REGISTRY.get_sample_value("carbonos_db_pool_checkout_wait_seconds_count", labels) - waits == 2
+    await pool_engine.dispose()
+    assert pool_engine.pool.pool_name == "replica"
+
+
+def test_pgbouncer_engine_options():
+    """PgBouncer 模式关闭预编译语句缓存；SQLite 不设置连接池参数"""
+    options = engine_options(Settings(
+        secret_key="x", database_url="postgresql+asyncpg://u:p@pgbouncer:6432/db", db_pgbouncer=True
+    ))
+    assert options["pool_size"] == 10 and options["echo"] is False and options["pool_name"] == "primary"
+    assert options["connect_args"]["statement_cache_size"] == 0
+    assert options["connect_args"]["prepared_statement_cache_size"] == 0
+
+    assert engine_options(Settings(secret_key="x", database_url="sqlite+aiosqlite://")) == {"echo": False}
@@ -0,0 +1,133 @@
+"""
+组织层级测试
+"""
+
+import uuid
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.carbon import CarbonEmission, EmissionScope
+from app.models.organization import Organization, OrganizationClosure, OrganizationType
+from app.services.dashboard import DashboardService
+from app.services.org_hierarchy import OrganizationHierarchy, build_tree
+from app.services.rollup import EmissionRollupService
+
+
+async def _seed_tree(seed):
+    """园区 -> 2 家企业 -> 各 1 个车间；另一租户 1 个园区"""
+    tenant = await seed.tenant("层级租户")
+    park = await seed.organization(tenant, "园区")
+    ent_a = await seed.organization(tenant, "企业A", OrganizationType.ENTERPRISE, park)
+    ent_b = await seed.organization(tenant, "企业B", OrganizationType.ENTERPRISE, park)
+    shop_a = await seed.organization(tenant, "车间A", OrganizationType.WORKSHOP, ent_a)
+    shop_b = await seed.organization(tenant, "车间B", OrganizationType.WORKSHOP, ent_b)
+    await seed.tenant_org("其他园区", name="其他租户")
+    await seed.db.commit()
+    return tenant, park, (ent_a, ent_b), (shop_a, shop_b)
+
+
+@pytest.mark.asyncio
+async def test_closure_derived_from_parent(db_session, seed):
+    """后续插入的子组织由父组织闭包行生成；父组织不存在或属于其他租户时拒绝"""
+    tenant, park, (ent_a, _), (shop_a, _) = await _seed_tree(seed)
+    line = await seed.organization(tenant, "产线", OrganizationType.WORKSHOP, parent=shop_a)
+    await db_session.commit()
+    rows = (await db_session.execute(
+        select(OrganizationClosure.ancestor_id, OrganizationClosure.depth)
+        .where(OrganizationClosure.descendant_id == line.id)
+        .order_by(OrganizationClosure.depth)
+    )).all()
+    assert rows == [(line.id, 0), (shop_a.id, 1), (ent_a.id, 2), (park.id, 3)]
+
+    # 同一次 flush 中新建的父子组织：父组织先插入并生成闭包行
+    child = Organization(
+        name="子车间", code=f"o_{uuid.uuid4().hex[:8]}", type=OrganizationType.WORKSHOP, tenant_id=tenant.id,
+        parent=Organization(
+            name="新企业", code=f"o_{uuid.uuid4().hex[:8]}", type=OrganizationType.ENTERPRISE,
+            tenant_id=tenant.id, parent=park,
+        ),
+    )
+    db_session.add(child)
+    await db_session.commit()
+    depths = (await db_session.execute(
+        select(OrganizationClosure.depth).where(OrganizationClosure.descendant_id == child.id)
+    )).scalars().all()
+    assert sorted(depths) == [0, 1, 2]
+
+    other = await seed.tenant("其他租户")
+    with pytest.raises(ValueError):
+        await seed.organization(other, "越权", OrganizationType.WORKSHOP, parent=shop_a)
+    await db_session.rollback()
+
+
+@pytest.mark.asyncio
+async def test_tree_single_query_tenant_isolated(db_session, seed):
+    tenant, park, (ent_a, ent_b), (shop_a, shop_b) = await _seed_tree(seed)
+
+    nodes = await OrganizationHierarchy(db_session).load(tenant.id)
+    assert len(nodes) == 5
+
+    tree = build_tree(nodes)
+    assert [root["name"] for root in tree] == ["园区"]
+    assert sorted(child["name"] for child in tree[0]["children"]) == ["企业A", "企业B"]
+    workshops = {child["name"]: [g["name"] for g in child["children"]] for child in tree[0]["children"]}
+    assert workshops == {"企业A": ["车间A"], "企业B": ["车间B"]}
+
+    # Redis 不可用时直接查询
+    assert await OrganizationHierarchy(db_session).get_tree(tenant.id) == tree
+
+
+@pytest.mark.asyncio
+async def test_subtree_rollup(db_session, seed):
+    tenant, park, (ent_a, ent_b), (shop_a, shop_b) = await _seed_tree(seed)
+    hierarchy = OrganizationHierarchy(db_session)
+
+    assert set(await hierarchy.subtree_ids(tenant.id, ent_a.id)) == {ent_a.id, shop_a.id}
+    assert len(await hierarchy.subtree_ids(tenant.id, park.id)) == 5
+    assert await hierarchy.subtree_ids(uuid.uuid4(), park.id) == []
+
+    for org, amount in ((park, 1.0), (ent_a, 2.0), (shop_a, 4.0), (shop_b, 8.0)):
+        db_session.add(CarbonEmission(
+            organization_id=org.id,
+            tenant_id=tenant.id,
+            emission_factor_id=uuid.uuid4(),
+            scope=EmissionScope.SCOPE_2,
+            activity_data=amount,
+            activity_unit="kWh",
+            emission_amount=amount,
+            calculation_date=datetime(2026, 3, 5),
+        ))
+    await db_session.flush()
+    rollups = EmissionRollupService(db_session)
+    await rollups.rebuild()
+
+    totals = await rollups.scope_totals(tenant.id, park.id, include_descendants=True)
+    assert totals == {"scope_2": 15.0}
+    assert await rollups.scope_totals(tenant.id, ent_a.id, include_descendants=True) == {"scope_2": 6.0}
+    assert await rollups.scope_totals(tenant.id, ent_a.id) == {"scope_2": 2.0}
+
+    children = await rollups.child_totals(tenant.id, park.id)
+    assert {row["name"]: row["total"] for row in children} == {"园区": 1.0, "企业A": 6.0, "企业B": 8.0}
+
+    summary = await DashboardService(db_session).compute_summary(
+        tenant.id, park.id, now=datetime(2026, 3, 20), include_descendants=True
+    )
+    assert summary["total_emission"] == 15.0
+
+
+@pytest.mark.asyncio
+async def test_closure_rows(db_session, seed):
+    tenant, park, (ent_a, _), (shop_a, _) = await _seed_tree(seed)
+    rows = (await db_session.execute(
+        select(OrganizationClosure.ancestor_id, OrganizationClosure.depth)
+        .where(OrganizationClosure.descendant_id == shop_a.id)
+    )).all()
+    assert sorted(rows, key=lambda row: row.depth) == [(shop_a.id, 0), (ent_a.id, 1), (park.id, 2)]
+
+    await db_session.delete(shop_a)
+    await db_session.commit()
+    assert await db_session.scalar(
+        select(func.count()).select_from(OrganizationClosure).where(OrganizationClosure.descendant_id == shop_a.id)
+    ) == 0
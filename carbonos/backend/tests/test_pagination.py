@@ -0,0 +1,88 @@
+"""
+游标分页与流式导出测试
+"""
+
+import json
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.pagination import export_response, keyset_query, paginate, stream_scalars
+from app.models.energy import EnergyData, EnergyType
+from app.schemas.energy import EnergyDataResponse
+
+
+async def _seed_energy(seed, days: int = 5, per_day: int = 3):
+    """辅助函数：创建租户、组织，以及同一天多条（排序值相同）的能源数据"""
+    tenant, org = await seed.tenant_org()
+    seed.db.add_all([
+        EnergyData(
+            organization_id=org.id, tenant_id=tenant.id,
+            energy_type=EnergyType.ELECTRICITY, data_date=date(2026, 4, day + 1),
+            consumption=day * 10 + i, unit="kWh",
+        )
+        for day in range(days) for i in range(per_day)
+    ])
+    await seed.db.commit()
+    return tenant, org
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_all_rows_once(db_session, seed):
+    """逐页遍历不重不漏，顺序为 (data_date, id) 倒序"""
+    tenant, _ = await _seed_energy(seed)
+    query = select(EnergyData).where(EnergyData.tenant_id == tenant.id)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = await paginate(db_session, query, EnergyData.data_date, EnergyData.id, cursor, limit=4)
+        seen.extend(page.items)
+        pages += 1
+        if not page.next_cursor:
+            break
+        cursor = page.next_cursor
+
+    assert pages == 4
+    assert len({row.id for row in seen}) == len(seen) == 15
+    keys = [(row.data_date, row.id) for row in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_rejected(db_session):
+    with pytest.raises(HTTPException) as exc:
+        keyset_query(select(EnergyData), EnergyData.data_date, EnergyData.id, "not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+async def _read_body(response) -> str:
+    return "".join([chunk async for chunk in response.body_iterator])
+
+
+@pytest.mark.asyncio
+async def test_export_streams_ndjson_and_csv(db_session, seed):
+    """分批读取并输出全部行"""
+    tenant, _ = await _seed_energy(seed)
+    session_maker = async_sessionmaker(db_session.bind, expire_on_commit=False)
+    query = keyset_query(
+        select(EnergyData).where(EnergyData.tenant_id == tenant.id),
+        EnergyData.data_date, EnergyData.id,
+    )
+
+    ndjson = await _read_body(export_response(
+        stream_scalars(session_maker, query, batch_size=4), EnergyDataResponse, "ndjson", "energy"
+    ))
+    rows = [json.loads(line) for line in ndjson.splitlines()]
+    assert len(rows) == 15
+    assert rows[0]["data_date"] == "2026-04-05"
+
+    response = export_response(
+        stream_scalars(session_maker, query, batch_size=4), EnergyDataResponse, "csv", "energy"
+    )
+    assert response.media_type.startswith("text/csv")
+    lines = (await _read_body(response)).lstrip("\ufeff").splitlines()
+    assert lines[0].split(",") == list(EnergyDataResponse.model_fields)
+    assert len(lines) == 16
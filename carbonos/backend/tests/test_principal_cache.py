@@ -0,0 +1,28 @@
+"""
+认证主体缓存测试
+"""
+
+import pytest
+from sqlalchemy import delete
+
+from app.models.user import User, UserRole, UserStatus
+from app.services.principal_cache import Principal, principal_cache
+
+
+@pytest.mark.asyncio
+async def test_principal_cached_until_invalidated(db_session, seed):
+    """命中缓存时不再查询 users 表；失效后重新加载"""
+    tenant = await seed.tenant()
+    user = await seed.user(tenant)
+    await db_session.commit()
+
+    principal = await principal_cache.get(db_session, user.id)
+    assert principal == Principal(user.id, tenant.id, UserRole.MANAGER, UserStatus.ACTIVE, False)
+    assert Principal.from_json(principal.to_json()) == principal
+
+    await db_session.execute(delete(User).where(User.id == user.id))
+    await db_session.commit()
+    assert await principal_cache.get(db_session, user.id) == principal
+
+    await principal_cache.invalidate([user.id])
+    assert await principal_cache.get(db_session, user.id) is None
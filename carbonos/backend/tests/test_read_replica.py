@@ -0,0 +1,77 @@
+"""
+只读副本路由测试（主库与副本使用两个 SQLite 文件）
+"""
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.database import ReplicaRouter
+
+
+@pytest.fixture
+async def databases(tmp_path):
+    engines = []
+    makers = []
+    for name in ("primary", "replica"):
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / name}.db")
+        async with engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE origin (name TEXT)"))
+            await conn.execute(text("INSERT INTO origin VALUES (:name)"), {"name": name})
+        engines.append(engine)
+        makers.append(async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+    yield makers
+    for engine in engines:
+        await engine.dispose()
+
+
+async def _origin(router: ReplicaRouter) -> str:
+    maker = await router.session_maker()
+    async with maker() as session:
+        return await session.scalar(text("SELECT name FROM origin"))
+
+
+@pytest.mark.asyncio
+async def test_reads_routed_to_replica(databases):
+    primary, replica = databases
+    assert await _origin(ReplicaRouter(primary, replica)) == "replica"
+    assert await _origin(ReplicaRouter(primary)) == "primary"
+
+
+@pytest.mark.asyncio
+async def test_fallback_on_lag_and_failure(databases, monkeypatch):
+    """延迟超限或副本不可用时回退主库，恢复后（下一个检查周期）切回副本"""
+    primary, replica = databases
+    router = ReplicaRouter(primary, replica, max_lag=10, check_interval=0)
+
+    lag = {"value": 60.0}
+
+    async def measure_lag():
+        if lag["value"] is None:
+            raise ConnectionError("replica down")
+        return lag["value"]
+
+    monkeypatch.setattr(router, "measure_lag", measure_lag)
+    assert await _origin(router) == "primary"
+
+    lag["value"] = None
+    assert await _origin(router) == "primary"
+
+    lag["value"] = 1.0
+    assert await _origin(router) == "replica"
+
+
+@pytest.mark.asyncio
+async def test_check_result_cached(databases, monkeypatch):
+    primary, replica = databases
+    router = ReplicaRouter(primary, replica, check_interval=60)
+    calls = []
+
+    async def measure_lag():
+        calls.append(1)
+        return 0.0
+
+    monkeypatch.setattr(router, "measure_lag", measure_lag)
+    for _ in range(3):
+        assert await _origin(router) == "replica"
+    assert len(calls) == 1
@@ -0,0 +1,99 @@
+"""
+报告生成测试（进程池渲染 + 内容哈希缓存 + 批量模式）
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+
+import pytest
+
+from app.core.config import get_settings
+from app.models.organization import Organization, OrganizationType
+from app.services import report_generator
+from app.services.report_generator import ReportCache, ReportGenerator, shutdown_render_pool
+
+
+@pytest.fixture
+def report_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(get_settings(), "report_cache_dir", str(tmp_path))
+    yield tmp_path
+    shutdown_render_pool()
+
+
+async def _seed(seed, count: int):
+    tenant = await seed.tenant()
+    for i in range(count):
+        await seed.organization(tenant, f"企业{i}", OrganizationType.ENTERPRISE)
+    await seed.db.commit()
+    return tenant
+
+
+@pytest.mark.asyncio
+async def test_bulk_render_and_cache(db_session, seed, report_cache, monkeypatch):
+    tenant = await _seed(seed, 3)
+
+    reports = await ReportGenerator.render_tenant_reports(db_session, tenant.id, 2026)
+    assert len(reports) == 3
+    assert all(content.startswith(b"%PDF") for _, content in reports)
+    assert len(list(report_cache.glob("*.pdf"))) == 3
+
+    # 数据未变化时直接读取缓存，不再渲染
+    def fail(*args, **kwargs):
+        raise AssertionError("should be served from cache")
+
+    monkeypatch.setattr(report_generator, "get_render_pool", fail)
+    org = reports[0][0]
+    cached = await ReportGenerator.render_inventory_report(db_session, tenant.id, org.id, 2026)
+    assert cached == reports[0][1]
+
+    assert await ReportGenerator.render_inventory_report(db_session, uuid.uuid4(), org.id, 2026) is None
+
+
+@pytest.mark.asyncio
+async def test_generated_date_part_of_cache_key(db_session, seed, report_cache):
+    """报告上的生成日期参与缓存键：跨日不会返回旧日期的报告"""
+    tenant = await _seed(seed, 1)
+    (org, today), = await ReportGenerator.render_tenant_reports(db_session, tenant.id, 2026)
+    summary = {"scope_1": 0, "scope_2": 0, "scope_3": 0, "total": 0}
+
+    assert await ReportGenerator.render_cached(org, 2026, summary, date.today()) == today
+    key = ReportCache.key(org, 2026, summary, date.today())
+    assert ReportCache.key(org, 2026, summary, date(2026, 1, 1)) != key
+    await ReportGenerator.render_cached(org, 2026, summary, date(2026, 1, 1))
+    assert len(list(report_cache.glob("*.pdf"))) == 2
+
+
+def test_cache_sweep_by_age_and_size(tmp_path):
+    """清理过期文件与写入中断遗留的临时文件；超出大小时先淘汰最久未用的文件"""
+    cache = ReportCache(str(tmp_path))
+    now = time.time()
+    ages = {"old.pdf": 3 * 86400, "orphan.pdf.x.tmp": 3 * 86400, "a.pdf": 300, "b.pdf": 200, "c.pdf": 100}
+    for name, age in ages.items():
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (now - age, now - age))
+
+    assert cache.sweep(max_age=86400, max_bytes=1000) == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf", "b.pdf", "c.pdf"]
+
+    assert cache.get("a") == b"x" * 100  # 命中刷新使用时间
+    assert cache.sweep(max_age=86400, max_bytes=200) == 1
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.pdf", "c.pdf"]
+
+
+@pytest.mark.asyncio
+async def test_broken_render_pool_recreated(report_cache):
+    """渲染子进程异常退出后重建进程池，后续渲染不受影响"""
+    pool = report_generator.get_render_pool()
+    with pytest.raises(BrokenProcessPool):
+        await asyncio.wrap_future(pool.submit(os._exit, 1))
+
+    org = Organization(id=uuid.uuid4(), name="企业", code="o_broken", type=OrganizationType.ENTERPRISE)
+    summary = {"scope_1": 1.0, "scope_2": 0, "scope_3": 0, "total": 1.0}
+    content = await ReportGenerator.render_cached(org, 2026, summary)
+    assert content.startswith(b"%PDF")
+    assert report_generator.get_render_pool() is not pool
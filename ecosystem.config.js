@@ -16,6 +16,20 @@ module.exports = {
             out_file: './logs/backend-out.log',
             log_date_format: 'YYYY-MM-DD HH:mm:ss',
         },
+        {
+            name: 'worker',
+            cwd: './carbonos/backend',
+            script: 'venv/bin/python',
+            args: '-m app.worker',
+            interpreter: 'none',
+            env_file: './carbonos/backend/.env',
+            watch: false,
+            max_memory_restart: '1G',
+            kill_timeout: 60000,  // 等待运行中的任务结束
+            error_file: './logs/worker-error.log',
+            out_file: './logs/worker-out.log',
+            log_date_format: 'YYYY-MM-DD HH:mm:ss',
+        },
         {
             name: 'frontend',
             cwd: './carbonos',